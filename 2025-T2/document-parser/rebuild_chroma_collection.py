@@ -15,7 +15,8 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, _load_project_env
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, _load_project_env, chunk_metadata
+from nutrihelp_ai.services.local_vector_index import export_snapshot
 
 logger = logging.getLogger("rebuild_chroma_collection")
 
@@ -267,7 +268,11 @@ def rebuild_collection(
         for offset, (doc, metadata) in enumerate(zip(docs_batch, metadata_batch), start=start):
             raw_id = f"{metadata.get('source_url','')}|{metadata.get('chunk_index',0)}|{offset}"
             ids_batch.append(hashlib.sha1(raw_id.encode("utf-8")).hexdigest())
-        collection.upsert(ids=ids_batch, documents=docs_batch, metadatas=metadata_batch)
+        collection.upsert(
+            ids=ids_batch,
+            documents=docs_batch,
+            metadatas=[chunk_metadata(doc, metadata) for doc, metadata in zip(docs_batch, metadata_batch)],
+        )
         inserted += len(docs_batch)
 
     return {
@@ -300,11 +305,32 @@ def main() -> int:
         default=100,
         help="Batch size for Chroma upserts.",
     )
+    parser.add_argument(
+        "--export-snapshot",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="After rebuilding, export the collection for CHROMA_MODE=embedded-fast. Defaults to CHROMA_SNAPSHOT_PATH.",
+    )
+    parser.add_argument(
+        "--snapshot-only",
+        action="store_true",
+        help="Skip the rebuild and only export the existing collection (implies --export-snapshot).",
+    )
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     _load_project_env()
     settings = ActiveAISettings()
+    snapshot_path = args.export_snapshot or settings.chroma_snapshot_path
+
+    if args.snapshot_only:
+        client = build_chroma_client(settings)
+        collection_name = args.collection or settings.rag_collection
+        exported = export_snapshot(client.get_collection(name=collection_name), snapshot_path)
+        logger.info("Exported %s records from %s to %s", exported, collection_name, snapshot_path)
+        return 0
 
     sentences_path = Path(args.sentences).resolve()
     if not sentences_path.is_file():
@@ -342,6 +368,10 @@ def main() -> int:
         result["inserted"],
         result["final_count"],
     )
+
+    if args.export_snapshot is not None:
+        exported = export_snapshot(client.get_collection(name=collection_name), snapshot_path)
+        logger.info("Exported %s records from %s to %s", exported, collection_name, snapshot_path)
     return 0
 
 
@@ -0,0 +1,28 @@
+import argparse
+
+from nutrihelp_ai.services.active_ai_backend import GroqChromaBackend
+
+parser = argparse.ArgumentParser(
+    description="Tag existing chunks with is_meta/content_hash metadata so RAG_METADATA_FILTER can be enabled."
+)
+parser.add_argument("--collection", default=None, help="Collection to backfill (default RAG_COLLECTION).")
+parser.add_argument("--page-size", type=int, default=500, help="Chunks read and updated per request.")
+parser.add_argument("--keep-duplicates", action="store_true", help="Tag duplicate chunks instead of deleting them.")
+parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing.")
+args = parser.parse_args()
+
+backend = GroqChromaBackend(collection_name=args.collection)
+report = backend.backfill_chunk_metadata(
+    page_size=args.page_size,
+    remove_duplicates=not args.keep_duplicates,
+    dry_run=args.dry_run,
+)
+
+print("Scanned chunks:", report.scanned)
+print("Tagged chunks:", report.tagged)
+print("Meta chunks:", report.meta)
+print("Duplicate chunks:", report.duplicates)
+print("Deleted duplicates:", report.deleted)
+print("Seconds:", report.seconds)
+if args.dry_run:
+    print("Dry run: nothing was written.")
@@ -10,16 +10,22 @@ files = [
 ]
 
 docs = []
+metadatas = []
 for file_path in files:
     print("Checking:", file_path)
     with open(file_path, "r", encoding="utf-8") as f:
         docs.append(f.read().strip())
+    metadatas.append({"source_file": file_path.name})
 
 backend = GroqChromaBackend(collection_name="aus_food_nutrition")
 
-before_count = backend.collection_count()
-after_count = backend.add_documents(docs)
+report = backend.ingest_documents(docs, metadatas=metadatas)
 
-print("Before count:", before_count)
-print("After count:", after_count)
-print("Added documents:", len(docs))
\ No newline at end of file
+for batch in report.batches:
+    status = f"failed: {batch.error}" if batch.error else "ok"
+    print(f"Batch {batch.index}: size={batch.size} attempts={batch.attempts} seconds={batch.seconds} {status}")
+
+print("Before count:", report.before_count)
+print("After count:", report.after_count)
+print("Submitted documents:", report.submitted)
+print("Unique documents:", report.unique)
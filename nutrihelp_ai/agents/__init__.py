@@ -1,10 +1,10 @@
 # nutrihelp_ai/agents/__init__.py
 import os
-from nutrihelp_ai.services.active_ai_backend import GroqChromaBackend
+from nutrihelp_ai.services.active_ai_backend import get_shared_backend
 from .agent_hf import AgentHF
 
 def get_agent():
     backend = os.getenv("NUTRIBOT_BACKEND", "groq").lower()
     if backend == "hf_legacy":
         return AgentHF()
-    return GroqChromaBackend()
+    return get_shared_backend()
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -7,8 +9,13 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from nutrihelp_ai.routers import medical_report_api, chatbot_api, image_api, health_plan_api, finetune_api, meal_plan_api, meal_log_api
 from nutrihelp_ai.routers import multi_image_api  # NEW: Multi-image router
 from nutrihelp_ai.extensions import limiter
+from nutrihelp_ai.services.active_ai_backend import get_shared_backend
+from nutrihelp_ai.services.client_registry import close_shared_clients
+from nutrihelp_ai.services.http_pool import aclose_http_clients
+from nutrihelp_ai.services.request_metrics import REGISTRY, end_trace, render_metrics, start_trace
 
 import logging
+import time
 from slowapi.errors import RateLimitExceeded
 from slowapi.extension import _rate_limit_exceeded_handler
 
@@ -20,11 +27,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger("nutrihelp")
 
+# ---- Lifespan: open the shared Groq/Chroma clients, release them on shutdown ----
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await get_shared_backend().awarm_up()
+    except Exception as exc:
+        logger.warning(f"Shared client warm-up skipped: {exc!r}")
+    yield
+    close_shared_clients()
+    await aclose_http_clients()
+
 # ---- FastAPI App ----
 app = FastAPI(
     title="NutriHelp AI API",
     description="API for AI models",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan,
 )
 
 # ---- Allow all origins (for development) ----
@@ -40,6 +59,31 @@ app.add_middleware(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# ---- Request metrics: per-stage timings in `Server-Timing`, latency histogram for /metrics ----
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    trace, token = start_trace()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        # Streaming bodies are still being produced here, so their header covers time to first byte.
+        response.headers["Server-Timing"] = trace.server_timing()
+        return response
+    finally:
+        route = request.scope.get("route")
+        REGISTRY.observe(
+            "nutrihelp_http_request_duration_seconds",
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+        if trace.stages:
+            logger.info(f"Request trace {request.method} {request.url.path}: {trace.as_dict()}")
+        end_trace(token)
+
 # ---- Health Check ----
 @app.api_route("/", methods=["GET", "HEAD"])
 async def root():
@@ -49,6 +93,10 @@ async def root():
 async def healthz():
     return JSONResponse(status_code=200, content={"status": "ok"})
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # ---- Register Routers ----
 app.include_router(medical_report_api, prefix="/ai-model/medical-report", tags=["Medical Report Generation"])
 app.include_router(chatbot_api, prefix="/ai-model/chatbot", tags=["AI Assistant"])
@@ -1,13 +1,36 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File
-from io import BytesIO
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+from typing import AsyncIterator, List, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from datetime import datetime
-from nutrihelp_ai.services.active_ai_backend import GroqChromaBackend
+from nutrihelp_ai.services.active_ai_backend import _safe_reply, get_shared_backend
+from nutrihelp_ai.services.audio_chunker import UploadTooLargeError, spool_upload
+from nutrihelp_ai.services.deadline import (
+    DEADLINE_HEADER,
+    ClientDisconnected,
+    DeadlineExceeded,
+    deadline_from_header,
+    run_until_disconnected,
+)
+from nutrihelp_ai.services.request_metrics import record_abandoned
 
 import uuid
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
-agent = GroqChromaBackend()
+agent = get_shared_backend()
+
+# Legacy Nutribot /ws protocol markers
+WS_HEARTBEAT = "Ping"
+WS_HEARTBEAT_REPLY = "Pong"
+WS_END_OF_MESSAGE = "##END##"
 
 class ChatRequest(BaseModel):
     query: str = Field(
@@ -18,6 +41,25 @@ class ChatRequest(BaseModel):
         description="User's chat message or question, optionally enriched with trusted app profile context"
     )
 
+class BatchChatRequest(BaseModel):
+    queries: List[str] = Field(
+        ...,
+        min_length=1,
+        description="Chat messages to answer; results stream back as NDJSON in completion order"
+    )
+    concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Max answers generated at once, capped by CHAT_BATCH_CONCURRENCY"
+    )
+
+    @field_validator("queries")
+    @classmethod
+    def validate_queries(cls, queries: List[str]) -> List[str]:
+        if len(queries) > agent.settings.chat_batch_max_items:
+            raise ValueError(f"at most {agent.settings.chat_batch_max_items} queries per batch")
+        return [ChatRequest(query=query).query for query in queries]
+
 class ChatResponse(BaseModel):
     status: str = "success"
     msg: str
@@ -30,17 +72,48 @@ class ErrorResponse(BaseModel):
     detail: str | None = None
     timestamp: str
 
+# nginx's "client closed request"; only ever seen in logs and metrics, the client is gone.
+CLIENT_CLOSED_REQUEST = 499
+
+
+def _deadline_exceeded(exc: DeadlineExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=504,
+        detail=ErrorResponse(
+            error="Gateway Timeout",
+            detail=str(exc),
+            timestamp=datetime.now().isoformat()
+        ).dict()
+    )
+
+
+async def _answer(http_request: Request, answer):
+    """Await a pipeline for this request, cancelling it if the client disconnects first."""
+    try:
+        return await run_until_disconnected(http_request.is_disconnected, answer)
+    except ClientDisconnected:
+        logger.info("Client disconnected from %s; abandoning its answer", http_request.url.path)
+        record_abandoned("disconnect")
+        raise
+
+
 @router.post("/chat", response_model=ChatResponse)
-def sync_chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    """Chat with RAG fallback. `X-Request-Timeout-Ms` (or CHAT_DEADLINE_SECONDS) bounds the work done."""
+    deadline = deadline_from_header(http_request.headers.get(DEADLINE_HEADER), agent.settings.chat_deadline_seconds)
     try:
-        msg = agent.chat_with_rag_fallback(request.query)
+        msg = await _answer(http_request, agent.achat_with_rag_fallback(request.query, deadline=deadline))
         unique_id = str(uuid.uuid4())
         return ChatResponse(
             msg=msg,
             id=unique_id,
             timestamp=datetime.now().isoformat()
         )
-    
+
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except DeadlineExceeded as e:
+        raise _deadline_exceeded(e)
     except Exception as e:
         raise HTTPException(
             status_code=500, 
@@ -51,17 +124,39 @@ def sync_chat(request: ChatRequest):
             ).dict()
         )
     
+async def _ndjson_batch(request: BatchChatRequest) -> AsyncIterator[str]:
+    concurrency = min(request.concurrency or agent.settings.chat_batch_concurrency, agent.settings.chat_batch_concurrency)
+    async for item in agent.astream_chat_batch(request.queries, concurrency=concurrency):
+        item["id"] = str(uuid.uuid4())
+        item["timestamp"] = datetime.now().isoformat()
+        yield json.dumps(item) + "\n"
+
+
+@router.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """Answer many /chat queries concurrently; one JSON object per line, in completion order."""
+    return StreamingResponse(
+        _ndjson_batch(request),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/chat_with_rag", response_model=ChatResponse)
-def sync_chat(request: ChatRequest):
+async def chat_with_rag(request: ChatRequest, http_request: Request):
+    deadline = deadline_from_header(http_request.headers.get(DEADLINE_HEADER), agent.settings.chat_deadline_seconds)
     try:
-        msg = agent.generate_with_rag(request.query)
+        msg = await _answer(http_request, agent.agenerate_with_rag(request.query, deadline=deadline))
         unique_id = str(uuid.uuid4())
         return ChatResponse(
             msg=msg,
             id=unique_id,
             timestamp=datetime.now().isoformat()
         )
-    
+
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except DeadlineExceeded as e:
+        raise _deadline_exceeded(e)
     except Exception as e:
         raise HTTPException(
             status_code=500, 
@@ -72,14 +167,38 @@ def sync_chat(request: ChatRequest):
             ).dict()
         )
     
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the chatbot answer caches."""
+    return agent.cache_stats()
+
 # --- AI013: Transcribe-only endpoint ---
+UPLOAD_READ_SIZE = 1024 * 1024
+
+
+async def _read_upload(audio: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        piece = await audio.read(UPLOAD_READ_SIZE)
+        if not piece:
+            return
+        yield piece
+
+
+async def _spool_or_413(pieces: AsyncIterator[bytes], suffix: str) -> str:
+    try:
+        return await spool_upload(pieces, agent.settings.audio_chunking_config().max_upload_bytes, suffix=suffix)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
 @router.post("/transcribe")
 async def transcribe_audio(audio: UploadFile = File(...)):
     """Converts audio to text. That's it."""
+    filename = audio.filename or "recording.webm"
+    content_type = audio.content_type or "audio/webm"
+    path = await _spool_or_413(_read_upload(audio), os.path.splitext(filename)[1])
     try:
-        audio_bytes = await audio.read()
-        audio_buffer = BytesIO(audio_bytes)
-        transcript = agent.transcribe_audio(audio_buffer)
+        transcript = await agent.atranscribe_file(path, filename, content_type)
 
         if not transcript or not transcript.strip():
             raise HTTPException(
@@ -96,3 +215,157 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             status_code=500,
             detail=f"Transcription error: {str(e)}",
         )
+    finally:
+        os.remove(path)
+
+
+async def _ndjson_transcription(path: str, filename: str, content_type: str) -> AsyncIterator[str]:
+    try:
+        async for event in agent.astream_transcription(path, filename, content_type):
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        logger.error("Chunked transcription failed: %s", e, exc_info=True)
+        yield json.dumps({"type": "error", "detail": f"Transcription error: {str(e)}"}) + "\n"
+
+
+@router.post("/transcribe/stream")
+async def transcribe_stream(request: Request):
+    """Transcribe a raw audio request body (e.g. `Content-Type: audio/webm`) in overlapping chunks.
+
+    The body is streamed to a temporary file, then one NDJSON line is sent per
+    chunk as it finishes, followed by a `done` line with the stitched transcript.
+    """
+    content_type = request.headers.get("content-type", "audio/webm").split(";")[0].strip()
+    extension = mimetypes.guess_extension(content_type) or ".webm"
+    path = await _spool_or_413(request.stream(), extension)
+    return StreamingResponse(
+        _ndjson_transcription(path, f"recording{extension}", content_type),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs once the response ends, including when the client disconnects early.
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+# --- Streaming chat (SSE + WebSocket) ---
+async def _with_heartbeats(deltas: AsyncIterator[str], interval: float) -> AsyncIterator[Optional[str]]:
+    """Yield deltas as they arrive, and None whenever the stream is idle for `interval` seconds."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for delta in deltas:
+                await queue.put(("delta", delta))
+            await queue.put(("done", None))
+        except Exception as exc:
+            await queue.put(("error", exc))
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                kind, value = await asyncio.wait_for(queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        task.cancel()
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def _sse_events(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    unique_id = str(uuid.uuid4())
+    try:
+        async for delta in _with_heartbeats(deltas, agent.settings.chat_stream_heartbeat_seconds):
+            if delta is None:
+                yield ": ping\n\n"
+            else:
+                yield _sse("delta", {"delta": delta})
+    except Exception as e:
+        logger.error("Chat stream failed: %s", e, exc_info=True)
+        yield _sse(
+            "error",
+            ErrorResponse(
+                error="Internal Server Error",
+                detail=str(e),
+                timestamp=datetime.now().isoformat(),
+            ).dict(),
+        )
+        return
+
+    yield _sse("done", {"status": "success", "id": unique_id, "timestamp": datetime.now().isoformat()})
+
+
+def _sse_response(deltas: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_events(deltas),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Server-Sent Events variant of /chat: `delta` events, then a final `done` event."""
+    return _sse_response(agent.astream_chat_with_rag_fallback(request.query))
+
+
+@router.post("/chat_with_rag/stream")
+async def chat_with_rag_stream(request: ChatRequest):
+    """Server-Sent Events variant of /chat_with_rag."""
+    return _sse_response(agent.astream_generate_with_rag(request.query))
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Streams /chat answers as text frames, ending each answer with ##END## (legacy Nutribot protocol)."""
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(text: str):
+        async with send_lock:
+            await websocket.send_text(text)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(agent.settings.chat_stream_heartbeat_seconds)
+            try:
+                await send(WS_HEARTBEAT)
+            except Exception:
+                break
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == WS_HEARTBEAT_REPLY:
+                continue
+
+            try:
+                query = ChatRequest(query=data).query
+            except ValidationError:
+                await send("Invalid request")
+                await send(WS_END_OF_MESSAGE)
+                continue
+
+            try:
+                async for delta in agent.astream_chat_with_rag_fallback(query):
+                    await send(delta)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error("WebSocket chat stream failed: %s", e, exc_info=True)
+                await send(_safe_reply())
+            await send(WS_END_OF_MESSAGE)
+    except WebSocketDisconnect:
+        logger.info("Chat WebSocket disconnected")
+    finally:
+        heartbeat_task.cancel()
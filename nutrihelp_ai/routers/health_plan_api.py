@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field, confloat, conint, field_validator
@@ -98,7 +99,9 @@ async def generate_health_plan(request: Request, input_data: HealthPlanInput):
 
         logger.debug("Analyzed input: %s", analyzed)
 
-        raw = _service.generate_plan(
+        # generate_plan blocks on its week-block completions; keep it off the event loop.
+        raw = await asyncio.to_thread(
+            _service.generate_plan,
             analyzed_health_condition=analyzed,
         )
 
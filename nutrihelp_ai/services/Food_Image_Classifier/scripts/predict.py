@@ -103,6 +103,10 @@ class Predictor:
     def predict_from_bytes(self, image_bytes: bytes, topk: int = TOPK_DEFAULT) -> Dict[str, Any]:
         return self._predict_pil(self._pil_from_bytes(image_bytes), topk=topk)
 
+    def predict_image(self, image: Image.Image, topk: int = TOPK_DEFAULT) -> Dict[str, Any]:
+        """Predict from an already-decoded RGB image, e.g. the pipeline's shared `DecodedImage.image`."""
+        return self._predict_pil(image, topk=topk)
+
     def predict_path(self, image_path: str, topk: int = TOPK_DEFAULT) -> Dict[str, Any]:
         return self._predict_pil(Image.open(image_path).convert("RGB"), topk=topk)
 
@@ -1,28 +1,99 @@
+import asyncio
+import hashlib
 import json
 import logging
+import math
 import os
 import re
-from dataclasses import dataclass, field
+import threading
+import time
+import contextvars
+import copy
+import io
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 
 from urllib import error as urllib_error
 from urllib import request as urllib_request
 
 from dotenv import find_dotenv, load_dotenv
 
+from nutrihelp_ai.services.ai_cache import ResponseCache, TTLCache
+from nutrihelp_ai.services.audio_chunker import AudioChunkingConfig, split_audio, stitch_transcripts
+from nutrihelp_ai.services.client_registry import (
+    aget_shared,
+    bump_shared_version,
+    get_loop_shared,
+    get_shared,
+    registry_stats,
+    shared_version,
+)
+from nutrihelp_ai.services.context_assembler import assemble_context, estimate_tokens
+from nutrihelp_ai.services.deadline import Deadline, DeadlineExceeded, StageBudgets, current_deadline, deadline_scope
+from nutrihelp_ai.services.groq_resilience import (
+    GroqScheduler,
+    GroqUnavailableError,
+    ResilienceConfig,
+    get_scheduler,
+    is_rate_limit_error,
+)
+from nutrihelp_ai.services.http_pool import HttpPoolConfig, awarm_up, get_async_http_client, get_http_client, warm_up
+from nutrihelp_ai.services.json_extract import extract_json
+from nutrihelp_ai.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from nutrihelp_ai.services.local_vector_index import MANIFEST_FILE, LocalVectorIndex
+from nutrihelp_ai.services.request_metrics import (
+    annotate,
+    observe_stage,
+    record_abandoned,
+    record_cache_hit,
+    record_deadline_skip,
+    record_path,
+    record_retrieval,
+    record_tokens,
+    stage,
+)
+from nutrihelp_ai.services.micro_batcher import AsyncMicroBatcher, MicroBatcher
+from nutrihelp_ai.services.model_router import (
+    DOMAIN_CHAT,
+    GROUNDED_RAG,
+    SOCIAL,
+    STRUCTURED_JSON,
+    ModelRouter,
+    RouteDecision,
+    default_routes,
+    parse_routes,
+)
+from nutrihelp_ai.services.singleflight import AsyncSingleFlight, SingleFlight
+
 logger = logging.getLogger(__name__)
 
 try:
     import chromadb
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
 except Exception:
     chromadb = None
+    DefaultEmbeddingFunction = None
+
+try:
+    import httpx
+except Exception:  # pragma: no cover - httpx ships with the Groq and Chroma clients.
+    httpx = None
 
 try:
     from groq import Groq
 except Exception:
     Groq = None
 
+try:
+    from groq import AsyncGroq
+except Exception:
+    AsyncGroq = None
+
 
 def _load_project_env() -> Optional[Path]:
     """Load .env in a cross-platform way for Linux/Windows execution contexts."""
@@ -76,6 +147,18 @@ def _env_float(name: str, default: float) -> float:
         return default
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    if raw in {"1", "true", "yes", "on"}:
+        return True
+    if raw in {"0", "false", "no", "off"}:
+        return False
+    logger.warning("Invalid boolean value for %s=%r; falling back to %s", name, raw, default)
+    return default
+
+
 def _env_int(name: str, default: int) -> int:
     raw = os.getenv(name, "").strip()
     if not raw:
@@ -90,7 +173,11 @@ def _env_int(name: str, default: int) -> int:
 @dataclass(frozen=True)
 class ActiveAISettings:
     groq_api_key: str = field(default_factory=lambda: os.getenv("GROQ_API_KEY", ""))
+    groq_base_url: str = field(default_factory=lambda: os.getenv("GROQ_BASE_URL", "").strip().rstrip("/") or GROQ_API_BASE_URL)
     groq_model: str = field(default_factory=lambda: os.getenv("GROQ_MODEL", "llama-3.1-8b-instant"))
+    groq_structured_model: str = field(default_factory=lambda: os.getenv("GROQ_STRUCTURED_MODEL", ""))
+    groq_tuned_routes: bool = field(default_factory=lambda: _env_bool("GROQ_TUNED_ROUTES", False))
+    groq_model_routes: str = field(default_factory=lambda: os.getenv("GROQ_MODEL_ROUTES", ""))
     chroma_mode: str = field(default_factory=lambda: os.getenv("CHROMA_MODE", "cloud"))
     chroma_path: str = field(default_factory=lambda: os.getenv("CHROMA_PATH", "./.chroma"))
     chroma_api_key: str = field(default_factory=lambda: os.getenv("CHROMA_API_KEY", ""))
@@ -102,10 +189,99 @@ class ActiveAISettings:
     rag_relaxed_distance_threshold: float = field(default_factory=lambda: _env_float("RAG_RELAXED_DISTANCE_THRESHOLD", 1.6))
     groq_temperature: float = field(default_factory=lambda: _env_float("GROQ_TEMPERATURE", 0.0))
     groq_top_p: float = field(default_factory=lambda: _env_float("GROQ_TOP_P", 1.0))
+    chat_stream_heartbeat_seconds: float = field(default_factory=lambda: _env_float("CHAT_STREAM_HEARTBEAT_SECONDS", 15.0))
+    chat_batch_concurrency: int = field(default_factory=lambda: _env_int("CHAT_BATCH_CONCURRENCY", 8))
+    chat_batch_max_items: int = field(default_factory=lambda: _env_int("CHAT_BATCH_MAX_ITEMS", 200))
+    response_cache_size: int = field(default_factory=lambda: _env_int("RESPONSE_CACHE_SIZE", 512))
+    response_cache_ttl_seconds: float = field(default_factory=lambda: _env_float("RESPONSE_CACHE_TTL_SECONDS", 3600.0))
+    response_cache_similarity: float = field(default_factory=lambda: _env_float("RESPONSE_CACHE_SIMILARITY", 0.0))
+    retrieval_cache_size: int = field(default_factory=lambda: _env_int("RETRIEVAL_CACHE_SIZE", 1024))
+    retrieval_cache_ttl_seconds: float = field(default_factory=lambda: _env_float("RETRIEVAL_CACHE_TTL_SECONDS", 600.0))
+    health_plan_cache_size: int = field(default_factory=lambda: _env_int("HEALTH_PLAN_CACHE_SIZE", 256))
+    health_plan_cache_ttl_seconds: float = field(default_factory=lambda: _env_float("HEALTH_PLAN_CACHE_TTL_SECONDS", 86400.0))
+    health_plan_week_block: int = field(default_factory=lambda: _env_int("HEALTH_PLAN_WEEK_BLOCK", 4))
+    ingest_batch_size: int = field(default_factory=lambda: _env_int("INGEST_BATCH_SIZE", 100))
+    ingest_max_workers: int = field(default_factory=lambda: _env_int("INGEST_MAX_WORKERS", 4))
+    ingest_max_retries: int = field(default_factory=lambda: _env_int("INGEST_MAX_RETRIES", 3))
+    chroma_snapshot_path: str = field(default_factory=lambda: os.getenv("CHROMA_SNAPSHOT_PATH", "./.chroma_snapshot"))
+    rag_cloud_latency_budget_ms: float = field(default_factory=lambda: _env_float("RAG_CLOUD_LATENCY_BUDGET_MS", 0.0))
+    chroma_http_timeout_seconds: float = field(default_factory=lambda: _env_float("CHROMA_HTTP_TIMEOUT_SECONDS", 30.0))
+    rag_hybrid_search: bool = field(default_factory=lambda: _env_bool("RAG_HYBRID_SEARCH", False))
+    rag_hybrid_rrf_k: int = field(default_factory=lambda: _env_int("RAG_HYBRID_RRF_K", 60))
+    rag_hybrid_min_coverage: float = field(default_factory=lambda: _env_float("RAG_HYBRID_MIN_COVERAGE", 0.7))
+    rag_hybrid_min_terms: int = field(default_factory=lambda: _env_int("RAG_HYBRID_MIN_TERMS", 2))
+    rag_context_token_budget: int = field(default_factory=lambda: _env_int("RAG_CONTEXT_TOKEN_BUDGET", 0))
+    rag_speculative_fallback: bool = field(default_factory=lambda: _env_bool("RAG_SPECULATIVE_FALLBACK", False))
+    rag_metadata_filter: bool = field(default_factory=lambda: _env_bool("RAG_METADATA_FILTER", False))
+    rag_batch_window_ms: float = field(default_factory=lambda: _env_float("RAG_BATCH_WINDOW_MS", 0.0))
+    rag_batch_max_size: int = field(default_factory=lambda: _env_int("RAG_BATCH_MAX_SIZE", 16))
+    chat_deadline_seconds: float = field(default_factory=lambda: _env_float("CHAT_DEADLINE_SECONDS", 0.0))
+    deadline_retrieval_seconds: float = field(default_factory=lambda: _env_float("DEADLINE_RETRIEVAL_SECONDS", 1.0))
+    deadline_grounded_min_seconds: float = field(default_factory=lambda: _env_float("DEADLINE_GROUNDED_MIN_SECONDS", 2.0))
+    deadline_fallback_min_seconds: float = field(default_factory=lambda: _env_float("DEADLINE_FALLBACK_MIN_SECONDS", 1.0))
+    http_pool_size: int = field(default_factory=lambda: _env_int("HTTP_POOL_SIZE", 20))
+    http_connect_timeout_seconds: float = field(default_factory=lambda: _env_float("HTTP_CONNECT_TIMEOUT_SECONDS", 5.0))
+    http_read_timeout_seconds: float = field(default_factory=lambda: _env_float("HTTP_READ_TIMEOUT_SECONDS", 30.0))
+    http_warm_up: bool = field(default_factory=lambda: _env_bool("HTTP_WARM_UP", True))
+    groq_rate_limit_rpm: float = field(default_factory=lambda: _env_float("GROQ_RATE_LIMIT_RPM", 0.0))
+    groq_rate_limit_burst: int = field(default_factory=lambda: _env_int("GROQ_RATE_LIMIT_BURST", 10))
+    groq_queue_timeout_seconds: float = field(default_factory=lambda: _env_float("GROQ_QUEUE_TIMEOUT_SECONDS", 10.0))
+    groq_breaker_failure_rate: float = field(default_factory=lambda: _env_float("GROQ_BREAKER_FAILURE_RATE", 0.5))
+    groq_breaker_min_calls: int = field(default_factory=lambda: _env_int("GROQ_BREAKER_MIN_CALLS", 10))
+    groq_breaker_open_seconds: float = field(default_factory=lambda: _env_float("GROQ_BREAKER_OPEN_SECONDS", 30.0))
+    groq_hedge_requests: bool = field(default_factory=lambda: _env_bool("GROQ_HEDGE_REQUESTS", False))
+    transcribe_chunk_seconds: float = field(default_factory=lambda: _env_float("TRANSCRIBE_CHUNK_SECONDS", 30.0))
+    transcribe_overlap_seconds: float = field(default_factory=lambda: _env_float("TRANSCRIBE_OVERLAP_SECONDS", 2.0))
+    transcribe_concurrency: int = field(default_factory=lambda: _env_int("TRANSCRIBE_CONCURRENCY", 4))
+    transcribe_max_upload_mb: int = field(default_factory=lambda: _env_int("TRANSCRIBE_MAX_UPLOAD_MB", 100))
 
     def missing_chat_env(self) -> List[str]:
         return ["GROQ_API_KEY"] if not self.groq_api_key else []
 
+    def http_pool_config(self) -> HttpPoolConfig:
+        return HttpPoolConfig(
+            max_connections=max(1, self.http_pool_size),
+            connect_timeout=self.http_connect_timeout_seconds,
+            read_timeout=self.http_read_timeout_seconds,
+        )
+
+    def stage_budgets(self) -> StageBudgets:
+        return StageBudgets(
+            retrieval_seconds=max(0.0, self.deadline_retrieval_seconds),
+            grounded_min_seconds=max(0.0, self.deadline_grounded_min_seconds),
+            fallback_min_seconds=max(0.0, self.deadline_fallback_min_seconds),
+        )
+
+    def groq_client_key(self) -> tuple:
+        """Settings that identify a Groq client; backends with equal keys share one client."""
+        return (self.groq_api_key, self.groq_base_url, self.http_pool_config())
+
+    def chroma_client_key(self) -> tuple:
+        """Settings that identify a Chroma client; backends with equal keys share one client."""
+        mode = self.chroma_mode.lower()
+        if mode == "cloud":
+            return (mode, self.chroma_tenant, self.chroma_database, self.chroma_api_key)
+        return (mode, os.path.abspath(self.chroma_path))
+
+    def audio_chunking_config(self) -> AudioChunkingConfig:
+        return AudioChunkingConfig(
+            chunk_seconds=max(1.0, self.transcribe_chunk_seconds),
+            overlap_seconds=max(0.0, self.transcribe_overlap_seconds),
+            max_upload_bytes=max(0, self.transcribe_max_upload_mb) * 1024 * 1024,
+        )
+
+    def resilience_config(self) -> ResilienceConfig:
+        return ResilienceConfig(
+            requests_per_minute=self.groq_rate_limit_rpm,
+            burst=self.groq_rate_limit_burst,
+            queue_timeout=self.groq_queue_timeout_seconds,
+            breaker_failure_rate=self.groq_breaker_failure_rate,
+            breaker_window=max(20, self.groq_breaker_min_calls),
+            breaker_min_calls=self.groq_breaker_min_calls,
+            breaker_open_seconds=self.groq_breaker_open_seconds,
+            hedge=self.groq_hedge_requests,
+        )
+
     def missing_chroma_env(self) -> List[str]:
         if self.chroma_mode.lower() != "cloud":
             return []
@@ -120,10 +296,89 @@ class ActiveAISettings:
         return missing
 
 
+class GroqHTTPError(Exception):
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"status {status_code}: {body}")
+        self.status_code = status_code
+
+
 def _safe_reply() -> str:
     return "Nutribot is currently unavailable."
 
 
+def _normalize_document(document: str) -> str:
+    return " ".join(document.split()).strip().lower()
+
+
+def document_content_id(document: str) -> str:
+    """Stable Chroma ID for a chunk, so re-ingesting the same text is an idempotent upsert."""
+    return hashlib.sha256(_normalize_document(document).encode("utf-8")).hexdigest()
+
+
+# Chunks about the app itself (API docs, prompt guides) rather than nutrition.
+META_CONTEXT_MARKERS = (
+    "structured prompting approach",
+    "content-type: application/json",
+    "json body",
+    "example successful response",
+    "the recipe engine does not work directly",
+    "langchain",
+    "redis memory",
+    "serp",
+    "openai models",
+)
+
+# Chroma `where` filter applied to retrieval when RAG_METADATA_FILTER is on.
+RETRIEVABLE_CHUNK_FILTER = {"is_meta": False}
+
+
+def is_meta_document(document: str) -> bool:
+    lowered = document.lower()
+    return any(marker in lowered for marker in META_CONTEXT_MARKERS)
+
+
+def chunk_metadata(document: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Metadata stored with a chunk: the caller's fields plus the `is_meta` flag and content hash."""
+    return {
+        **(metadata or {}),
+        "is_meta": is_meta_document(document),
+        "content_hash": document_content_id(document),
+    }
+
+
+@dataclass
+class IngestBatchResult:
+    index: int
+    size: int
+    attempts: int
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class MetadataBackfillReport:
+    scanned: int
+    tagged: int
+    meta: int
+    duplicates: int
+    deleted: int
+    seconds: float
+
+
+@dataclass
+class IngestReport:
+    submitted: int
+    unique: int
+    before_count: int
+    after_count: int
+    seconds: float
+    batches: List[IngestBatchResult] = field(default_factory=list)
+
+    @property
+    def failed_batches(self) -> List[IngestBatchResult]:
+        return [batch for batch in self.batches if batch.error]
+
+
 GROUNDING_SYSTEM_PROMPT = (
     "You are NutriBot, a nutrition assistant.\n"
     "Strict grounding rules (follow exactly):\n"
@@ -145,18 +400,355 @@ DOMAIN_CHAT_SYSTEM_PROMPT = (
     "Keep replies concise, practical, and friendly."
 )
 
+RAG_NO_CONTEXT_REPLY = (
+    "I'm sorry, I could not find relevant nutrition information for your question. "
+    "Please try asking about specific foods, nutrients, or dietary guidelines "
+    "for Australian seniors."
+)
+
+# Streamed grounded answers are held back until this many characters have
+# arrived so the weak-response check can still switch to the domain chat.
+STREAM_WEAK_CHECK_CHARS = 160
+
+GROQ_API_BASE_URL = "https://api.groq.com"
+GROQ_CHAT_COMPLETIONS_PATH = "/openai/v1/chat/completions"
+CHROMA_CLOUD_HOST = "api.trychroma.com"
+CHROMA_MODE_EMBEDDED_FAST = "embedded-fast"
+
+# Cloud queries run here when RAG_CLOUD_LATENCY_BUDGET_MS is set, so a slow call
+# can be abandoned in favour of the local snapshot without blocking the caller.
+# An abandoned query keeps its worker until Chroma answers (or the HTTP timeout
+# fires), so a slot is claimed before submitting: with every worker busy the
+# query fails over at once instead of queueing behind the stuck ones.
+_CHROMA_QUERY_WORKERS = 8
+_CHROMA_QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=_CHROMA_QUERY_WORKERS, thread_name_prefix="chroma-query")
+_CHROMA_QUERY_SLOTS = threading.BoundedSemaphore(_CHROMA_QUERY_WORKERS)
+# Runs the speculative plain-chat completion beside a grounded one on the sync path.
+_SPECULATIVE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-chat")
+# Week blocks of a health plan are generated here in parallel.
+_PLAN_BLOCK_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="health-plan-block")
+
+
+# ---- Domain guard vocabulary ----
+
+SOCIAL_PATTERNS = [
+    r"^(hi|hello|hey|good morning|good afternoon|good evening)\b",
+    r"^(thanks|thank you|thx)\b",
+    r"^(how are you|how are you doing)\b",
+]
+
+NUTRITION_KEYWORDS = [
+    "nutrition",
+    "nutrient",
+    "nutrients",
+    "calorie",
+    "calories",
+    "protein",
+    "carb",
+    "carbs",
+    "carbohydrate",
+    "carbohydrates",
+    "fat",
+    "fats",
+    "fibre",
+    "fiber",
+    "vitamin",
+    "vitamins",
+    "mineral",
+    "minerals",
+    "iron",
+    "calcium",
+    "sodium",
+    "cholesterol",
+    "salt",
+    "sugar",
+    "food",
+    "foods",
+    "meal",
+    "meals",
+    "meal plan",
+    "meal planning",
+    "diet",
+    "dietary",
+    "healthy eating",
+    "weight loss",
+    "weight gain",
+    "breakfast",
+    "lunch",
+    "dinner",
+    "snack",
+    "snacks",
+    "recipe",
+    "recipes",
+    "ingredient",
+    "ingredients",
+    "serving",
+    "portion",
+    "scan",
+    "dish",
+    "older adults",
+    "seniors",
+    "hydration",
+    "water intake",
+    "diabetes",
+    "blood pressure",
+    "vegan",
+    "vegetarian",
+    "keto",
+    "low-carb",
+    "high-protein",
+    "gluten-free",
+    "dairy-free",
+    "lactose-free",
+    "nut-free",
+    "allergen",
+    "allergens",
+    "coeliac",
+    "celiac",
+]
+
+FOOD_TERMS = [
+    "fruit",
+    "fruits",
+    "vegetable",
+    "vegetables",
+    "berry",
+    "berries",
+    "strawberry",
+    "strawberries",
+    "apple",
+    "apples",
+    "banana",
+    "bananas",
+    "orange",
+    "oranges",
+    "grape",
+    "grapes",
+    "avocado",
+    "avocados",
+    "broccoli",
+    "carrot",
+    "carrots",
+    "spinach",
+    "salad",
+    "salads",
+    "rice",
+    "pasta",
+    "bread",
+    "cereal",
+    "cereals",
+    "gluten",
+    "wheat",
+    "barley",
+    "rye",
+    "malt",
+    "flour",
+    "noodle",
+    "noodles",
+    "oat",
+    "oats",
+    "oatmeal",
+    "yogurt",
+    "yoghurt",
+    "milk",
+    "cheese",
+    "egg",
+    "eggs",
+    "chicken",
+    "beef",
+    "pork",
+    "fish",
+    "salmon",
+    "tuna",
+    "sushi",
+    "sashimi",
+    "tofu",
+    "beans",
+    "lentils",
+    "nuts",
+    "almonds",
+    "smoothie",
+    "smoothies",
+    "juice",
+    "water",
+    "coffee",
+    "tea",
+    "ice cream",
+    "pizza",
+    "burger",
+    "hamburger",
+]
+
+LIFESTYLE_TERMS = [
+    "exercise",
+    "gym",
+    "workout",
+    "workouts",
+    "walking",
+    "hydration",
+    "sleep and diet",
+]
+
+SENSITIVITY_KEYWORDS = [
+    "allergy",
+    "allergies",
+    "allergic",
+    "intolerance",
+    "intolerant",
+]
+
+COMMON_FOOD_ALLERGENS = [
+    "peanut",
+    "nut",
+    "milk",
+    "dairy",
+    "egg",
+    "soy",
+    "sesame",
+    "fish",
+    "shellfish",
+    "lactose",
+]
+
+CONSUMPTION_PATTERNS = [
+    r"\b(should|can)\s+i\s+(eat|drink|have)\s+[\w\s-]+\b",
+    r"\b(is|are)\s+[\w\s-]+\s+(ok|okay|safe)\s+to\s+(eat|drink|have)\b",
+]
+
+FOOD_HEALTH_PATTERNS = [
+    r"\b(is|are)\s+[\w\s-]+\s+(healthy|good for (my|your|our)?\s*health)\b",
+    r"\b(benefits?|nutrition facts?|nutritional value)\s+of\s+[\w\s-]+\b",
+    r"\bwhat\s+(are|is)\s+the\s+(benefits?|nutrition|nutrients?)\s+of\s+[\w\s-]+\b",
+    r"\bhow\s+(healthy|nutritious)\s+is\s+[\w\s-]+\b",
+]
+
+
+def _trie_alternation(terms: List[str]) -> str:
+    """Render terms as a prefix-factored alternation so each position branches on one character."""
+    root: Dict[str, dict] = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict[str, dict]) -> str:
+        is_term_end = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_term_end:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if is_term_end else group
+
+    return render(root)
+
+
+def _compile_terms(terms: List[str]) -> "re.Pattern[str]":
+    """Match any whole term, same as a word-bounded re.search per term."""
+    return re.compile(rf"\b(?:{_trie_alternation(terms)})\b")
+
+
+def _compile_any(patterns: List[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+
+# Compiled once at import; the guard runs on every chat message.
+_SOCIAL_RE = _compile_any(SOCIAL_PATTERNS)
+_DOMAIN_TERMS_RE = _compile_terms(NUTRITION_KEYWORDS + FOOD_TERMS + LIFESTYLE_TERMS)
+_FOOD_TERMS_RE = _compile_terms(FOOD_TERMS)
+_SENSITIVITY_RE = _compile_terms(SENSITIVITY_KEYWORDS)
+_FOOD_ALLERGEN_RE = _compile_terms(COMMON_FOOD_ALLERGENS)
+_CONSUMPTION_RE = _compile_any(CONSUMPTION_PATTERNS)
+_FOOD_HEALTH_RE = _compile_any(FOOD_HEALTH_PATTERNS)
+
+
+def _query_in_slot(query: Callable[..., Any], **kwargs: Any) -> Any:
+    try:
+        return query(**kwargs)
+    finally:
+        _CHROMA_QUERY_SLOTS.release()
+
+
+def _set_chroma_http_timeout(client, timeout) -> None:
+    # chromadb builds its httpx session with timeout=None and has no setting for
+    # it, so a stalled request would otherwise never return.
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is None or not hasattr(session, "timeout"):
+        logger.warning("Could not set a timeout on the Chroma HTTP client; requests are unbounded.")
+        return
+    session.timeout = timeout
+
 
 class GroqChromaBackend:
     def __init__(
         self,
         collection_name: Optional[str] = None,
         settings: Optional[ActiveAISettings] = None,
+        embedding_function: Optional[Callable[[List[str]], Any]] = None,
     ):
         self.settings = settings or ActiveAISettings()
         self.collection_name = collection_name or self.settings.rag_collection
+        # Embeds queries for the embedding cache; collections this backend opens are opened with it.
+        self._embedding_function = embedding_function
         self._groq_client = None
+        self._async_groq_client = None
+        self._async_groq_loop = None
         self._collection = None
+        self._local_index = None
+        self._local_index_loaded = False
+        self._local_failovers = 0
+        self._lexical_index = BM25Index()
+        self._lexical_index_loaded = False
+        self._lexical_promotions = 0
+        self._context_stats = {"requests": 0, "original_tokens": 0, "tokens": 0, "tokens_saved": 0}
+        self._speculation = {"launched": 0, "used": 0, "discarded": 0, "saved_seconds": 0.0, "extra_tokens": 0}
         self._count = None
+        # Last process-wide collection version this instance's count and caches were built against.
+        self._seen_collection_version = shared_version("chroma_collection", self._collection_key())
+        self._embedding_cache = TTLCache(
+            max_size=self.settings.retrieval_cache_size,
+            ttl_seconds=self.settings.retrieval_cache_ttl_seconds,
+        )
+        self._retrieval_cache = TTLCache(
+            max_size=self.settings.retrieval_cache_size,
+            ttl_seconds=self.settings.retrieval_cache_ttl_seconds,
+        )
+        # Identical concurrent completions/retrievals share one upstream call.
+        self._inflight = SingleFlight()
+        self._ainflight = AsyncSingleFlight()
+        # Distinct concurrent retrievals arriving within the window share one multi-query Chroma call.
+        self._query_batcher = MicroBatcher(
+            self._run_query_batch,
+            window_seconds=self.settings.rag_batch_window_ms / 1000,
+            max_batch=self.settings.rag_batch_max_size,
+            name="retrieval",
+            wait_stage="retrieval_batch_wait",
+        )
+        self._aquery_batcher = AsyncMicroBatcher(
+            self._arun_query_batch,
+            window_seconds=self.settings.rag_batch_window_ms / 1000,
+            max_batch=self.settings.rag_batch_max_size,
+            name="retrieval",
+            wait_stage="retrieval_batch_wait",
+        )
+        self._model_router = ModelRouter(
+            parse_routes(
+                self.settings.groq_model_routes,
+                default_routes(
+                    self.settings.groq_model,
+                    self.settings.groq_structured_model,
+                    tuned=self.settings.groq_tuned_routes,
+                ),
+            )
+        )
+        self._response_cache = ResponseCache(
+            max_size=self.settings.response_cache_size,
+            ttl_seconds=self.settings.response_cache_ttl_seconds,
+            similarity_threshold=self.settings.response_cache_similarity,
+            embed_fn=self._embed_texts,
+        )
 
     def _chat_unavailable_reason(self) -> str:
         missing = self.settings.missing_chat_env()
@@ -176,220 +768,53 @@ class GroqChromaBackend:
         clean = (prompt or "").strip().lower()
         if not clean:
             return False
-        social_patterns = [
-            r"^(hi|hello|hey|good morning|good afternoon|good evening)\b",
-            r"^(thanks|thank you|thx)\b",
-            r"^(how are you|how are you doing)\b",
-        ]
-        return any(re.search(pattern, clean) for pattern in social_patterns)
+        return _SOCIAL_RE.search(clean) is not None
 
     def _is_nutrition_domain_prompt(self, prompt: str) -> bool:
         clean = (prompt or "").strip().lower()
         if not clean:
             return False
 
-        nutrition_keywords = [
-            "nutrition",
-            "nutrient",
-            "nutrients",
-            "calorie",
-            "calories",
-            "protein",
-            "carb",
-            "carbs",
-            "carbohydrate",
-            "carbohydrates",
-            "fat",
-            "fats",
-            "fibre",
-            "fiber",
-            "vitamin",
-            "vitamins",
-            "mineral",
-            "minerals",
-            "iron",
-            "calcium",
-            "sodium",
-            "cholesterol",
-            "salt",
-            "sugar",
-            "food",
-            "foods",
-            "meal",
-            "meals",
-            "meal plan",
-            "meal planning",
-            "diet",
-            "dietary",
-            "healthy eating",
-            "weight loss",
-            "weight gain",
-            "breakfast",
-            "lunch",
-            "dinner",
-            "snack",
-            "snacks",
-            "recipe",
-            "recipes",
-            "ingredient",
-            "ingredients",
-            "serving",
-            "portion",
-            "scan",
-            "dish",
-            "older adults",
-            "seniors",
-            "hydration",
-            "water intake",
-            "diabetes",
-            "blood pressure",
-            "vegan",
-            "vegetarian",
-            "keto",
-            "low-carb",
-            "high-protein",
-            "gluten-free",
-            "dairy-free",
-            "lactose-free",
-            "nut-free",
-            "allergen",
-            "allergens",
-            "coeliac",
-            "celiac",
-        ]
-
-        food_terms = [
-            "fruit",
-            "fruits",
-            "vegetable",
-            "vegetables",
-            "berry",
-            "berries",
-            "strawberry",
-            "strawberries",
-            "apple",
-            "apples",
-            "banana",
-            "bananas",
-            "orange",
-            "oranges",
-            "grape",
-            "grapes",
-            "avocado",
-            "avocados",
-            "broccoli",
-            "carrot",
-            "carrots",
-            "spinach",
-            "salad",
-            "salads",
-            "rice",
-            "pasta",
-            "bread",
-            "cereal",
-            "cereals",
-            "gluten",
-            "wheat",
-            "barley",
-            "rye",
-            "malt",
-            "flour",
-            "noodle",
-            "noodles",
-            "oat",
-            "oats",
-            "oatmeal",
-            "yogurt",
-            "yoghurt",
-            "milk",
-            "cheese",
-            "egg",
-            "eggs",
-            "chicken",
-            "beef",
-            "pork",
-            "fish",
-            "salmon",
-            "tuna",
-            "sushi",
-            "sashimi",
-            "tofu",
-            "beans",
-            "lentils",
-            "nuts",
-            "almonds",
-            "smoothie",
-            "smoothies",
-            "juice",
-            "water",
-            "coffee",
-            "tea",
-            "ice cream",
-            "pizza",
-            "burger",
-            "hamburger",
-        ]
-
-        lifestyle_terms = [
-            "exercise",
-            "gym",
-            "workout",
-            "workouts",
-            "walking",
-            "hydration",
-            "sleep and diet",
-        ]
-
-        def has_term(terms: List[str]) -> bool:
-            return any(re.search(rf"\b{re.escape(term)}\b", clean) for term in terms)
-
-        if has_term(nutrition_keywords) or has_term(food_terms) or has_term(lifestyle_terms):
+        if _DOMAIN_TERMS_RE.search(clean):
             return True
 
-        sensitivity_keywords = [
-            "allergy",
-            "allergies",
-            "allergic",
-            "intolerance",
-            "intolerant",
-        ]
-        common_food_allergens = [
-            "peanut",
-            "nut",
-            "milk",
-            "dairy",
-            "egg",
-            "soy",
-            "sesame",
-            "fish",
-            "shellfish",
-            "lactose",
-        ]
-        if has_term(sensitivity_keywords) and has_term(common_food_allergens):
+        if _SENSITIVITY_RE.search(clean) and _FOOD_ALLERGEN_RE.search(clean):
             return True
 
-        consumption_patterns = [
-            r"\b(should|can)\s+i\s+(eat|drink|have)\s+[\w\s-]+\b",
-            r"\b(is|are)\s+[\w\s-]+\s+(ok|okay|safe)\s+to\s+(eat|drink|have)\b",
-        ]
-        if any(re.search(pattern, clean) for pattern in consumption_patterns):
+        if _CONSUMPTION_RE.search(clean):
             return True
 
-        food_health_patterns = [
-            r"\b(is|are)\s+[\w\s-]+\s+(healthy|good for (my|your|our)?\s*health)\b",
-            r"\b(benefits?|nutrition facts?|nutritional value)\s+of\s+[\w\s-]+\b",
-            r"\bwhat\s+(are|is)\s+the\s+(benefits?|nutrition|nutrients?)\s+of\s+[\w\s-]+\b",
-            r"\bhow\s+(healthy|nutritious)\s+is\s+[\w\s-]+\b",
-        ]
-        return has_term(food_terms) and any(re.search(pattern, clean) for pattern in food_health_patterns)
+        return bool(_FOOD_TERMS_RE.search(clean) and _FOOD_HEALTH_RE.search(clean))
+
+    def _domain_guard_class(self, prompt: str) -> Optional[str]:
+        """Route class of an allowed prompt (SOCIAL or DOMAIN_CHAT), or None when the guard redirects it.
+
+        Callers hand it to chat() as `prompt_class`, so the prompt is classified once per request.
+        """
+        with stage("domain_guard"):
+            if self._is_social_prompt(prompt):
+                verdict = "social"
+                prompt_class = DOMAIN_CHAT if self._is_nutrition_domain_prompt(prompt) else SOCIAL
+            elif self._is_nutrition_domain_prompt(prompt):
+                verdict, prompt_class = "in_domain", DOMAIN_CHAT
+            else:
+                verdict, prompt_class = "redirected", None
+        annotate("domain_guard", verdict)
+        if prompt_class is None:
+            logger.info("Domain guard redirected out-of-scope prompt")
+        return prompt_class
 
     def _chat_with_domain_guard(self, prompt: str, model: Optional[str] = None) -> str:
-        if self._is_social_prompt(prompt):
-            return self.chat(prompt, model=model, system_prompt=DOMAIN_CHAT_SYSTEM_PROMPT)
-        if not self._is_nutrition_domain_prompt(prompt):
-            logger.info("Domain guard redirected out-of-scope prompt")
+        prompt_class = self._domain_guard_class(prompt)
+        if prompt_class is None:
             return self._domain_redirect_reply()
-        return self.chat(prompt, model=model, system_prompt=DOMAIN_CHAT_SYSTEM_PROMPT)
+        return self.chat(prompt, model=model, system_prompt=DOMAIN_CHAT_SYSTEM_PROMPT, prompt_class=prompt_class)
+
+    async def _achat_with_domain_guard(self, prompt: str, model: Optional[str] = None) -> str:
+        prompt_class = self._domain_guard_class(prompt)
+        if prompt_class is None:
+            return self._domain_redirect_reply()
+        return await self.achat(prompt, model=model, system_prompt=DOMAIN_CHAT_SYSTEM_PROMPT, prompt_class=prompt_class)
 
     def _get_groq_client(self):
         if self._groq_client is not None:
@@ -404,53 +829,223 @@ class GroqChromaBackend:
             logger.warning("Missing Groq configuration: %s", ", ".join(missing))
             return None
 
+        self._groq_client = get_shared("groq", self.settings.groq_client_key(), self._build_groq_client)
+        return self._groq_client
+
+    def _build_groq_client(self):
+        # The SDK would otherwise retry 429s and 5xx itself, behind the scheduler's rate limit and breaker.
         try:
-            self._groq_client = Groq(api_key=self.settings.groq_api_key)
+            return Groq(
+                api_key=self.settings.groq_api_key,
+                base_url=self.settings.groq_base_url,
+                max_retries=0,
+                **self._groq_http_options(get_http_client),
+            )
         except Exception as exc:
             logger.error("Failed to initialize Groq client: %s", exc)
-            self._groq_client = None
-        return self._groq_client
+            return None
 
-    def _chat_via_http(
+    def _groq_http_options(self, get_client) -> Dict[str, Any]:
+        """Route a Groq SDK client through the shared keep-alive pool when httpx is available."""
+        config = self.settings.http_pool_config()
+        http_client = get_client(config)
+        if http_client is None:
+            return {"timeout": config.read_timeout}
+        return {"http_client": http_client, "timeout": config.timeout()}
+
+    def _get_async_groq_client(self):
+        # The pooled async transport belongs to one event loop; rebuild if the loop changed.
+        loop = asyncio.get_running_loop()
+        if self._async_groq_client is not None and (self._async_groq_loop is None or self._async_groq_loop() is loop):
+            return self._async_groq_client
+
+        if not AsyncGroq:
+            logger.warning("groq AsyncGroq import failed; will attempt async HTTP fallback if API key is configured.")
+            return None
+
+        missing = self.settings.missing_chat_env()
+        if missing:
+            logger.warning("Missing Groq configuration: %s", ", ".join(missing))
+            return None
+
+        self._async_groq_client = get_loop_shared("async_groq", self.settings.groq_client_key(), self._build_async_groq_client)
+        self._async_groq_loop = weakref.ref(loop) if self._async_groq_client is not None else None
+        return self._async_groq_client
+
+    def _build_async_groq_client(self):
+        try:
+            return AsyncGroq(
+                api_key=self.settings.groq_api_key,
+                base_url=self.settings.groq_base_url,
+                max_retries=0,
+                **self._groq_http_options(get_async_http_client),
+            )
+        except Exception as exc:
+            logger.error("Failed to initialize async Groq client: %s", exc)
+            return None
+
+    def warm_up_http_pool(self) -> int:
+        """Open pooled connections to Groq ahead of the first request (sync clients)."""
+        if not self.settings.http_warm_up or self.settings.missing_chat_env():
+            return 0
+        return warm_up(self.settings.http_pool_config(), [self.settings.groq_base_url])
+
+    async def awarm_up_http_pool(self) -> int:
+        if not self.settings.http_warm_up or self.settings.missing_chat_env():
+            return 0
+        config = self.settings.http_pool_config()
+        warmed = await awarm_up(config, [self.settings.groq_base_url])
+        warmed += await asyncio.to_thread(warm_up, config, [self.settings.groq_base_url])
+        logger.info("Warmed %s pooled Groq connection(s)", warmed)
+        return warmed
+
+    async def awarm_up(self) -> Dict[str, Any]:
+        """Startup hook: open the pooled Groq connections and the shared Groq client and Chroma collection."""
+        warmed = await self.awarm_up_http_pool()
+        groq_ready = self._get_groq_client() is not None
+        count = await self.acollection_count()
+        logger.info("Shared clients ready (groq=%s, collection=%s, documents=%s)", groq_ready, self.collection_name, count)
+        return {"http_connections": warmed, "groq_client": groq_ready, "documents": count}
+
+    def _build_messages(self, prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return messages
+
+    def _http_chat_request(
         self,
         prompt: str,
         model: Optional[str] = None,
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
-    ) -> str:
+        max_tokens: Optional[int] = None,
+    ) -> tuple[Dict[str, Any], Dict[str, str]]:
         model_name = model or self.settings.groq_model
         temp = self.settings.groq_temperature if temperature is None else temperature
-        messages = [{"role": "user", "content": prompt}]
-        if system_prompt:
-            messages.insert(0, {"role": "system", "content": system_prompt})
         payload = {
-            "messages": messages,
+            "messages": self._build_messages(prompt, system_prompt),
             "model": model_name,
             "temperature": temp,
             "top_p": self.settings.groq_top_p,
         }
-        req = urllib_request.Request(
-            url="https://api.groq.com/openai/v1/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "Authorization": f"Bearer {self.settings.groq_api_key}",
-                "Content-Type": "application/json",
-            },
-            method="POST",
-        )
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        headers = {
+            "Authorization": f"Bearer {self.settings.groq_api_key}",
+            "Content-Type": "application/json",
+        }
+        return payload, headers
+
+    def _groq_scheduler(self) -> GroqScheduler:
+        """Process-wide rate limiter / circuit breaker shared by every Groq call."""
+        return get_scheduler(self.settings.resilience_config())
+
+    def _should_retry_over_http(self, exc: Exception) -> bool:
+        # Retrying a refused or rate-limited call over another transport only adds load.
+        if isinstance(exc, GroqUnavailableError) or is_rate_limit_error(exc):
+            return False
+        return not self.settings.missing_chat_env()
+
+    def _groq_chat_url(self) -> str:
+        return f"{self.settings.groq_base_url}{GROQ_CHAT_COMPLETIONS_PATH}"
+
+    def _post_chat_http(
+        self,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        http_client = get_http_client(self.settings.http_pool_config())
+        if http_client is not None:
+            kwargs = {"timeout": timeout} if timeout else {}
+            resp = http_client.post(self._groq_chat_url(), json=payload, headers=headers, **kwargs)
+            if resp.status_code >= 400:
+                raise GroqHTTPError(resp.status_code, resp.text)
+            response_data = resp.json()
+        else:
+            req = urllib_request.Request(
+                url=self._groq_chat_url(),
+                data=json.dumps(payload).encode("utf-8"),
+                headers=headers,
+                method="POST",
+            )
+            try:
+                with urllib_request.urlopen(req, timeout=timeout or self.settings.http_read_timeout_seconds) as resp:
+                    response_data = json.loads(resp.read().decode("utf-8"))
+            except urllib_error.HTTPError as exc:
+                body = exc.read().decode("utf-8", errors="ignore") if hasattr(exc, "read") else ""
+                raise GroqHTTPError(exc.code, body) from exc
+        return response_data.get("choices", [{}])[0].get("message", {}).get("content")
 
+    def _chat_via_http(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        route: Optional[RouteDecision] = None,
+    ) -> str:
+        max_tokens = route.max_tokens if route else None
+        timeout = route.timeout if route else None
+        payload, headers = self._http_chat_request(prompt, model, system_prompt, temperature, max_tokens)
         try:
-            with urllib_request.urlopen(req, timeout=30) as resp:
-                response_data = json.loads(resp.read().decode("utf-8"))
-            return response_data.get("choices", [{}])[0].get("message", {}).get("content") or _safe_reply()
-        except urllib_error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="ignore") if hasattr(exc, "read") else ""
-            logger.error("Groq HTTP fallback failed with status %s: %s", exc.code, body)
+            with stage("llm_http"):
+                return self._groq_scheduler().call(self._post_chat_http, payload, headers, timeout) or _safe_reply()
+        except GroqUnavailableError as exc:
+            logger.warning("Groq HTTP fallback not attempted: %s", exc)
+            return _safe_reply()
+        except GroqHTTPError as exc:
+            logger.error("Groq HTTP fallback failed with %s", exc)
             return _safe_reply()
         except Exception as exc:
             logger.error("Groq HTTP fallback request failed: %s", exc)
             return _safe_reply()
 
+    async def _apost_chat_http(
+        self,
+        http_client,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        kwargs = {"timeout": timeout} if timeout else {}
+        resp = await http_client.post(self._groq_chat_url(), json=payload, headers=headers, **kwargs)
+        if resp.status_code >= 400:
+            raise GroqHTTPError(resp.status_code, resp.text)
+        return resp.json().get("choices", [{}])[0].get("message", {}).get("content")
+
+    async def _achat_via_http(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        route: Optional[RouteDecision] = None,
+    ) -> str:
+        http_client = get_async_http_client(self.settings.http_pool_config())
+        if http_client is None:
+            return await asyncio.to_thread(self._chat_via_http, prompt, model, system_prompt, temperature, route)
+
+        max_tokens = route.max_tokens if route else None
+        timeout = route.timeout if route else None
+        payload, headers = self._http_chat_request(prompt, model, system_prompt, temperature, max_tokens)
+        try:
+            with stage("llm_http"):
+                content = await self._groq_scheduler().acall(
+                    self._apost_chat_http, http_client, payload, headers, timeout
+                )
+            return content or _safe_reply()
+        except GroqUnavailableError as exc:
+            logger.warning("Groq async HTTP fallback not attempted: %s", exc)
+            return _safe_reply()
+        except GroqHTTPError as exc:
+            logger.error("Groq async HTTP fallback failed with %s", exc)
+            return _safe_reply()
+        except Exception as exc:
+            logger.error("Groq async HTTP fallback request failed: %s", exc)
+            return _safe_reply()
+
     def _build_chroma_client(self):
         if not chromadb:
             logger.warning("chromadb import failed; active RAG backend unavailable.")
@@ -461,30 +1056,284 @@ class GroqChromaBackend:
             if missing:
                 logger.warning("Missing Chroma Cloud configuration: %s", ", ".join(missing))
                 return None
-            return chromadb.CloudClient(
+            client = chromadb.CloudClient(
                 tenant=self.settings.chroma_tenant,
                 database=self.settings.chroma_database,
                 api_key=self.settings.chroma_api_key,
             )
+            if self.settings.chroma_http_timeout_seconds > 0 and httpx is not None:
+                _set_chroma_http_timeout(
+                    client,
+                    httpx.Timeout(self.settings.chroma_http_timeout_seconds, connect=self.settings.http_connect_timeout_seconds),
+                )
+            return client
 
         return chromadb.PersistentClient(path=self.settings.chroma_path)
 
+    async def _abuild_chroma_client(self):
+        # Only Chroma Cloud has an async HTTP client; local PersistentClient
+        # queries are offloaded to a worker thread instead.
+        if not chromadb or not hasattr(chromadb, "AsyncHttpClient"):
+            return None
+        if self.settings.chroma_mode.lower() != "cloud":
+            return None
+
+        missing = self.settings.missing_chroma_env()
+        if missing:
+            logger.warning("Missing Chroma Cloud configuration: %s", ", ".join(missing))
+            return None
+        return await chromadb.AsyncHttpClient(
+            host=CHROMA_CLOUD_HOST,
+            port=443,
+            ssl=True,
+            tenant=self.settings.chroma_tenant,
+            database=self.settings.chroma_database,
+            headers={"x-chroma-token": self.settings.chroma_api_key},
+        )
+
+    def _uses_local_index(self) -> bool:
+        return self.settings.chroma_mode.lower() == CHROMA_MODE_EMBEDDED_FAST
+
+    def _get_local_index(self) -> Optional[LocalVectorIndex]:
+        if self._local_index_loaded:
+            return self._local_index
+        self._local_index_loaded = True
+
+        snapshot = Path(self.settings.chroma_snapshot_path)
+        if not (snapshot / MANIFEST_FILE).is_file():
+            logger.warning("No local vector snapshot found at %s", snapshot)
+            return None
+        self._local_index = get_shared("local_index", str(snapshot.resolve()), lambda: self._load_local_index(snapshot))
+        return self._local_index
+
+    def _load_local_index(self, snapshot: Path) -> Optional[LocalVectorIndex]:
+        try:
+            return LocalVectorIndex.load(str(snapshot))
+        except Exception as exc:
+            logger.error("Failed to load local vector snapshot from %s: %s", snapshot, exc)
+            return None
+
+    def _failover_index(self, collection) -> Optional[LocalVectorIndex]:
+        """Local snapshot to answer from when a remote query overruns its latency budget."""
+        if self.settings.rag_cloud_latency_budget_ms <= 0 or isinstance(collection, LocalVectorIndex):
+            return None
+        return self._get_local_index()
+
+    def _collection_key(self) -> tuple:
+        return (*self.settings.chroma_client_key(), self.collection_name)
+
     def _get_collection(self):
         if self._collection is not None:
             return self._collection
 
-        client = self._build_chroma_client()
+        if self._uses_local_index():
+            self._collection = self._get_local_index()
+            if self._embedding_function is None and self._collection is not None:
+                self._embedding_function = self._collection.embedding_function
+            return self._collection
+
+        self._collection = get_shared("chroma_collection", self._collection_key(), self._open_collection)
+        return self._collection
+
+    def _open_collection(self):
+        client = get_shared("chroma_client", self.settings.chroma_client_key(), self._build_chroma_client)
         if client is None:
             return None
 
         try:
-            self._collection = client.get_or_create_collection(name=self.collection_name)
+            return client.get_or_create_collection(name=self.collection_name, **self._collection_options())
         except Exception as exc:
             logger.error("Failed to initialize Chroma collection '%s': %s", self.collection_name, exc)
-            self._collection = None
-        return self._collection
+            return None
+
+    async def _aget_collection(self):
+        # Loop-bound handles: a backend shared across event loops must not keep another loop's collection.
+        return await aget_shared("async_chroma_collection", self._collection_key(), self._aopen_collection)
+
+    async def _aopen_collection(self):
+        try:
+            client = await aget_shared("async_chroma_client", self.settings.chroma_client_key(), self._abuild_chroma_client)
+            if client is None:
+                return None
+            return await client.get_or_create_collection(name=self.collection_name, **self._collection_options())
+        except Exception as exc:
+            logger.error("Failed to initialize async Chroma collection '%s': %s", self.collection_name, exc)
+            return None
+
+    def _collection_options(self) -> Dict[str, Any]:
+        """Open collections with this backend's embedding function (Chroma's default unless one was given)."""
+        if self._embedding_function is None and DefaultEmbeddingFunction is not None:
+            self._embedding_function = get_shared("embedding_function", "default", DefaultEmbeddingFunction)
+        if self._embedding_function is None:
+            return {}
+        return {"embedding_function": self._embedding_function}
+
+    def _embed_texts(self, texts: List[str], collection=None) -> Optional[List[List[float]]]:
+        if self._embedding_function is None and collection is None:
+            # Opening the collection settles which embedding function it uses.
+            self._get_collection()
+        if self._embedding_function is None:
+            return None
+        return [[float(value) for value in vector] for vector in self._embedding_function(texts)]
+
+    def _query_embeddings(self, queries: List[str], collection=None) -> Optional[List[List[float]]]:
+        """Embeddings for `queries` (one embedding call for any not cached yet), or None to let Chroma embed."""
+        embeddings = {query: self._embedding_cache.get((self.collection_name, query)) for query in queries}
+        missing = [query for query, embedding in embeddings.items() if embedding is None]
+        if missing:
+            try:
+                embedded = self._embed_texts(missing, collection=collection)
+            except Exception as exc:
+                logger.warning("Query embedding failed; letting Chroma embed the query: %s", exc)
+                return None
+            if not embedded or len(embedded) != len(missing):
+                return None
+            for query, embedding in zip(missing, embedded):
+                self._embedding_cache.set((self.collection_name, query), embedding)
+                embeddings[query] = embedding
+        return [embeddings[query] for query in queries]
+
+    def _query_kwargs(self, queries: List[str], collection) -> Dict[str, Any]:
+        embeddings = self._query_embeddings(queries, collection=collection)
+        kwargs: Dict[str, Any] = {"query_embeddings": embeddings} if embeddings is not None else {"query_texts": list(queries)}
+        if self.settings.rag_metadata_filter:
+            kwargs["where"] = RETRIEVABLE_CHUNK_FILTER
+        return kwargs
+
+    def _fetch_limit(self, limit: int) -> int:
+        """Candidates to request: exact with the ingest-time metadata filter, otherwise 3x to survive dedupe and meta filtering."""
+        if self.settings.rag_metadata_filter:
+            return limit
+        return max(limit, limit * 3)
+
+    def _log_failover(self, reason: str) -> None:
+        self._local_failovers += 1
+        logger.warning("Chroma query %s; answering from local snapshot instead.", reason)
+
+    def _query_collection(self, collection, query: str, n_results: int) -> Dict[str, Any]:
+        return self._query_collection_many(collection, [query], n_results)
+
+    def _query_collection_many(self, collection, queries: List[str], n_results: int) -> Dict[str, Any]:
+        """One `collection.query` for every query; result lists are indexed like `queries`."""
+        kwargs = self._query_kwargs(queries, collection)
+        failover = self._failover_index(collection)
+        if failover is None:
+            return collection.query(n_results=n_results, **kwargs)
+
+        if not _CHROMA_QUERY_SLOTS.acquire(blocking=False):
+            self._log_failover("skipped: every query worker is busy")
+            return failover.query(n_results=n_results, **kwargs)
+
+        # A free slot means a free worker, so the budget runs from submit, not from a queue.
+        budget = self.settings.rag_cloud_latency_budget_ms / 1000
+        future = _CHROMA_QUERY_EXECUTOR.submit(_query_in_slot, collection.query, n_results=n_results, **kwargs)
+        try:
+            return future.result(timeout=budget)
+        except FutureTimeoutError:
+            self._log_failover(f"exceeded {self.settings.rag_cloud_latency_budget_ms:.0f}ms budget")
+        except Exception as exc:
+            self._log_failover(f"failed ({exc})")
+        return failover.query(n_results=n_results, **kwargs)
+
+    async def _aquery_collection(self, query: str, n_results: int) -> Optional[Dict[str, Any]]:
+        return await self._aquery_collection_many([query], n_results)
+
+    async def _aquery_collection_many(self, queries: List[str], n_results: int) -> Optional[Dict[str, Any]]:
+        collection = await self._aget_collection()
+        if collection is not None:
+            kwargs = await asyncio.to_thread(self._query_kwargs, queries, collection)
+            failover = await asyncio.to_thread(self._failover_index, collection)
+            if failover is None:
+                return await collection.query(n_results=n_results, **kwargs)
+
+            budget = self.settings.rag_cloud_latency_budget_ms / 1000
+            try:
+                return await asyncio.wait_for(collection.query(n_results=n_results, **kwargs), timeout=budget)
+            except asyncio.TimeoutError:
+                self._log_failover(f"exceeded {self.settings.rag_cloud_latency_budget_ms:.0f}ms budget")
+            except Exception as exc:
+                self._log_failover(f"failed ({exc})")
+            return await asyncio.to_thread(failover.query, n_results=n_results, **kwargs)
+
+        collection = self._get_collection()
+        if collection is None:
+            return None
+        return await asyncio.to_thread(self._query_collection_many, collection, queries, n_results)
+
+    def _split_query_batch(self, items: List[tuple], result: Optional[Dict[str, Any]], queries: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if result is None:
+            return [None] * len(items)
+        documents = result.get("documents") or []
+        distances = result.get("distances") or []
+        split: List[Optional[Dict[str, Any]]] = []
+        for query, n_results in items:
+            index = queries.index(query)
+            split.append(
+                {
+                    "documents": [list(documents[index][:n_results]) if index < len(documents) else []],
+                    "distances": [list(distances[index][:n_results]) if index < len(distances) else []],
+                }
+            )
+        return split
+
+    def _run_query_batch(self, items: List[tuple]) -> List[Optional[Dict[str, Any]]]:
+        """Answer `(query, n_results)` items with one `collection.query`, shaped like `_query_collection` per item."""
+        collection = self._get_collection()
+        if collection is None:
+            return [None] * len(items)
+        if len(items) == 1:
+            query, n_results = items[0]
+            return [self._query_collection(collection, query, n_results)]
+        queries = list(dict.fromkeys(query for query, _ in items))
+        result = self._query_collection_many(collection, queries, max(n for _, n in items))
+        return self._split_query_batch(items, result, queries)
+
+    async def _arun_query_batch(self, items: List[tuple]) -> List[Optional[Dict[str, Any]]]:
+        if len(items) == 1:
+            query, n_results = items[0]
+            return [await self._aquery_collection(query, n_results)]
+        queries = list(dict.fromkeys(query for query, _ in items))
+        result = await self._aquery_collection_many(queries, max(n for _, n in items))
+        return self._split_query_batch(items, result, queries)
+
+    def _batched_query(self, query: str, n_results: int) -> Optional[Dict[str, Any]]:
+        return self._query_batcher.submit((query, n_results))
+
+    async def _abatched_query(self, query: str, n_results: int) -> Optional[Dict[str, Any]]:
+        return await self._aquery_batcher.submit((query, n_results))
+
+    def _retrieval_cache_key(self, kind: str, query: str, n_results: int) -> tuple:
+        return (self.collection_name, self._collection_version(), kind, query, n_results)
+
+    def _collection_version(self) -> int:
+        """Process-wide version of this collection's contents.
+
+        Ingests and backfills through any backend instance bump it in the client
+        registry; an instance that sees a newer version than its caches were built
+        against drops them, including the lexical index it loaded from Chroma.
+        """
+        version = shared_version("chroma_collection", self._collection_key())
+        if version != self._seen_collection_version:
+            self._seen_collection_version = version
+            self._drop_collection_caches()
+            self._lexical_index_loaded = False
+        return version
+
+    def _drop_collection_caches(self) -> None:
+        self._count = None
+        self._retrieval_cache.clear()
+        self._response_cache.invalidate()
+
+    def invalidate_collection_caches(self) -> None:
+        """Drop cached counts, retrievals and answers after the collection changes (ingest or rebuild).
+
+        Other backend instances on the same collection drop theirs on next use.
+        """
+        self._seen_collection_version = bump_shared_version("chroma_collection", self._collection_key())
+        self._drop_collection_caches()
 
     def collection_count(self) -> int:
+        self._collection_version()
         if self._count is not None:
             return self._count
 
@@ -500,19 +1349,105 @@ class GroqChromaBackend:
             self._count = 0
         return self._count
 
+    async def acollection_count(self) -> int:
+        self._collection_version()
+        if self._count is not None:
+            return self._count
+
+        collection = await self._aget_collection()
+        if collection is None:
+            return await asyncio.to_thread(self.collection_count)
+
+        try:
+            self._count = await collection.count()
+        except Exception as exc:
+            logger.error("Failed to count Chroma documents: %s", exc)
+            self._count = 0
+        return self._count
+
+    def _classify_prompt(self, prompt: str, system_prompt: Optional[str]) -> str:
+        if system_prompt == GROUNDING_SYSTEM_PROMPT:
+            return GROUNDED_RAG
+        if self._is_social_prompt(prompt) and not self._is_nutrition_domain_prompt(prompt):
+            return SOCIAL
+        return DOMAIN_CHAT
+
+    def _route(
+        self,
+        prompt: str,
+        model: Optional[str],
+        system_prompt: Optional[str],
+        prompt_class: Optional[str] = None,
+    ) -> RouteDecision:
+        return self._model_router.route(prompt_class or self._classify_prompt(prompt, system_prompt), model)
+
+    @staticmethod
+    def _route_options(route: RouteDecision) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if route.timeout:
+            options["timeout"] = route.timeout
+        if route.max_tokens:
+            options["max_tokens"] = route.max_tokens
+        return options
+
     def chat(
         self,
         prompt: str,
         model: Optional[str] = None,
         system_prompt: Optional[str] = None,
         temperature: Optional[float] = None,
+        prompt_class: Optional[str] = None,
     ) -> str:
-        client = self._get_groq_client()
-        model_name = model or self.settings.groq_model
+        return self._chat_routed(prompt, model, system_prompt, temperature, prompt_class)[0]
+
+    def _chat_routed(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        prompt_class: Optional[str] = None,
+    ) -> tuple[str, str]:
+        """`chat`, also returning the model the router picked for the reply."""
         temp = self.settings.groq_temperature if temperature is None else temperature
-        messages = [{"role": "user", "content": prompt}]
-        if system_prompt:
-            messages.insert(0, {"role": "system", "content": system_prompt})
+        # Keyed on the request, not the route: the leader routes once for every caller that joins it.
+        key = ("chat", system_prompt, prompt, model, temp, prompt_class)
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check("llm")
+        return self._inflight.do(key, self._complete_chat, prompt, model, system_prompt, temp, prompt_class)
+
+    @staticmethod
+    def _within_deadline(route: RouteDecision, deadline: Deadline) -> RouteDecision:
+        """Cap the completion's HTTP timeout at the time left."""
+        return replace(route, timeout=max(0.001, deadline.timeout(route.timeout)))
+
+    def _leader_route(
+        self,
+        prompt: str,
+        model: Optional[str],
+        system_prompt: Optional[str],
+        prompt_class: Optional[str],
+    ) -> RouteDecision:
+        route = self._route(prompt, model, system_prompt, prompt_class)
+        deadline = current_deadline()
+        return route if deadline is None else self._within_deadline(route, deadline)
+
+    def _complete_chat(
+        self,
+        prompt: str,
+        model: Optional[str],
+        system_prompt: Optional[str],
+        temp: float,
+        prompt_class: Optional[str] = None,
+    ) -> tuple[str, str]:
+        route = self._leader_route(prompt, model, system_prompt, prompt_class)
+        return self._complete_routed(prompt, route, system_prompt, temp), route.model
+
+    def _complete_routed(self, prompt: str, route: RouteDecision, system_prompt: Optional[str], temp: float) -> str:
+        model_name = route.model
+        client = self._get_groq_client()
+        messages = self._build_messages(prompt, system_prompt)
 
         if client is None:
             missing = self.settings.missing_chat_env()
@@ -526,76 +1461,377 @@ class GroqChromaBackend:
                 model=model_name,
                 system_prompt=system_prompt,
                 temperature=temp,
+                route=route,
             )
 
         try:
-            response = client.chat.completions.create(
+            started = time.perf_counter()
+            response = self._groq_scheduler().call(
+                client.chat.completions.create,
                 messages=messages,
                 model=model_name,
                 temperature=temp,
                 top_p=self.settings.groq_top_p,
+                **self._route_options(route),
             )
+            elapsed = time.perf_counter() - started
+            self._model_router.observe(route.prompt_class, model_name, elapsed)
+            observe_stage("llm", elapsed)
+            record_tokens(model_name, getattr(response, "usage", None))
             content = response.choices[0].message.content
             if not content:
                 logger.warning("Groq chat response had empty content; returning safe reply.")
                 return _safe_reply()
             return content
+        except GroqUnavailableError as exc:
+            logger.warning("Groq chat not attempted for model=%s: %s", model_name, exc)
+            return _safe_reply()
         except Exception as exc:
             logger.error("Groq chat request failed for model=%s: %s", model_name, exc)
-            if not self.settings.missing_chat_env():
+            if self._should_retry_over_http(exc):
                 logger.info("Retrying chat via Groq HTTP fallback.")
                 return self._chat_via_http(
                     prompt=prompt,
                     model=model_name,
                     system_prompt=system_prompt,
                     temperature=temp,
+                    route=route,
                 )
             return _safe_reply()
 
-    def run_agent(self, prompt: str, model: Optional[str] = None) -> str:
-        return self._chat_with_domain_guard(prompt, model=model)
+    async def achat(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        prompt_class: Optional[str] = None,
+    ) -> str:
+        return (await self._achat_routed(prompt, model, system_prompt, temperature, prompt_class))[0]
 
-    async def run_agent_ws(self, prompt: str, model: Optional[str] = None) -> str:
-        return self._chat_with_domain_guard(prompt, model=model)
+    async def _achat_routed(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        prompt_class: Optional[str] = None,
+    ) -> tuple[str, str]:
+        temp = self.settings.groq_temperature if temperature is None else temperature
+        key = ("chat", system_prompt, prompt, model, temp, prompt_class)
+        flight = self._ainflight.do(key, self._acomplete_chat, prompt, model, system_prompt, temp, prompt_class)
+        deadline = current_deadline()
+        if deadline is None:
+            return await flight
+        # Cancelling our wait abandons the shared completion once no other caller needs it.
+        return await deadline.run(flight, "llm")
+
+    async def _acomplete_chat(
+        self,
+        prompt: str,
+        model: Optional[str],
+        system_prompt: Optional[str],
+        temp: float,
+        prompt_class: Optional[str] = None,
+    ) -> tuple[str, str]:
+        route = self._leader_route(prompt, model, system_prompt, prompt_class)
+        return await self._acomplete_routed(prompt, route, system_prompt, temp), route.model
+
+    async def _acomplete_routed(self, prompt: str, route: RouteDecision, system_prompt: Optional[str], temp: float) -> str:
+        model_name = route.model
+        client = self._get_async_groq_client()
+        messages = self._build_messages(prompt, system_prompt)
 
-    def retrieve(self, query: str, n_results: int = 4) -> List[str]:
-        collection = self._get_collection()
-        if collection is None:
-            return []
+        if client is None:
+            missing = self.settings.missing_chat_env()
+            if missing:
+                logger.error("Chat unavailable (%s)", self._chat_unavailable_reason())
+                return _safe_reply()
 
-        try:
-            if self.collection_count() == 0:
-                return []
-            result = collection.query(query_texts=[query], n_results=n_results)
-            return result.get("documents", [[]])[0]
-        except Exception as exc:
-            logger.error("Chroma query failed: %s", exc)
+            logger.info("Using async Groq HTTP fallback client for model=%s", model_name)
+            return await self._achat_via_http(
+                prompt=prompt,
+                model=model_name,
+                system_prompt=system_prompt,
+                temperature=temp,
+                route=route,
+            )
+
+        try:
+            started = time.perf_counter()
+            response = await self._groq_scheduler().acall(
+                client.chat.completions.create,
+                messages=messages,
+                model=model_name,
+                temperature=temp,
+                top_p=self.settings.groq_top_p,
+                **self._route_options(route),
+            )
+            elapsed = time.perf_counter() - started
+            self._model_router.observe(route.prompt_class, model_name, elapsed)
+            observe_stage("llm", elapsed)
+            record_tokens(model_name, getattr(response, "usage", None))
+            content = response.choices[0].message.content
+            if not content:
+                logger.warning("Groq chat response had empty content; returning safe reply.")
+                return _safe_reply()
+            return content
+        except GroqUnavailableError as exc:
+            logger.warning("Async Groq chat not attempted for model=%s: %s", model_name, exc)
+            return _safe_reply()
+        except Exception as exc:
+            logger.error("Async Groq chat request failed for model=%s: %s", model_name, exc)
+            if self._should_retry_over_http(exc):
+                logger.info("Retrying chat via async Groq HTTP fallback.")
+                return await self._achat_via_http(
+                    prompt=prompt,
+                    model=model_name,
+                    system_prompt=system_prompt,
+                    temperature=temp,
+                    route=route,
+                )
+            return _safe_reply()
+
+    async def astream_chat(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        prompt_class: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        route = self._route(prompt, model, system_prompt, prompt_class)
+        temp = self.settings.groq_temperature if temperature is None else temperature
+        async for delta in self._astream_routed(prompt, route, system_prompt, temp):
+            yield delta
+
+    async def _astream_routed(
+        self,
+        prompt: str,
+        route: RouteDecision,
+        system_prompt: Optional[str],
+        temp: float,
+    ) -> AsyncIterator[str]:
+        client = self._get_async_groq_client()
+        model_name = route.model
+
+        if client is None:
+            yield await self.achat(
+                prompt,
+                model=model_name,
+                system_prompt=system_prompt,
+                temperature=temp,
+                prompt_class=route.prompt_class,
+            )
+            return
+
+        try:
+            # Streams are not hedged: a duplicate stream cannot be merged with the first.
+            stream = await self._groq_scheduler().acall(
+                client.chat.completions.create,
+                hedge=False,
+                messages=self._build_messages(prompt, system_prompt),
+                model=model_name,
+                temperature=temp,
+                top_p=self.settings.groq_top_p,
+                stream=True,
+                **self._route_options(route),
+            )
+        except Exception as exc:
+            logger.error("Groq streaming request failed for model=%s: %s", model_name, exc)
+            if not self._should_retry_over_http(exc):
+                yield _safe_reply()
+                return
+            logger.info("Retrying chat via async Groq HTTP fallback.")
+            yield await self._achat_via_http(
+                prompt=prompt,
+                model=model_name,
+                system_prompt=system_prompt,
+                temperature=temp,
+                route=route,
+            )
+            return
+
+        emitted = False
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    emitted = True
+                    yield delta
+        except Exception as exc:
+            logger.error("Groq stream interrupted for model=%s: %s", model_name, exc)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()
+
+        if not emitted:
+            logger.warning("Groq streaming response had empty content; returning safe reply.")
+            yield _safe_reply()
+
+    async def _astream_with_domain_guard(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        prompt_class = self._domain_guard_class(prompt)
+        if prompt_class is None:
+            yield self._domain_redirect_reply()
+            return
+        async for delta in self.astream_chat(
+            prompt,
+            model=model,
+            system_prompt=DOMAIN_CHAT_SYSTEM_PROMPT,
+            prompt_class=prompt_class,
+        ):
+            yield delta
+
+    def run_agent(self, prompt: str, model: Optional[str] = None) -> str:
+        return self._chat_with_domain_guard(prompt, model=model)
+
+    async def run_agent_ws(self, prompt: str, model: Optional[str] = None) -> str:
+        return await self._achat_with_domain_guard(prompt, model=model)
+
+    def retrieve(self, query: str, n_results: int = 4) -> List[str]:
+        cache_key = self._retrieval_cache_key("documents", query, n_results)
+        cached = self._retrieval_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        return list(self._inflight.do(cache_key, self._fetch_documents, cache_key, query, n_results))
+
+    def _fetch_documents(self, cache_key: tuple, query: str, n_results: int) -> List[str]:
+        collection = self._get_collection()
+        if collection is None:
             return []
 
+        try:
+            if self.collection_count() == 0:
+                return []
+            result = self._batched_query(query, n_results)
+            if result is None:
+                return []
+            documents = result.get("documents", [[]])[0]
+        except Exception as exc:
+            logger.error("Chroma query failed: %s", exc)
+            return []
+
+        self._retrieval_cache.set(cache_key, list(documents))
+        return documents
+
     def retrieve_ranked(self, query: str, n_results: Optional[int] = None) -> List[tuple[str, float]]:
+        limit = n_results or self.settings.rag_n_results
+        fetch_limit = self._fetch_limit(limit)
+        cache_key = self._retrieval_cache_key("ranked", query, fetch_limit)
+        cached = self._retrieval_cache.get(cache_key)
+        if cached is not None:
+            logger.info("RAG retrieval cache hit (collection=%s candidates=%s)", self.collection_name, len(cached))
+            record_cache_hit("retrieval")
+            return list(cached)
+
+        return list(self._inflight.do(cache_key, self._fetch_ranked, cache_key, query, limit, fetch_limit))
+
+    def _fetch_ranked(self, cache_key: tuple, query: str, limit: int, fetch_limit: int) -> List[tuple[str, float]]:
         collection = self._get_collection()
         if collection is None:
             return []
 
+        try:
+            if self.collection_count() == 0:
+                return []
+            result = self._batched_query(query, fetch_limit)
+            if result is None:
+                return []
+            documents = result.get("documents", [[]])[0]
+            distances = result.get("distances", [[]])[0]
+        except Exception as exc:
+            logger.error("Chroma ranked query failed: %s", exc)
+            return []
+
+        ranked = self._rank_documents(query, documents, distances, limit)
+        self._retrieval_cache.set(cache_key, list(ranked))
+        return ranked
+
+    async def aretrieve_ranked(self, query: str, n_results: Optional[int] = None) -> List[tuple[str, float]]:
         limit = n_results or self.settings.rag_n_results
-        fetch_limit = max(limit, limit * 3)
+        fetch_limit = self._fetch_limit(limit)
+        cache_key = self._retrieval_cache_key("ranked", query, fetch_limit)
+        cached = self._retrieval_cache.get(cache_key)
+        if cached is not None:
+            logger.info("RAG retrieval cache hit (collection=%s candidates=%s)", self.collection_name, len(cached))
+            record_cache_hit("retrieval")
+            return list(cached)
 
+        return list(await self._ainflight.do(cache_key, self._afetch_ranked, cache_key, query, limit, fetch_limit))
+
+    async def _afetch_ranked(self, cache_key: tuple, query: str, limit: int, fetch_limit: int) -> List[tuple[str, float]]:
         try:
-            if self.collection_count() == 0:
+            if await self.acollection_count() == 0:
+                return []
+            result = await self._abatched_query(query, fetch_limit)
+            if result is None:
                 return []
-            result = collection.query(query_texts=[query], n_results=fetch_limit)
             documents = result.get("documents", [[]])[0]
             distances = result.get("distances", [[]])[0]
         except Exception as exc:
             logger.error("Chroma ranked query failed: %s", exc)
             return []
 
+        ranked = self._rank_documents(query, documents, distances, limit)
+        self._retrieval_cache.set(cache_key, list(ranked))
+        return ranked
+
+    async def aretrieve_ranked_many(
+        self,
+        queries: List[str],
+        n_results: Optional[int] = None,
+    ) -> Dict[str, List[tuple[str, float]]]:
+        """Ranked results for several queries, fetching every cache miss with one multi-query Chroma call."""
+        limit = n_results or self.settings.rag_n_results
+        fetch_limit = self._fetch_limit(limit)
+        results: Dict[str, List[tuple[str, float]]] = {}
+        missing: List[str] = []
+        for query in dict.fromkeys(queries):
+            cached = self._retrieval_cache.get(self._retrieval_cache_key("ranked", query, fetch_limit))
+            if cached is not None:
+                results[query] = list(cached)
+            else:
+                missing.append(query)
+
+        if not missing:
+            return results
+        try:
+            if await self.acollection_count() == 0:
+                return {**results, **{query: [] for query in missing}}
+            result = await self._aquery_collection_many(missing, fetch_limit)
+        except Exception as exc:
+            logger.error("Chroma multi-query failed for %s queries: %s", len(missing), exc)
+            return results
+        if result is None:
+            return results
+
+        documents = result.get("documents") or []
+        distances = result.get("distances") or []
+        for index, query in enumerate(missing):
+            if index >= len(documents) or index >= len(distances):
+                break
+            ranked = self._rank_documents(query, documents[index], distances[index], limit)
+            self._retrieval_cache.set(self._retrieval_cache_key("ranked", query, fetch_limit), list(ranked))
+            results[query] = ranked
+        return results
+
+    def _rank_documents(
+        self,
+        query: str,
+        documents: List[str],
+        distances: List[float],
+        limit: int,
+    ) -> List[tuple[str, float]]:
         ranked: List[tuple[str, float]] = []
         seen_documents = set()
         for document, distance in zip(documents, distances):
             if not document or distance is None:
                 continue
-            normalized = " ".join(document.split()).strip().lower()
+            normalized = _normalize_document(document)
             if normalized in seen_documents:
                 continue
             seen_documents.add(normalized)
@@ -614,33 +1850,146 @@ class GroqChromaBackend:
         )
         return ranked
 
+    def _get_filter(self) -> Dict[str, Any]:
+        return {"where": RETRIEVABLE_CHUNK_FILTER} if self.settings.rag_metadata_filter else {}
+
+    def _build_lexical_index(self, page_size: int = 500) -> bool:
+        collection = self._get_collection()
+        if collection is None:
+            return False
+
+        started = time.perf_counter()
+        self._lexical_index.clear()
+        offset = 0
+        try:
+            while True:
+                page = collection.get(include=["documents"], limit=page_size, offset=offset, **self._get_filter())
+                ids = page.get("ids") or []
+                if not ids:
+                    break
+                self._lexical_index.add_many(zip(ids, page.get("documents") or []))
+                offset += len(ids)
+                if len(ids) < page_size:
+                    break
+        except Exception as exc:
+            logger.error("Failed to load documents for the lexical index: %s", exc)
+            self._lexical_index.clear()
+            return False
+
+        self._lexical_index_loaded = True
+        logger.info(
+            "Built lexical index (collection=%s documents=%s terms=%s seconds=%.3f)",
+            self.collection_name,
+            len(self._lexical_index),
+            self._lexical_index.stats()["terms"],
+            time.perf_counter() - started,
+        )
+        return True
+
+    def _ensure_lexical_index(self) -> bool:
+        if self._lexical_index_loaded:
+            return True
+        return self._inflight.do(("lexical-index", self.collection_name), self._build_lexical_index)
+
+    def refresh_lexical_index(self) -> bool:
+        """Reload the BM25 index from the collection, e.g. after an out-of-process rebuild."""
+        self._lexical_index_loaded = False
+        return self._ensure_lexical_index()
+
+    def _fuse_hybrid(
+        self,
+        query: str,
+        ranked: List[tuple[str, float]],
+        lexical: List[tuple[str, float, float]],
+        limit: int,
+        promote_distance: float,
+        relaxed_distance: float,
+    ) -> List[tuple[str, float]]:
+        candidates: Dict[str, tuple[str, float]] = {}
+        for document, distance in ranked:
+            candidates.setdefault(_normalize_document(document), (document, distance))
+
+        # A chunk that contains most of the query's rare terms is treated as a
+        # strict match even when its embedding is far from the question's, but
+        # only when it matches several query terms or its embedding is at least
+        # within the relaxed threshold: one rare word (a brand name, say) is not
+        # enough on its own. Other lexical hits keep their vector distance, or an
+        # unknown (infinite) one, so fusion can still rank them.
+        query_terms = set(tokenize(query))
+        promoted = 0
+        for document, _, coverage in lexical:
+            key = _normalize_document(document)
+            document, distance = candidates.get(key, (document, math.inf))
+            if distance > promote_distance and coverage >= self.settings.rag_hybrid_min_coverage:
+                matched_terms = len(query_terms.intersection(tokenize(document)))
+                if matched_terms >= self.settings.rag_hybrid_min_terms or distance <= relaxed_distance:
+                    distance = promote_distance
+                    promoted += 1
+            candidates[key] = (document, distance)
+
+        fused = reciprocal_rank_fusion(
+            [
+                [_normalize_document(document) for document, _ in ranked],
+                [_normalize_document(document) for document, _, _ in lexical],
+            ],
+            k=self.settings.rag_hybrid_rrf_k,
+        )
+        hybrid = [candidates[key] for key, _ in fused if key in candidates][:limit]
+
+        self._lexical_promotions += promoted
+        logger.info(
+            "RAG hybrid retrieval (query=%r vector=%s lexical=%s promoted=%s returned=%s)",
+            query.replace("\n", " ").strip()[:80],
+            len(ranked),
+            len(lexical),
+            promoted,
+            len(hybrid),
+        )
+        return hybrid
+
+    def retrieve_hybrid(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+    ) -> List[tuple[str, float]]:
+        """Vector results fused with BM25 hits by reciprocal rank, as (document, distance) pairs."""
+        limit = n_results or self.settings.rag_n_results
+        ranked = self.retrieve_ranked(query=query, n_results=limit)
+        if not self._ensure_lexical_index():
+            return ranked
+        lexical = self._lexical_index.search(query, max(limit, limit * 3))
+        strict_threshold, relaxed_threshold = self._resolve_thresholds(distance_threshold)
+        return self._fuse_hybrid(query, ranked, lexical, limit, strict_threshold, relaxed_threshold)
+
+    async def aretrieve_hybrid(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        ranked: Optional[List[tuple[str, float]]] = None,
+    ) -> List[tuple[str, float]]:
+        limit = n_results or self.settings.rag_n_results
+        if ranked is None:
+            ranked = await self.aretrieve_ranked(query=query, n_results=limit)
+        if not self._lexical_index_loaded and not await asyncio.to_thread(self._ensure_lexical_index):
+            return ranked
+        lexical = self._lexical_index.search(query, max(limit, limit * 3))
+        strict_threshold, relaxed_threshold = self._resolve_thresholds(distance_threshold)
+        return self._fuse_hybrid(query, ranked, lexical, limit, strict_threshold, relaxed_threshold)
+
     def _looks_like_meta_context(self, document: str) -> bool:
-        lowered = document.lower()
-        meta_markers = [
-            "structured prompting approach",
-            "content-type: application/json",
-            "json body",
-            "example successful response",
-            "the recipe engine does not work directly",
-            "langchain",
-            "redis memory",
-            "serp",
-            "openai models",
-        ]
-        return any(marker in lowered for marker in meta_markers)
+        return is_meta_document(document)
 
     def retrieve_with_threshold(self, query: str, n_results: int = 5, distance_threshold: float = 0.8) -> List[str]:
         ranked = self.retrieve_ranked(query=query, n_results=n_results)
         return [document for document, distance in ranked if distance <= distance_threshold]
 
-    def retrieve_for_rag(
+    def _resolve_thresholds(
         self,
-        query: str,
-        n_results: Optional[int] = None,
         distance_threshold: Optional[float] = None,
         relaxed_distance_threshold: Optional[float] = None,
-    ) -> List[str]:
-        limit = n_results or self.settings.rag_n_results
+    ) -> tuple[float, float]:
         strict_threshold = (
             self.settings.rag_distance_threshold
             if distance_threshold is None
@@ -654,25 +2003,42 @@ class GroqChromaBackend:
 
         if relaxed_threshold < strict_threshold:
             relaxed_threshold = strict_threshold
+        return strict_threshold, relaxed_threshold
 
-        ranked = self.retrieve_ranked(query=query, n_results=limit)
-        if not ranked:
-            return []
+    def _select_rag_contexts(
+        self,
+        ranked: List[tuple[str, float]],
+        strict_threshold: float,
+        relaxed_threshold: float,
+    ) -> List[str]:
+        return self._select_rag_contexts_tiered(ranked, strict_threshold, relaxed_threshold)[0]
 
-        filtered_ranked = [
-            (document, distance)
-            for document, distance in ranked
-            if not self._looks_like_meta_context(document)
-        ]
-        if len(filtered_ranked) != len(ranked):
-            logger.info(
-                "RAG retrieval filtered low-value contexts=%s",
-                len(ranked) - len(filtered_ranked),
-            )
-        ranked = filtered_ranked
+    def _select_rag_contexts_tiered(
+        self,
+        ranked: List[tuple[str, float]],
+        strict_threshold: float,
+        relaxed_threshold: float,
+    ) -> tuple[List[str], str]:
+        """Contexts plus the tier that accepted them: "strict", "relaxed" or "none"."""
         if not ranked:
-            logger.info("RAG retrieval produced only filtered meta-contexts; treating as no context")
-            return []
+            return [], "none"
+
+        # With RAG_METADATA_FILTER, Chroma and the lexical index already exclude meta chunks.
+        if not self.settings.rag_metadata_filter:
+            filtered_ranked = [
+                (document, distance)
+                for document, distance in ranked
+                if not self._looks_like_meta_context(document)
+            ]
+            if len(filtered_ranked) != len(ranked):
+                logger.info(
+                    "RAG retrieval filtered low-value contexts=%s",
+                    len(ranked) - len(filtered_ranked),
+                )
+            ranked = filtered_ranked
+            if not ranked:
+                logger.info("RAG retrieval produced only filtered meta-contexts; treating as no context")
+                return [], "none"
 
         strict_contexts = [document for document, distance in ranked if distance <= strict_threshold]
         if strict_contexts:
@@ -681,7 +2047,7 @@ class GroqChromaBackend:
                 len(strict_contexts),
                 strict_threshold,
             )
-            return strict_contexts
+            return strict_contexts, "strict"
 
         relaxed_contexts = [document for document, distance in ranked if distance <= relaxed_threshold]
         if relaxed_contexts:
@@ -691,19 +2057,147 @@ class GroqChromaBackend:
                 strict_threshold,
                 relaxed_threshold,
             )
-            return relaxed_contexts
+            return relaxed_contexts, "relaxed"
 
         logger.info(
             "RAG retrieval found no contexts within strict=%.2f or relaxed=%.2f",
             strict_threshold,
             relaxed_threshold,
         )
-        return []
+        return [], "none"
+
+    def retrieve_for_rag(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        relaxed_distance_threshold: Optional[float] = None,
+    ) -> List[str]:
+        return self._retrieve_for_rag_tiered(query, n_results, distance_threshold, relaxed_distance_threshold)[0]
+
+    def _retrieve_for_rag_tiered(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        relaxed_distance_threshold: Optional[float] = None,
+    ) -> tuple[List[str], str]:
+        limit = n_results or self.settings.rag_n_results
+        strict_threshold, relaxed_threshold = self._resolve_thresholds(
+            distance_threshold, relaxed_distance_threshold
+        )
+        with stage("retrieval"):
+            if self.settings.rag_hybrid_search:
+                ranked = self.retrieve_hybrid(query=query, n_results=limit, distance_threshold=strict_threshold)
+            else:
+                ranked = self.retrieve_ranked(query=query, n_results=limit)
+        record_retrieval([distance for _, distance in ranked])
+        return self._select_rag_contexts_tiered(ranked, strict_threshold, relaxed_threshold)
+
+    async def aretrieve_for_rag(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        relaxed_distance_threshold: Optional[float] = None,
+    ) -> List[str]:
+        return (await self._aretrieve_for_rag_tiered(query, n_results, distance_threshold, relaxed_distance_threshold))[0]
+
+    async def _aretrieve_for_rag_tiered(
+        self,
+        query: str,
+        n_results: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        relaxed_distance_threshold: Optional[float] = None,
+        ranked: Optional[List[tuple[str, float]]] = None,
+    ) -> tuple[List[str], str]:
+        """`ranked` skips the vector query when the caller already fetched it (see `astream_chat_batch`)."""
+        limit = n_results or self.settings.rag_n_results
+        strict_threshold, relaxed_threshold = self._resolve_thresholds(
+            distance_threshold, relaxed_distance_threshold
+        )
+        with stage("retrieval"):
+            if self.settings.rag_hybrid_search:
+                ranked = await self.aretrieve_hybrid(
+                    query=query, n_results=limit, distance_threshold=strict_threshold, ranked=ranked
+                )
+            elif ranked is None:
+                ranked = await self.aretrieve_ranked(query=query, n_results=limit)
+        record_retrieval([distance for _, distance in ranked])
+        return self._select_rag_contexts_tiered(ranked, strict_threshold, relaxed_threshold)
+
+    @contextmanager
+    def _deadline_scope(self, deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+        """Run a pipeline under `deadline`, else the enclosing one, else CHAT_DEADLINE_SECONDS (0 = none)."""
+        if deadline is None and current_deadline() is None and self.settings.chat_deadline_seconds > 0:
+            deadline = Deadline(self.settings.chat_deadline_seconds)
+        with deadline_scope(deadline) as active:
+            try:
+                yield active
+            except DeadlineExceeded as exc:
+                logger.warning("AI07 request abandoned: deadline exceeded during %s (budget=%.2fs)", exc.stage, active.budget)
+                record_abandoned("deadline")
+                raise
+
+    def _retrieval_cap(self, deadline: Deadline) -> float:
+        """Time retrieval may use while leaving the grounded completion its minimum budget."""
+        budgets = self.settings.stage_budgets()
+        return min(budgets.retrieval_seconds, deadline.remaining() - budgets.grounded_min_seconds)
+
+    def _skip_stage(self, stage_name: str, deadline: Deadline) -> None:
+        logger.info("AI07 skipping %s to meet the request deadline (remaining_ms=%.0f)", stage_name, deadline.remaining() * 1000)
+        record_deadline_skip(stage_name)
+
+    def _retrieve_within_deadline(self, **kwargs: Any) -> Optional[tuple[List[str], str]]:
+        """`_retrieve_for_rag_tiered`, or None when the current deadline leaves no time for it.
+
+        A synchronous Chroma query cannot be interrupted, so this only decides
+        whether to start it.
+        """
+        deadline = current_deadline()
+        if deadline is not None and self._retrieval_cap(deadline) <= 0:
+            self._skip_stage("retrieval", deadline)
+            return None
+        return self._retrieve_for_rag_tiered(**kwargs)
+
+    async def _aretrieve_within_deadline(self, **kwargs: Any) -> Optional[tuple[List[str], str]]:
+        """`_aretrieve_for_rag_tiered` cut off at the retrieval budget; None when skipped or cut off."""
+        deadline = current_deadline()
+        retrieval = self._aretrieve_for_rag_tiered(**kwargs)
+        if deadline is None:
+            return await retrieval
+        try:
+            return await deadline.run(retrieval, "retrieval", cap=self._retrieval_cap(deadline))
+        except DeadlineExceeded:
+            self._skip_stage("retrieval", deadline)
+            return None
+
+    def _deadline_allows(self, stage_name: str, seconds: float) -> bool:
+        deadline = current_deadline()
+        if deadline is None or deadline.allows(seconds):
+            return True
+        self._skip_stage(stage_name, deadline)
+        return False
 
     def _build_grounded_user_prompt(self, contexts: List[str], question: str) -> str:
-        joined_context = "\n\n".join(contexts)
+        assembled = assemble_context(contexts, question, self.settings.rag_context_token_budget)
+        self._context_stats["requests"] += 1
+        self._context_stats["original_tokens"] += assembled.original_tokens
+        self._context_stats["tokens"] += assembled.tokens
+        self._context_stats["tokens_saved"] += assembled.tokens_saved
+        logger.info(
+            "RAG context assembled (chunks=%s sources=%s sentences_kept=%s dropped=%s duplicates=%s tokens=%s/%s saved=%s)",
+            len(contexts),
+            len(assembled.sources),
+            assembled.sentences_kept,
+            assembled.sentences_dropped,
+            assembled.duplicates_dropped,
+            assembled.tokens,
+            assembled.original_tokens,
+            assembled.tokens_saved,
+        )
         return (
-            f"CONTEXT:\n{joined_context}\n\n"
+            f"CONTEXT:\n{assembled.text}\n\n"
             f"QUESTION: {question}\n\n"
             "Answer using only the provided context."
         )
@@ -715,8 +2209,73 @@ class GroqChromaBackend:
         model: Optional[str] = None,
         distance_threshold: Optional[float] = None,
         relaxed_distance_threshold: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """Grounded-only answer; raises DeadlineExceeded when `deadline` leaves no time to retrieve or answer."""
+        with self._deadline_scope(deadline):
+            retrieved = self._retrieve_within_deadline(
+                query=prompt,
+                n_results=n_results,
+                distance_threshold=distance_threshold,
+                relaxed_distance_threshold=relaxed_distance_threshold,
+            )
+            if retrieved is None:
+                raise DeadlineExceeded("retrieval")
+            contexts = retrieved[0]
+            if not contexts:
+                logger.warning("RAG fallback triggered - no relevant context found for: %s", prompt)
+                return RAG_NO_CONTEXT_REPLY
+
+            grounded_prompt = self._build_grounded_user_prompt(contexts, prompt)
+            return self.chat(
+                grounded_prompt,
+                model=model,
+                system_prompt=GROUNDING_SYSTEM_PROMPT,
+                temperature=0.0,
+                prompt_class=GROUNDED_RAG,
+            )
+
+    async def agenerate_with_rag(
+        self,
+        prompt: str,
+        n_results: Optional[int] = None,
+        model: Optional[str] = None,
+        distance_threshold: Optional[float] = None,
+        relaxed_distance_threshold: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
     ) -> str:
-        contexts = self.retrieve_for_rag(
+        with self._deadline_scope(deadline):
+            retrieved = await self._aretrieve_within_deadline(
+                query=prompt,
+                n_results=n_results,
+                distance_threshold=distance_threshold,
+                relaxed_distance_threshold=relaxed_distance_threshold,
+            )
+            if retrieved is None:
+                raise DeadlineExceeded("retrieval")
+            contexts = retrieved[0]
+            if not contexts:
+                logger.warning("RAG fallback triggered - no relevant context found for: %s", prompt)
+                return RAG_NO_CONTEXT_REPLY
+
+            grounded_prompt = self._build_grounded_user_prompt(contexts, prompt)
+            return await self.achat(
+                grounded_prompt,
+                model=model,
+                system_prompt=GROUNDING_SYSTEM_PROMPT,
+                temperature=0.0,
+                prompt_class=GROUNDED_RAG,
+            )
+
+    async def astream_generate_with_rag(
+        self,
+        prompt: str,
+        n_results: Optional[int] = None,
+        model: Optional[str] = None,
+        distance_threshold: Optional[float] = None,
+        relaxed_distance_threshold: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        contexts = await self.aretrieve_for_rag(
             query=prompt,
             n_results=n_results,
             distance_threshold=distance_threshold,
@@ -724,37 +2283,202 @@ class GroqChromaBackend:
         )
         if not contexts:
             logger.warning("RAG fallback triggered - no relevant context found for: %s", prompt)
-            return (
-                "I'm sorry, I could not find relevant nutrition information for your question. "
-                "Please try asking about specific foods, nutrients, or dietary guidelines "
-                "for Australian seniors."
-            )
+            yield RAG_NO_CONTEXT_REPLY
+            return
 
         grounded_prompt = self._build_grounded_user_prompt(contexts, prompt)
-        return self.chat(
+        async for delta in self.astream_chat(
             grounded_prompt,
             model=model,
             system_prompt=GROUNDING_SYSTEM_PROMPT,
             temperature=0.0,
-        )
+            prompt_class=GROUNDED_RAG,
+        ):
+            yield delta
     
     # --- AI013: Whisper voice transcription ---
-    def transcribe_audio(self, audio_file) -> str:
+    def transcribe_audio(self, audio_file, filename: str = "recording.webm", content_type: str = "audio/webm") -> str:
         """Transcribe audio to text using Groq Whisper API."""
         client = self._get_groq_client()
         if client is None:
             raise Exception("Groq client not available")
 
         try:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-large-v3",
-                file=("recording.webm", audio_file, "audio/webm"),
-            )
+            with stage("transcription"):
+                transcription = self._groq_scheduler().call(
+                    client.audio.transcriptions.create,
+                    hedge=False,
+                    model="whisper-large-v3",
+                    file=(filename, audio_file, content_type),
+                )
             return transcription.text
         except Exception as exc:
             logger.error("Groq transcription failed: %s", exc)
             raise Exception(f"Transcription failed: {str(exc)}")
 
+    def _transcribe_file(self, path: str, filename: str, content_type: str) -> str:
+        with open(path, "rb") as audio_file:
+            return self.transcribe_audio(audio_file, filename, content_type)
+
+    async def astream_transcription(
+        self,
+        path: str,
+        filename: str = "recording.webm",
+        content_type: str = "audio/webm",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Transcribe the recording at `path` in overlapping chunks, yielding events as chunks finish.
+
+        Chunk events (`type="chunk"`, with `index`, `start`/`end` seconds and `text`)
+        arrive in completion order; a final `type="done"` event carries the stitched
+        transcript. At most TRANSCRIBE_CONCURRENCY chunks are decoded or in flight at
+        once, so memory does not grow with the recording length. Audio that cannot be
+        split (a compressed format without ffmpeg, or one ffmpeg cannot decode) is
+        sent as one request.
+        """
+        started = time.perf_counter()
+        chunks = split_audio(path, self.settings.audio_chunking_config())
+        first = None
+        if chunks is not None:
+            try:
+                first = await asyncio.to_thread(next, chunks, None)
+            except Exception as exc:
+                logger.warning("Could not split audio for chunked transcription: %s", exc)
+        if first is None:
+            text = await asyncio.to_thread(self._transcribe_file, path, filename, content_type)
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield {"type": "chunk", "index": 0, "start": 0.0, "end": None, "text": text, "elapsed_ms": elapsed_ms}
+            yield {"type": "done", "transcript": text, "chunks": 1, "elapsed_ms": elapsed_ms}
+            return
+
+        semaphore = asyncio.Semaphore(max(1, self.settings.transcribe_concurrency))
+        texts: Dict[int, str] = {}
+        pending: set = set()
+
+        async def transcribe(chunk) -> Dict[str, Any]:
+            chunk_started = time.perf_counter()
+            try:
+                text = await asyncio.to_thread(
+                    self.transcribe_audio, io.BytesIO(chunk.wav), f"chunk-{chunk.index}.wav", "audio/wav"
+                )
+            finally:
+                semaphore.release()
+            return {
+                "type": "chunk",
+                "index": chunk.index,
+                "start": round(chunk.start, 2),
+                "end": round(chunk.end, 2),
+                "text": text,
+                "elapsed_ms": round((time.perf_counter() - chunk_started) * 1000, 1),
+            }
+
+        def finished(tasks) -> List[Dict[str, Any]]:
+            events = [task.result() for task in tasks]
+            for event in events:
+                texts[event["index"]] = event["text"]
+            return events
+
+        try:
+            chunk = first
+            while True:
+                # The next chunk is only decoded once a slot is free, which bounds memory.
+                await semaphore.acquire()
+                if chunk is None:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    semaphore.release()
+                    break
+                pending.add(asyncio.ensure_future(transcribe(chunk)))
+                chunk = None
+                done = {task for task in pending if task.done()}
+                pending -= done
+                for event in finished(done):
+                    yield event
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for event in finished(done):
+                    yield event
+        finally:
+            for task in pending:
+                task.cancel()
+            chunks.close()
+
+        transcript = stitch_transcripts([texts[index] for index in sorted(texts)])
+        yield {
+            "type": "done",
+            "transcript": transcript,
+            "chunks": len(texts),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    async def atranscribe_file(self, path: str, filename: str = "recording.webm", content_type: str = "audio/webm") -> str:
+        transcript = ""
+        async for event in self.astream_transcription(path, filename, content_type):
+            if event["type"] == "done":
+                transcript = event["transcript"]
+        return transcript
+
+    def _response_cache_namespace(self, model: str) -> str:
+        return f"{self.collection_name}:{model}"
+
+    def _cached_response(self, prompt: str, model: Optional[str] = None) -> Optional[str]:
+        """Cached answer from the model the router would pick for a grounded completion of `prompt` now."""
+        self._collection_version()
+        routed = self._model_router.preferred(GROUNDED_RAG, model)
+        cached = self._response_cache.lookup(self._response_cache_namespace(routed), prompt)
+        if cached is not None:
+            logger.info("AI07 response cache hit (prompt_len=%s)", len(prompt or ""))
+            record_cache_hit("response")
+        return cached
+
+    def _cache_grounded_response(self, prompt: str, response: str, answered_by: str) -> None:
+        # Grounded completions always run at temperature 0, so they are safe to replay.
+        # Stored under the model that produced the answer (the routed one, not the requested one).
+        if response == _safe_reply() or self._is_weak_rag_response(response):
+            return
+        self._response_cache.store(self._response_cache_namespace(answered_by), prompt, response)
+
+    async def _acached_response(self, prompt: str, model: Optional[str] = None) -> Optional[str]:
+        if self._response_cache.uses_embeddings:
+            return await asyncio.to_thread(self._cached_response, prompt, model)
+        return self._cached_response(prompt, model)
+
+    async def _acache_grounded_response(self, prompt: str, response: str, answered_by: str) -> None:
+        if self._response_cache.uses_embeddings:
+            await asyncio.to_thread(self._cache_grounded_response, prompt, response, answered_by)
+            return
+        self._cache_grounded_response(prompt, response, answered_by)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "collection_version": self._collection_version(),
+            "response_cache": self._response_cache.stats(),
+            "retrieval_cache": self._retrieval_cache.stats(),
+            "embedding_cache": self._embedding_cache.stats(),
+            "request_coalescing": {
+                "sync": self._inflight.stats(),
+                "async": self._ainflight.stats(),
+            },
+            "retrieval_batching": {
+                "sync": self._query_batcher.stats(),
+                "async": self._aquery_batcher.stats(),
+            },
+            "shared_clients": registry_stats(),
+            "local_index": {
+                "loaded": self._local_index is not None,
+                "records": self._local_index.count() if self._local_index is not None else 0,
+                "failovers": self._local_failovers,
+            },
+            "context_assembly": dict(self._context_stats),
+            "speculative_fallback": dict(self._speculation),
+            "groq_resilience": self._groq_scheduler().stats(),
+            "model_router": self._model_router.stats(),
+            "lexical_index": {
+                "loaded": self._lexical_index_loaded,
+                **self._lexical_index.stats(),
+                "promotions": self._lexical_promotions,
+            },
+        }
+
     def _is_weak_rag_response(self, response: str) -> bool:
         if not response:
             return True
@@ -784,18 +2508,168 @@ class GroqChromaBackend:
         has_nutritional_signal = bool(re.search(r"\d|%|serving|vegetable|fruit|diet|nutrition|guideline", clean, re.IGNORECASE))
         return very_short and not has_nutritional_signal
 
-    def chat_with_rag_fallback(self, prompt: str, model: Optional[str] = None) -> str:
-        logger.info("AI07 chat_with_rag_fallback called (prompt_len=%s)", len(prompt or ""))
+    def _record_speculation(
+        self,
+        used: bool,
+        grounded_seconds: float,
+        chat_seconds: Optional[float],
+        total_seconds: float,
+        chat_reply: Optional[str],
+        prompt: str,
+    ) -> None:
+        self._speculation["launched"] += 1
+        if used:
+            # Serially the plain chat would only have started after the grounded reply.
+            saved = max(0.0, grounded_seconds + (chat_seconds or 0.0) - total_seconds)
+            self._speculation["used"] += 1
+            self._speculation["saved_seconds"] = round(self._speculation["saved_seconds"] + saved, 4)
+            logger.info(
+                "AI07 speculative chat used (weak RAG response, saved_ms=%.0f grounded_ms=%.0f chat_ms=%.0f)",
+                saved * 1000,
+                grounded_seconds * 1000,
+                (chat_seconds or 0.0) * 1000,
+            )
+            return
+
+        extra_tokens = estimate_tokens(DOMAIN_CHAT_SYSTEM_PROMPT) + estimate_tokens(prompt) + estimate_tokens(chat_reply or "")
+        self._speculation["discarded"] += 1
+        self._speculation["extra_tokens"] += extra_tokens
+        logger.info(
+            "AI07 speculative chat discarded (grounded answer kept, chat_finished=%s extra_tokens~%s)",
+            chat_reply is not None,
+            extra_tokens,
+        )
+
+    def _speculation_wait(self) -> Optional[float]:
+        """How long a weak grounded answer may wait for the speculative chat: the time left, if under a deadline."""
+        deadline = current_deadline()
+        return None if deadline is None else deadline.remaining()
+
+    def _speculative_rag_answer(self, prompt: str, grounded_prompt: str, model: Optional[str]) -> str:
+        """Run the grounded and plain domain-chat completions together for marginal retrievals."""
+        started = time.perf_counter()
+
+        def timed_chat() -> tuple[str, float]:
+            chat_started = time.perf_counter()
+            return self._chat_with_domain_guard(prompt, model=model), time.perf_counter() - chat_started
+
+        # The plain chat runs in a copy of the request context so it sees the deadline and records its spans.
+        chat_future = _SPECULATIVE_EXECUTOR.submit(contextvars.copy_context().run, timed_chat)
         try:
-            contexts = self.retrieve_for_rag(
-                query=prompt,
-                n_results=self.settings.rag_n_results,
-                distance_threshold=self.settings.rag_distance_threshold,
-                relaxed_distance_threshold=self.settings.rag_relaxed_distance_threshold,
+            rag_response, answered_by = self._chat_routed(
+                grounded_prompt,
+                model=model,
+                system_prompt=GROUNDING_SYSTEM_PROMPT,
+                temperature=0.0,
+                prompt_class=GROUNDED_RAG,
             )
+        except BaseException:
+            chat_future.cancel()
+            raise
+        grounded_seconds = time.perf_counter() - started
+
+        if not self._is_weak_rag_response(rag_response):
+            # A thread that already started cannot be interrupted; its reply is just dropped.
+            chat_future.cancel()
+            finished = chat_future.done() and not chat_future.cancelled() and chat_future.exception() is None
+            chat_reply = chat_future.result()[0] if finished else None
+            self._record_speculation(False, grounded_seconds, None, grounded_seconds, chat_reply, prompt)
+            self._cache_grounded_response(prompt, rag_response, answered_by)
+            return rag_response
+
+        try:
+            fallback, chat_seconds = chat_future.result(timeout=self._speculation_wait())
+        except (FutureTimeoutError, DeadlineExceeded):
+            # Out of time for the fallback: keep the weak grounded answer, as the serial path does.
+            chat_future.cancel()
+            self._skip_stage("fallback", current_deadline())
+            self._record_speculation(False, grounded_seconds, None, time.perf_counter() - started, None, prompt)
+            return rag_response
+        self._record_speculation(True, grounded_seconds, chat_seconds, time.perf_counter() - started, fallback, prompt)
+        if fallback == _safe_reply():
+            logger.error("AI07 fallback chat also unavailable. Root issue likely: %s", self._chat_unavailable_reason())
+        return fallback
+
+    async def _aspeculative_rag_answer(self, prompt: str, grounded_prompt: str, model: Optional[str]) -> str:
+        started = time.perf_counter()
+
+        async def timed_chat() -> tuple[str, float]:
+            chat_started = time.perf_counter()
+            return await self._achat_with_domain_guard(prompt, model=model), time.perf_counter() - chat_started
+
+        chat_task = asyncio.ensure_future(timed_chat())
+        try:
+            rag_response, answered_by = await self._achat_routed(
+                grounded_prompt,
+                model=model,
+                system_prompt=GROUNDING_SYSTEM_PROMPT,
+                temperature=0.0,
+                prompt_class=GROUNDED_RAG,
+            )
+        except BaseException:
+            chat_task.cancel()
+            raise
+        grounded_seconds = time.perf_counter() - started
+
+        if not self._is_weak_rag_response(rag_response):
+            finished = chat_task.done() and not chat_task.cancelled() and chat_task.exception() is None
+            chat_reply = chat_task.result()[0] if finished else None
+            chat_task.cancel()
+            self._record_speculation(False, grounded_seconds, None, grounded_seconds, chat_reply, prompt)
+            await self._acache_grounded_response(prompt, rag_response, answered_by)
+            return rag_response
+
+        fallback_wait = self._speculation_wait()
+        if fallback_wait is not None:
+            await asyncio.wait({chat_task}, timeout=fallback_wait)
+            if not chat_task.done() or (not chat_task.cancelled() and isinstance(chat_task.exception(), DeadlineExceeded)):
+                chat_task.cancel()
+                self._skip_stage("fallback", current_deadline())
+                self._record_speculation(False, grounded_seconds, None, time.perf_counter() - started, None, prompt)
+                return rag_response
+        fallback, chat_seconds = await chat_task
+        self._record_speculation(True, grounded_seconds, chat_seconds, time.perf_counter() - started, fallback, prompt)
+        if fallback == _safe_reply():
+            logger.error("AI07 fallback chat also unavailable. Root issue likely: %s", self._chat_unavailable_reason())
+        return fallback
+
+    def chat_with_rag_fallback(self, prompt: str, model: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        """Grounded answer with domain-chat fallbacks.
+
+        Under a `deadline` (or CHAT_DEADLINE_SECONDS) optional stages are
+        skipped when too little time is left: retrieval and the grounded answer
+        give way to domain chat, and a weak grounded answer is returned as is
+        rather than starting a fallback completion. DeadlineExceeded is raised
+        once the budget is gone.
+        """
+        logger.info("AI07 chat_with_rag_fallback called (prompt_len=%s)", len(prompt or ""))
+        with self._deadline_scope(deadline):
+            return self._chat_with_rag_fallback(prompt, model)
+
+    def _chat_with_rag_fallback(self, prompt: str, model: Optional[str] = None) -> str:
+        budgets = self.settings.stage_budgets()
+        try:
+            cached = self._cached_response(prompt, model)
+            if cached is not None:
+                record_path("cache")
+                return cached
+
+            retrieved = None
+            if self._deadline_allows("retrieval", budgets.grounded_min_seconds):
+                retrieved = self._retrieve_within_deadline(
+                    query=prompt,
+                    n_results=self.settings.rag_n_results,
+                    distance_threshold=self.settings.rag_distance_threshold,
+                    relaxed_distance_threshold=self.settings.rag_relaxed_distance_threshold,
+                )
+            if retrieved is None:
+                record_path("deadline_chat")
+                return self._chat_with_domain_guard(prompt, model=model)
+            contexts, tier = retrieved
             logger.info(
-                "AI07 retrieval complete (contexts=%s strict=%.2f relaxed=%.2f)",
+                "AI07 retrieval complete (contexts=%s tier=%s strict=%.2f relaxed=%.2f)",
                 len(contexts),
+                tier,
                 self.settings.rag_distance_threshold,
                 self.settings.rag_relaxed_distance_threshold,
             )
@@ -803,45 +2677,474 @@ class GroqChromaBackend:
             # AI07 step 1: no contexts -> fallback to regular chat
             if not contexts:
                 logger.info("AI07 fallback to chat (no RAG context)")
+                record_path("no_context")
                 return self._chat_with_domain_guard(prompt, model=model)
 
-            # AI07 step 2: generate RAG answer when contexts exist
+            # AI07 step 2: generate RAG answer when contexts exist (and there is time for it)
+            if not self._deadline_allows("grounded", budgets.grounded_min_seconds):
+                record_path("deadline_chat")
+                return self._chat_with_domain_guard(prompt, model=model)
             grounded_prompt = self._build_grounded_user_prompt(contexts, prompt)
-            rag_response = self.chat(
+            if tier == "relaxed" and self.settings.rag_speculative_fallback:
+                record_path("speculative")
+                return self._speculative_rag_answer(prompt, grounded_prompt, model)
+
+            rag_response, answered_by = self._chat_routed(
                 grounded_prompt,
                 model=model,
                 system_prompt=GROUNDING_SYSTEM_PROMPT,
                 temperature=0.0,
+                prompt_class=GROUNDED_RAG,
             )
 
             # AI07 step 3: weak RAG response -> fallback to regular chat
             if self._is_weak_rag_response(rag_response):
+                if not self._deadline_allows("fallback", budgets.fallback_min_seconds):
+                    record_path("deadline_weak_rag")
+                    return rag_response
                 logger.info("AI07 fallback to chat (weak RAG response)")
+                record_path("weak_rag_fallback")
                 fallback = self._chat_with_domain_guard(prompt, model=model)
                 if fallback == _safe_reply():
                     logger.error("AI07 fallback chat also unavailable. Root issue likely: %s", self._chat_unavailable_reason())
                 return fallback
 
+            record_path("grounded")
+            self._cache_grounded_response(prompt, rag_response, answered_by)
             return rag_response
+        except DeadlineExceeded:
+            raise
         except Exception:
             logger.exception("AI07 RAG fallback pipeline failed, using chat fallback")
+            record_path("error")
             return self._chat_with_domain_guard(prompt, model=model)
 
+    async def achat_with_rag_fallback(self, prompt: str, model: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        """Async `chat_with_rag_fallback`; under a deadline an overrunning retrieval or completion is cancelled."""
+        logger.info("AI07 achat_with_rag_fallback called (prompt_len=%s)", len(prompt or ""))
+        with self._deadline_scope(deadline):
+            return await self._achat_with_rag_fallback(prompt, model)
+
+    async def _achat_with_rag_fallback(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        ranked: Optional[List[tuple[str, float]]] = None,
+    ) -> str:
+        budgets = self.settings.stage_budgets()
+        try:
+            cached = await self._acached_response(prompt, model)
+            if cached is not None:
+                record_path("cache")
+                return cached
+
+            retrieved = None
+            if self._deadline_allows("retrieval", budgets.grounded_min_seconds):
+                retrieved = await self._aretrieve_within_deadline(
+                    query=prompt,
+                    n_results=self.settings.rag_n_results,
+                    distance_threshold=self.settings.rag_distance_threshold,
+                    relaxed_distance_threshold=self.settings.rag_relaxed_distance_threshold,
+                    ranked=ranked,
+                )
+            if retrieved is None:
+                record_path("deadline_chat")
+                return await self._achat_with_domain_guard(prompt, model=model)
+            contexts, tier = retrieved
+            logger.info(
+                "AI07 retrieval complete (contexts=%s tier=%s strict=%.2f relaxed=%.2f)",
+                len(contexts),
+                tier,
+                self.settings.rag_distance_threshold,
+                self.settings.rag_relaxed_distance_threshold,
+            )
+
+            if not contexts:
+                logger.info("AI07 fallback to chat (no RAG context)")
+                record_path("no_context")
+                return await self._achat_with_domain_guard(prompt, model=model)
+
+            if not self._deadline_allows("grounded", budgets.grounded_min_seconds):
+                record_path("deadline_chat")
+                return await self._achat_with_domain_guard(prompt, model=model)
+            grounded_prompt = self._build_grounded_user_prompt(contexts, prompt)
+            if tier == "relaxed" and self.settings.rag_speculative_fallback:
+                record_path("speculative")
+                return await self._aspeculative_rag_answer(prompt, grounded_prompt, model)
+
+            rag_response, answered_by = await self._achat_routed(
+                grounded_prompt,
+                model=model,
+                system_prompt=GROUNDING_SYSTEM_PROMPT,
+                temperature=0.0,
+                prompt_class=GROUNDED_RAG,
+            )
+
+            if self._is_weak_rag_response(rag_response):
+                if not self._deadline_allows("fallback", budgets.fallback_min_seconds):
+                    record_path("deadline_weak_rag")
+                    return rag_response
+                logger.info("AI07 fallback to chat (weak RAG response)")
+                record_path("weak_rag_fallback")
+                fallback = await self._achat_with_domain_guard(prompt, model=model)
+                if fallback == _safe_reply():
+                    logger.error("AI07 fallback chat also unavailable. Root issue likely: %s", self._chat_unavailable_reason())
+                return fallback
+
+            record_path("grounded")
+            await self._acache_grounded_response(prompt, rag_response, answered_by)
+            return rag_response
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            logger.exception("AI07 RAG fallback pipeline failed, using chat fallback")
+            record_path("error")
+            return await self._achat_with_domain_guard(prompt, model=model)
+
+    async def astream_chat_batch(
+        self,
+        prompts: List[str],
+        model: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run `achat_with_rag_fallback` for every prompt, yielding results in completion order.
+
+        Retrieval for the whole batch is one multi-query Chroma call; answers are
+        generated with at most `concurrency` (default CHAT_BATCH_CONCURRENCY) in
+        flight. Each result carries its input `index` and timings in milliseconds:
+        `queued_ms` waiting for a slot and `elapsed_ms` generating the answer.
+        Closing the iterator early cancels the unfinished items.
+        """
+        logger.info("AI07 astream_chat_batch called (items=%s)", len(prompts))
+        batch_started = time.perf_counter()
+        try:
+            prefetched = await self.aretrieve_ranked_many(prompts, n_results=self.settings.rag_n_results)
+        except Exception:
+            logger.exception("AI07 batch retrieval failed; items will retrieve individually")
+            prefetched = {}
+        retrieval_ms = round((time.perf_counter() - batch_started) * 1000, 1)
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.settings.chat_batch_concurrency))
+
+        async def answer(index: int, prompt: str) -> Dict[str, Any]:
+            submitted = time.perf_counter()
+            async with semaphore:
+                started = time.perf_counter()
+                status = "success"
+                try:
+                    msg = await self._achat_with_rag_fallback(prompt, model, ranked=prefetched.get(prompt))
+                except Exception:
+                    logger.exception("AI07 batch item %s failed", index)
+                    msg, status = _safe_reply(), "error"
+                finished = time.perf_counter()
+            return {
+                "index": index,
+                "query": prompt,
+                "status": status,
+                "msg": msg,
+                "queued_ms": round((started - submitted) * 1000, 1),
+                "elapsed_ms": round((finished - started) * 1000, 1),
+                "retrieval_ms": retrieval_ms,
+            }
+
+        tasks = [asyncio.ensure_future(answer(index, prompt)) for index, prompt in enumerate(prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream_chat_with_rag_fallback(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        logger.info("AI07 astream_chat_with_rag_fallback called (prompt_len=%s)", len(prompt or ""))
+        cached = await self._acached_response(prompt, model)
+        if cached is not None:
+            record_path("cache")
+            yield cached
+            return
+
+        try:
+            contexts = await self.aretrieve_for_rag(
+                query=prompt,
+                n_results=self.settings.rag_n_results,
+                distance_threshold=self.settings.rag_distance_threshold,
+                relaxed_distance_threshold=self.settings.rag_relaxed_distance_threshold,
+            )
+        except Exception:
+            logger.exception("AI07 streaming retrieval failed, using chat fallback")
+            contexts = []
+
+        if not contexts:
+            logger.info("AI07 fallback to chat (no RAG context)")
+            record_path("no_context")
+            async for delta in self._astream_with_domain_guard(prompt, model=model):
+                yield delta
+            return
+
+        # Hold back the start of the grounded answer so a weak reply can still
+        # be swapped for the domain chat before anything reaches the client.
+        grounded_prompt = self._build_grounded_user_prompt(contexts, prompt)
+        route = self._route(grounded_prompt, model, GROUNDING_SYSTEM_PROMPT, GROUNDED_RAG)
+        answered_by = route.model
+        grounded = self._astream_routed(grounded_prompt, route, GROUNDING_SYSTEM_PROMPT, 0.0)
+        head: List[str] = []
+        head_len = 0
+        released = False
+        started = time.perf_counter()
+        try:
+            async for delta in grounded:
+                if not head:
+                    observe_stage("llm_first_token", time.perf_counter() - started)
+                head.append(delta)
+                if released:
+                    yield delta
+                    continue
+                head_len += len(delta)
+                if head_len < STREAM_WEAK_CHECK_CHARS:
+                    continue
+                if self._is_weak_rag_response("".join(head)):
+                    break
+                released = True
+                yield "".join(head)
+        finally:
+            await grounded.aclose()
+
+        rag_response = "".join(head)
+        if released:
+            record_path("grounded")
+            await self._acache_grounded_response(prompt, rag_response, answered_by)
+            return
+
+        if not self._is_weak_rag_response(rag_response):
+            record_path("grounded")
+            await self._acache_grounded_response(prompt, rag_response, answered_by)
+            yield rag_response
+            return
+
+        logger.info("AI07 fallback to chat (weak RAG response)")
+        record_path("weak_rag_fallback")
+        async for delta in self._astream_with_domain_guard(prompt, model=model):
+            yield delta
+
     def add_documents(self, docs: List[str]) -> int:
+        return self.ingest_documents(docs).after_count
+
+    def _upsert_batch(
+        self,
+        collection,
+        index: int,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]],
+        max_retries: int,
+    ) -> IngestBatchResult:
+        started = time.perf_counter()
+        attempts = 0
+        error = None
+        while attempts <= max_retries:
+            attempts += 1
+            try:
+                if metadatas is None:
+                    collection.upsert(ids=ids, documents=documents)
+                else:
+                    collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+                error = None
+                break
+            except Exception as exc:
+                error = str(exc)
+                logger.warning("Chroma upsert batch %s attempt %s failed: %s", index, attempts, exc)
+                if attempts <= max_retries:
+                    time.sleep(min(0.5 * 2 ** (attempts - 1), 8.0))
+
+        result = IngestBatchResult(
+            index=index,
+            size=len(ids),
+            attempts=attempts,
+            seconds=round(time.perf_counter() - started, 4),
+            error=error,
+        )
+        if error:
+            logger.error("Chroma upsert batch %s failed after %s attempts: %s", index, attempts, error)
+        else:
+            logger.info("Chroma upsert batch %s (size=%s attempts=%s seconds=%.3f)", index, result.size, attempts, result.seconds)
+        return result
+
+    def ingest_documents(
+        self,
+        docs: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        batch_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        max_retries: Optional[int] = None,
+    ) -> IngestReport:
+        """Upsert documents in concurrent batches under content-hash IDs (re-runs are idempotent).
+
+        Every chunk is stored with `chunk_metadata`, so retrieval can filter meta
+        chunks in Chroma instead of scanning them per request.
+        """
+        started = time.perf_counter()
+        if metadatas is not None and len(metadatas) != len(docs):
+            raise ValueError("metadatas must have the same length as docs")
+
         collection = self._get_collection()
+        before_count = self.collection_count()
+        if self._uses_local_index():
+            logger.warning(
+                "CHROMA_MODE=%s serves a read-only snapshot; ingest into Chroma and re-export it instead.",
+                CHROMA_MODE_EMBEDDED_FAST,
+            )
+            collection = None
         if collection is None:
             logger.warning("Chroma collection missing; cannot add documents.")
-            return self.collection_count()
+            return IngestReport(
+                submitted=len(docs),
+                unique=0,
+                before_count=before_count,
+                after_count=before_count,
+                seconds=0.0,
+            )
 
-        start = self.collection_count()
+        # Chroma rejects duplicate IDs within one upsert, so collapse repeated chunks first.
+        records: Dict[str, tuple[str, Optional[Dict[str, Any]]]] = {}
         for offset, document in enumerate(docs):
-            try:
-                collection.upsert(ids=[f"id{start + offset}"], documents=[document])
-            except Exception as exc:
-                logger.error("Failed to upsert document %s: %s", start + offset, exc)
+            if not document or not document.strip():
+                continue
+            records.setdefault(
+                document_content_id(document),
+                (document, chunk_metadata(document, metadatas[offset] if metadatas is not None else None)),
+            )
 
-        self._count = None
-        return self.collection_count()
+        size = max(1, batch_size or self.settings.ingest_batch_size)
+        workers = max(1, max_workers or self.settings.ingest_max_workers)
+        retries = self.settings.ingest_max_retries if max_retries is None else max(0, max_retries)
+        ids = list(records)
+        batches = [ids[start:start + size] for start in range(0, len(ids), size)]
+
+        with ThreadPoolExecutor(max_workers=min(workers, max(1, len(batches)))) as executor:
+            futures = [
+                executor.submit(
+                    self._upsert_batch,
+                    collection,
+                    index,
+                    batch_ids,
+                    [records[doc_id][0] for doc_id in batch_ids],
+                    [records[doc_id][1] for doc_id in batch_ids],
+                    retries,
+                )
+                for index, batch_ids in enumerate(batches)
+            ]
+            results = [future.result() for future in futures]
+
+        if self._lexical_index_loaded:
+            for result, batch_ids in zip(results, batches):
+                if result.error is None:
+                    self._lexical_index.add_many(
+                        (doc_id, records[doc_id][0])
+                        for doc_id in batch_ids
+                        if not (self.settings.rag_metadata_filter and records[doc_id][1]["is_meta"])
+                    )
+        self.invalidate_collection_caches()
+        report = IngestReport(
+            submitted=len(docs),
+            unique=len(ids),
+            before_count=before_count,
+            after_count=self.collection_count(),
+            seconds=round(time.perf_counter() - started, 4),
+            batches=results,
+        )
+        logger.info(
+            "Ingest complete (collection=%s submitted=%s unique=%s batches=%s failed=%s before=%s after=%s seconds=%.3f)",
+            self.collection_name,
+            report.submitted,
+            report.unique,
+            len(results),
+            len(report.failed_batches),
+            report.before_count,
+            report.after_count,
+            report.seconds,
+        )
+        return report
+
+    def backfill_chunk_metadata(
+        self,
+        page_size: int = 500,
+        remove_duplicates: bool = True,
+        dry_run: bool = False,
+    ) -> MetadataBackfillReport:
+        """Tag chunks ingested before `chunk_metadata` existed, once, so RAG_METADATA_FILTER can be enabled.
+
+        Pages through the collection, adds `is_meta` / `content_hash` where they are
+        missing or stale, and (unless `remove_duplicates` is False) deletes all but
+        the first chunk of each normalized-content group, so an exact `n_results`
+        query no longer returns the same text twice.
+        """
+        started = time.perf_counter()
+        collection = None if self._uses_local_index() else self._get_collection()
+        if collection is None:
+            raise RuntimeError("Chroma collection unavailable; the embedded-fast snapshot must be re-exported instead.")
+
+        scanned = tagged = meta = 0
+        seen_hashes: Dict[str, str] = {}
+        duplicate_ids: List[str] = []
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            documents = page.get("documents") or [""] * len(ids)
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            update_ids: List[str] = []
+            update_metadatas: List[Dict[str, Any]] = []
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                scanned += 1
+                tagged_metadata = chunk_metadata(document or "", metadata)
+                meta += tagged_metadata["is_meta"]
+                content_hash = tagged_metadata["content_hash"]
+                if content_hash in seen_hashes:
+                    duplicate_ids.append(doc_id)
+                else:
+                    seen_hashes[content_hash] = doc_id
+                if tagged_metadata != (metadata or {}):
+                    update_ids.append(doc_id)
+                    update_metadatas.append(tagged_metadata)
+            if update_ids and not dry_run:
+                collection.update(ids=update_ids, metadatas=update_metadatas)
+            tagged += len(update_ids)
+            offset += len(ids)
+            if len(ids) < page_size:
+                break
+
+        deleted = 0
+        if remove_duplicates and duplicate_ids and not dry_run:
+            # Deleted after the scan so offsets stay valid while paging.
+            for start in range(0, len(duplicate_ids), page_size):
+                batch = duplicate_ids[start:start + page_size]
+                collection.delete(ids=batch)
+                deleted += len(batch)
+
+        if not dry_run:
+            self.invalidate_collection_caches()
+            self._lexical_index_loaded = False
+        report = MetadataBackfillReport(
+            scanned=scanned,
+            tagged=tagged,
+            meta=meta,
+            duplicates=len(duplicate_ids),
+            deleted=deleted,
+            seconds=round(time.perf_counter() - started, 4),
+        )
+        logger.info(
+            "Metadata backfill %s(collection=%s scanned=%s tagged=%s meta=%s duplicates=%s deleted=%s seconds=%.3f)",
+            "dry run " if dry_run else "",
+            self.collection_name,
+            report.scanned,
+            report.tagged,
+            report.meta,
+            report.duplicates,
+            report.deleted,
+            report.seconds,
+        )
+        return report
 
     def run_agent_dynamic(self, prompt: str, model: Optional[str] = None) -> Dict[str, Any]:
         response = self.generate_with_rag(prompt, model=model) if self._get_collection() else self.chat(prompt, model=model)
@@ -921,21 +3224,13 @@ def _normalize_week_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def _force_json(text: str) -> Dict[str, Any]:
-    match = re.search(r"\{[\s\S]*\}\s*$", text)
-    raw = match.group(0) if match else text
-    raw = re.sub(r",(\s*[\]}])", r"\1", raw)
-
-    try:
-        data = json.loads(raw)
-    except Exception:
+    data = extract_json(text)
+    if data is None:
         return {"suggestion": str(text).strip(), "weekly_plan": [], "progress_analysis": ""}
 
     if isinstance(data.get("suggestion"), str) and "{" in data["suggestion"] and "}" in data["suggestion"]:
-        try:
-            inner = json.loads(data["suggestion"])
-        except Exception:
-            inner = None
-        if isinstance(inner, dict):
+        inner = extract_json(data["suggestion"])
+        if inner is not None:
             for key in ("suggestion", "weekly_plan", "progress_analysis"):
                 if key in inner and key not in data:
                     data[key] = inner[key]
@@ -967,19 +3262,78 @@ def _enforce_schema(data: Dict[str, Any], num_weeks: int) -> Dict[str, Any]:
     }
 
 
+def _week_blocks(num_weeks: int, block_size: int) -> List[tuple[int, int]]:
+    """Inclusive (first, last) week ranges; a block size of 0 or less means one block."""
+    if block_size <= 0 or block_size >= num_weeks:
+        return [(1, num_weeks)]
+    return [(first, min(first + block_size - 1, num_weeks)) for first in range(1, num_weeks + 1, block_size)]
+
+
+def _merge_week_blocks(blocks: List[tuple[int, int, Dict[str, Any]]], num_weeks: int) -> Dict[str, Any]:
+    """Combine per-block JSON outputs into one plan shaped for `_enforce_schema`.
+
+    Weeks are placed by their `week` number when it falls inside the block and by
+    position otherwise; the first block that has them supplies `suggestion` and
+    `progress_analysis`.
+    """
+    weeks: List[Any] = [None] * num_weeks
+    merged: Dict[str, Any] = {"suggestion": "", "progress_analysis": ""}
+    for first, last, data in sorted(blocks, key=lambda block: block[0]):
+        for key in ("suggestion", "progress_analysis"):
+            if not merged[key] and isinstance(data.get(key), str) and data[key].strip():
+                merged[key] = data[key]
+        items = data.get("weekly_plan")
+        if not isinstance(items, list):
+            continue
+        for offset, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            try:
+                week = int(item.get("week"))
+            except (TypeError, ValueError):
+                week = first + offset
+            if not first <= week <= last:
+                week = first + offset
+            if week <= last and weeks[week - 1] is None:
+                weeks[week - 1] = item
+    merged["weekly_plan"] = [item if item is not None else {} for item in weeks]
+    return merged
+
+
+def get_shared_backend(collection_name: Optional[str] = None, settings: Optional[ActiveAISettings] = None) -> GroqChromaBackend:
+    """The process-wide backend for these settings and collection.
+
+    Routers and services share it so they also share retrieval/answer caches,
+    the collection count and the request batchers; build a `GroqChromaBackend`
+    directly only for isolated work such as ingest scripts and tests.
+    """
+    settings = settings or ActiveAISettings()
+    name = collection_name or settings.rag_collection
+    return get_shared("backend", (settings, name), lambda: GroqChromaBackend(collection_name=name, settings=settings))
+
+
 class HealthPlanService:
     def __init__(self, backend: Optional[GroqChromaBackend] = None):
-        self.backend = backend or GroqChromaBackend()
+        self.backend = backend or get_shared_backend()
+        settings = self.backend.settings
+        self._plan_cache = TTLCache(
+            max_size=settings.health_plan_cache_size,
+            ttl_seconds=settings.health_plan_cache_ttl_seconds,
+        )
 
-    def _build_prompt(
-        self,
-        analyzed_health_condition: Dict[str, Any],
-        n_results: int = 4,
-        num_weeks: int = 4,
-    ) -> str:
-        condition_json = json.dumps(analyzed_health_condition, ensure_ascii=False, indent=2)
-        schema_json = json.dumps(STRICT_SCHEMA_EXAMPLE, ensure_ascii=False, indent=2)
+    def _plan_cache_key(self, analyzed_health_condition: Dict[str, Any], num_weeks: int, model: str) -> tuple:
+        canonical = json.dumps(
+            analyzed_health_condition,
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return (self.backend.collection_name, self.backend._collection_version(), model, num_weeks, digest)
 
+    def _retrieve_context(self, analyzed_health_condition: Dict[str, Any], n_results: int, num_weeks: int) -> str:
+        condition_json = json.dumps(analyzed_health_condition, ensure_ascii=False, indent=2)
         user_task = (
             f"Generate a {num_weeks}-week diet & workout plan and analyze progress across reports. "
             "If multiple reports are given, compare them and include improvement/no-improvement notes "
@@ -989,7 +3343,30 @@ class HealthPlanService:
             query=f"{user_task}\nUser condition history: {condition_json}",
             n_results=n_results,
         )
-        joined_context = "\n- " + "\n- ".join(contexts) if contexts else ""
+        return "\n- " + "\n- ".join(contexts) if contexts else ""
+
+    def _build_prompt(
+        self,
+        analyzed_health_condition: Dict[str, Any],
+        n_results: int = 4,
+        num_weeks: int = 4,
+        first_week: int = 1,
+        last_week: Optional[int] = None,
+        joined_context: Optional[str] = None,
+    ) -> str:
+        last_week = num_weeks if last_week is None else last_week
+        count = last_week - first_week + 1
+        condition_json = json.dumps(analyzed_health_condition, ensure_ascii=False, indent=2)
+        schema_json = json.dumps(STRICT_SCHEMA_EXAMPLE, ensure_ascii=False, indent=2)
+        if joined_context is None:
+            joined_context = self._retrieve_context(analyzed_health_condition, n_results, num_weeks)
+
+        block_note = ""
+        if (first_week, last_week) != (1, num_weeks):
+            block_note = (
+                f"8) This request covers weeks {first_week}-{last_week} of a {num_weeks}-week plan; other weeks are "
+                "generated separately. Progress intensity and calories as appropriate for that stage of the plan.\n"
+            )
 
         return (
             "You are a nutrition and fitness assistant.\n"
@@ -998,14 +3375,16 @@ class HealthPlanService:
             "2) Allowed top-level keys ONLY: \"suggestion\", \"weekly_plan\", \"progress_analysis\".\n"
             "3) Types:\n"
             "   - suggestion: string (one sentence). It MUST NOT contain JSON or braces.\n"
-            "   - weekly_plan: array of exactly {n} objects, with keys:\n"
-            "       week (int 1..{n}), target_calories_per_day (int), focus (string: Weight Loss|Muscle Gain|Endurance),\n"
+            f"   - weekly_plan: array of exactly {count} objects, with keys:\n"
+            f"       week (int {first_week}..{last_week}), target_calories_per_day (int), "
+            "focus (string: Weight Loss|Muscle Gain|Endurance),\n"
             "       workouts (array of strings), meal_notes (string), reminders (array of strings)\n"
             "   - progress_analysis: string (short paragraph)\n"
             "4) Keep workouts/reminders as short bullet-like strings.\n"
             "5) Use realistic AU norms (hydration, calories, macros) when relevant.\n"
             "6) Do not include any extra keys anywhere.\n"
-            "7) Produce exactly {n} items in weekly_plan with weeks numbered 1..{n}.\n"
+            f"7) Produce exactly {count} items in weekly_plan with weeks numbered {first_week}..{last_week}.\n"
+            f"{block_note}"
             "\nSTRICT SHAPE EXAMPLE (TYPES ONLY, NOT CONTENT):\n"
             f"{schema_json}\n"
             "\nUSER CONDITION HISTORY:\n"
@@ -1014,32 +3393,106 @@ class HealthPlanService:
             f"{joined_context}\n"
         )
 
+    def _complete_json(self, client, route: RouteDecision, prompt: str, max_tokens: Optional[int], temperature: float) -> Dict[str, Any]:
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check("llm")
+            route = self.backend._within_deadline(route, deadline)
+        started = time.perf_counter()
+        response = self.backend._groq_scheduler().call(
+            client.chat.completions.create,
+            hedge=False,
+            messages=[
+                {"role": "system", "content": "You output strictly valid JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            model=route.model,
+            max_tokens=max_tokens or route.max_tokens,
+            temperature=temperature,
+            **({"timeout": route.timeout} if route.timeout else {}),
+        )
+        elapsed = time.perf_counter() - started
+        self.backend._model_router.observe(route.prompt_class, route.model, elapsed)
+        observe_stage("llm", elapsed)
+        record_tokens(route.model, getattr(response, "usage", None))
+        return _force_json((response.choices[0].message.content or "").strip())
+
     def generate_plan(
         self,
         analyzed_health_condition: Dict[str, Any],
         n_results: int = 4,
-        max_tokens: int = 1200,
+        max_tokens: Optional[int] = None,
         temperature: float = 0.2,
         num_weeks: int = 8,
+        week_block: Optional[int] = None,
     ) -> Dict[str, Any]:
-        prompt = self._build_prompt(
-            analyzed_health_condition=analyzed_health_condition,
-            n_results=n_results,
-            num_weeks=num_weeks,
-        )
+        """Generate a normalized plan, served from the plan cache when the same condition was seen.
 
+        Plans longer than `week_block` weeks (default HEALTH_PLAN_WEEK_BLOCK) are split
+        into week ranges generated as parallel completions and merged, so each
+        completion stays short enough not to be truncated.
+        """
         client = self.backend._get_groq_client()
         if client is None:
             raise RuntimeError("Groq backend is not configured.")
 
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You output strictly valid JSON."},
-                {"role": "user", "content": prompt},
-            ],
-            model=self.backend.settings.groq_model,
-            max_tokens=max_tokens,
-            temperature=temperature,
+        route = self.backend._model_router.route(STRUCTURED_JSON)
+        cache_key = self._plan_cache_key(analyzed_health_condition, num_weeks, route.model)
+        cached = self._plan_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Health plan cache hit (num_weeks=%s)", num_weeks)
+            record_cache_hit("health_plan")
+            return copy.deepcopy(cached)
+
+        joined_context = self._retrieve_context(analyzed_health_condition, n_results, num_weeks)
+        blocks = _week_blocks(num_weeks, self.backend.settings.health_plan_week_block if week_block is None else week_block)
+
+        def generate_block(first: int, last: int) -> Dict[str, Any]:
+            prompt = self._build_prompt(
+                analyzed_health_condition=analyzed_health_condition,
+                n_results=n_results,
+                num_weeks=num_weeks,
+                first_week=first,
+                last_week=last,
+                joined_context=joined_context,
+            )
+            return self._complete_json(client, route, prompt, max_tokens, temperature)
+
+        started = time.perf_counter()
+        if len(blocks) == 1:
+            outputs = [(1, num_weeks, generate_block(1, num_weeks))]
+        else:
+            # Each block runs in a copy of the request context so the deadline and trace spans reach it.
+            futures = [
+                (first, last, _PLAN_BLOCK_EXECUTOR.submit(contextvars.copy_context().run, generate_block, first, last))
+                for first, last in blocks
+            ]
+            outputs = []
+            errors = []
+            for first, last, future in futures:
+                try:
+                    outputs.append((first, last, future.result()))
+                except Exception as exc:
+                    logger.error("Health plan weeks %s-%s failed: %s", first, last, exc)
+                    errors.append(exc)
+            if not outputs:
+                raise errors[0]
+        logger.info(
+            "Health plan generated (num_weeks=%s blocks=%s elapsed=%.2fs)",
+            num_weeks,
+            len(blocks),
+            time.perf_counter() - started,
         )
-        output = (response.choices[0].message.content or "").strip()
-        return _enforce_schema(_force_json(output), num_weeks=num_weeks)
+
+        plan = _enforce_schema(_merge_week_blocks(outputs, num_weeks), num_weeks=num_weeks)
+        # Plans patched with default weeks (failed block or unparseable output) are not cached.
+        complete = len(outputs) == len(blocks) and all(
+            isinstance(data.get("weekly_plan"), list) and len(data["weekly_plan"]) >= last - first + 1
+            for first, last, data in outputs
+        )
+        if complete:
+            self._plan_cache.set(cache_key, copy.deepcopy(plan))
+        return plan
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self._plan_cache.stats()
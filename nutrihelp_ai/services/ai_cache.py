@@ -0,0 +1,219 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+EmbedFn = Callable[[List[str]], Optional[List[List[float]]]]
+
+_MISSING = object()
+
+# Filler words that do not change what a nutrition question is asking about.
+_PROMPT_STOPWORDS = {
+    "a",
+    "an",
+    "the",
+    "is",
+    "are",
+    "am",
+    "was",
+    "were",
+    "do",
+    "does",
+    "please",
+    "really",
+}
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max(0, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - stored_at > self.ttl_seconds
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self._expired(stored_at, self._clock()):
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def values(self) -> List[Any]:
+        """Snapshot of live values, most recently used last."""
+        with self._lock:
+            now = self._clock()
+            return [value for stored_at, value in self._entries.values() if not self._expired(stored_at, now)]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Reduce a prompt to a cache key: lowercase words, filler dropped, crude singular forms."""
+    words = re.findall(r"[a-z0-9]+(?:['-][a-z0-9]+)*", (prompt or "").lower())
+    normalized = []
+    for word in words:
+        if word in _PROMPT_STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        normalized.append(word)
+    return " ".join(normalized)
+
+
+class ResponseCache:
+    """Answer cache keyed by normalized prompt, with optional embedding-similarity matching.
+
+    Entries are scoped by a namespace (collection + model) so answers grounded in
+    one collection are never served for another.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        similarity_threshold: float = 0.0,
+        embed_fn: Optional[EmbedFn] = None,
+    ):
+        self._entries = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._vectors = TTLCache(max_size=min(max_size, 256), ttl_seconds=ttl_seconds)
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self.similar_hits = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._entries.enabled
+
+    @property
+    def uses_embeddings(self) -> bool:
+        return self.similarity_threshold > 0 and self.embed_fn is not None
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        vector = self._vectors.get(normalized)
+        if vector is not None:
+            return vector
+        try:
+            embedded = self.embed_fn([normalized]) if self.embed_fn else None
+        except Exception:
+            return None
+        if not embedded:
+            return None
+        vector = np.asarray(embedded[0], dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        vector = vector / norm
+        self._vectors.set(normalized, vector)
+        return vector
+
+    def lookup(self, namespace: str, prompt: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return None
+
+        entry = self._entries.get((namespace, normalized))
+        if entry is not None:
+            return entry["response"]
+        if not self.uses_embeddings:
+            return None
+
+        vector = self._embed(normalized)
+        if vector is None:
+            return None
+
+        best_score = self.similarity_threshold
+        best = None
+        for candidate in self._entries.values():
+            if candidate["namespace"] != namespace or candidate["vector"] is None:
+                continue
+            score = float(np.dot(vector, candidate["vector"]))
+            if score >= best_score:
+                best_score = score
+                best = candidate
+        if best is None:
+            return None
+        self.similar_hits += 1
+        return best["response"]
+
+    def store(self, namespace: str, prompt: str, response: str) -> None:
+        if not self.enabled or not response:
+            return
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return
+        vector = self._embed(normalized) if self.uses_embeddings else None
+        self._entries.set(
+            (namespace, normalized),
+            {"namespace": namespace, "response": response, "vector": vector},
+        )
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._entries.stats()
+        stats["similar_hits"] = self.similar_hits
+        stats["invalidations"] = self.invalidations
+        lookups = stats["hits"] + stats["misses"]
+        hits = stats["hits"] + self.similar_hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
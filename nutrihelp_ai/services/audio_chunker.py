@@ -0,0 +1,196 @@
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Decoded PCM sent to Whisper: 16 kHz mono 16-bit, about 32 KB per second.
+PCM_SAMPLE_RATE = 16000
+PCM_SAMPLE_WIDTH = 2
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AudioChunkingConfig:
+    chunk_seconds: float = 30.0
+    overlap_seconds: float = 2.0
+    max_upload_bytes: int = 100 * 1024 * 1024
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    start: float
+    end: float
+    wav: bytes
+
+
+async def spool_upload(
+    pieces: AsyncIterator[bytes],
+    max_bytes: int,
+    suffix: str = "",
+) -> str:
+    """Write a streamed upload to a temporary file and return its path; the caller deletes it."""
+    handle = tempfile.NamedTemporaryFile(prefix="nutrihelp-audio-", suffix=suffix, delete=False)
+    written = 0
+    try:
+        with handle:
+            async for piece in pieces:
+                written += len(piece)
+                if max_bytes > 0 and written > max_bytes:
+                    raise UploadTooLargeError(f"Audio upload exceeds {max_bytes} bytes")
+                handle.write(piece)
+    except BaseException:
+        os.remove(handle.name)
+        raise
+    return handle.name
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def _wav_bytes(pcm: bytes, channels: int, sample_width: int, rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(sample_width)
+        writer.setframerate(rate)
+        writer.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _windows(
+    read: Callable[[int], bytes],
+    channels: int,
+    sample_width: int,
+    rate: int,
+    config: AudioChunkingConfig,
+) -> Iterator[AudioChunk]:
+    """Cut a PCM stream into overlapping WAV chunks, holding at most one window in memory."""
+    frame_size = channels * sample_width
+    window_frames = max(1, int(config.chunk_seconds * rate))
+    overlap_frames = min(max(0, int(config.overlap_seconds * rate)), window_frames - 1)
+    step_frames = window_frames - overlap_frames
+
+    buffer = bytearray()
+    start_frame = 0
+    index = 0
+    exhausted = False
+    while not exhausted:
+        while len(buffer) < window_frames * frame_size:
+            piece = read(window_frames * frame_size - len(buffer))
+            if not piece:
+                exhausted = True
+                break
+            buffer += piece
+        frames = len(buffer) // frame_size
+        # At the end, a remainder already covered by the previous chunk's overlap is dropped.
+        if frames == 0 or (exhausted and index > 0 and frames <= overlap_frames):
+            break
+        pcm = bytes(buffer[: frames * frame_size])
+        yield AudioChunk(
+            index=index,
+            start=start_frame / rate,
+            end=(start_frame + frames) / rate,
+            wav=_wav_bytes(pcm, channels, sample_width, rate),
+        )
+        index += 1
+        del buffer[: step_frames * frame_size]
+        start_frame += step_frames
+
+
+def _wav_chunks(path: str, config: AudioChunkingConfig) -> Optional[Iterator[AudioChunk]]:
+    try:
+        reader = wave.open(path, "rb")
+    except (wave.Error, EOFError):
+        return None
+
+    def generate() -> Iterator[AudioChunk]:
+        with reader:
+            frame_size = reader.getnchannels() * reader.getsampwidth()
+            yield from _windows(
+                lambda size: reader.readframes(size // frame_size),
+                reader.getnchannels(),
+                reader.getsampwidth(),
+                reader.getframerate(),
+                config,
+            )
+
+    return generate()
+
+
+def _ffmpeg_chunks(path: str, config: AudioChunkingConfig) -> Iterator[AudioChunk]:
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", path,
+        "-f", "s16le", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "pipe:1",
+    ]
+    # stderr goes to a file rather than a pipe: nothing reads it until ffmpeg
+    # exits, and a full pipe buffer would stall the decoder mid-stream.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            yield from _windows(process.stdout.read, 1, PCM_SAMPLE_WIDTH, PCM_SAMPLE_RATE, config)
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"ffmpeg could not decode audio: {stderr.read(200).decode(errors='replace')}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+
+
+def split_audio(path: str, config: AudioChunkingConfig) -> Optional[Iterator[AudioChunk]]:
+    """Lazily split the recording at `path` into overlapping WAV chunks.
+
+    PCM WAV files are read directly; other formats are decoded by ffmpeg when it
+    is installed. Returns None when the audio cannot be split here, in which case
+    the file should be transcribed in one request.
+    """
+    chunks = _wav_chunks(path, config)
+    if chunks is not None:
+        return chunks
+    if ffmpeg_available():
+        return _ffmpeg_chunks(path, config)
+    return None
+
+
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def _normalize_word(word: str) -> str:
+    match = _WORD_RE.search(word.lower())
+    return match.group(0) if match else word.lower()
+
+
+def stitch_transcripts(texts: List[str], max_overlap_words: int = 30) -> str:
+    """Join chunk transcripts in order, dropping words repeated across a chunk overlap.
+
+    The longest run (two words or more) ending the transcript so far that also
+    starts the next chunk is treated as audio both chunks heard, and is kept once.
+    """
+    words: List[str] = []
+    for text in texts:
+        incoming = (text or "").split()
+        if not incoming:
+            continue
+        tail = [_normalize_word(word) for word in words[-max_overlap_words:]]
+        head = [_normalize_word(word) for word in incoming[:max_overlap_words]]
+        overlap = 0
+        for size in range(min(len(tail), len(head)), 1, -1):
+            if tail[-size:] == head[:size]:
+                overlap = size
+                break
+        words.extend(incoming[overlap:])
+    return " ".join(words)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One Groq client, Chroma client and collection handle per (kind, settings key)
+# for the whole process. Async handles are bound to the event loop that created
+# them, so they are held per loop (weakly, so a closed loop's handles go with it
+# rather than being handed to a new loop that reuses its id). Construction runs
+# at most once per key: concurrent first callers wait for the builder.
+_lock = threading.Lock()
+_shared: Dict[Tuple[str, Hashable], Any] = {}
+_build_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+_async_shared: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Hashable], Any]]" = weakref.WeakKeyDictionary()
+_async_build_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Hashable], asyncio.Lock]]" = (
+    weakref.WeakKeyDictionary()
+)
+_builds: Dict[str, int] = {}
+# Content versions outlive the handles: close_shared_clients() does not reset them.
+_versions: Dict[Tuple[str, Hashable], int] = {}
+
+
+def _record_build(kind: str) -> None:
+    with _lock:
+        _builds[kind] = _builds.get(kind, 0) + 1
+
+
+def get_shared(kind: str, key: Hashable, build: Callable[[], Any]) -> Optional[Any]:
+    """Process-wide instance of `kind` for `key`, built by `build()` on first use.
+
+    A builder that returns None or raises is not cached, so a missing API key or
+    an unreachable Chroma is retried on the next call.
+    """
+    slot = (kind, key)
+    with _lock:
+        if slot in _shared:
+            return _shared[slot]
+        build_lock = _build_locks.setdefault(slot, threading.Lock())
+    with build_lock:
+        with _lock:
+            if slot in _shared:
+                return _shared[slot]
+        value = build()
+        if value is not None:
+            _record_build(kind)
+            with _lock:
+                _shared[slot] = value
+        return value
+
+
+async def aget_shared(kind: str, key: Hashable, build: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+    """Loop-bound counterpart of `get_shared` for async clients."""
+    loop = asyncio.get_running_loop()
+    slot = (kind, key)
+    with _lock:
+        shared = _async_shared.setdefault(loop, {})
+        if slot in shared:
+            return shared[slot]
+        build_lock = _async_build_locks.setdefault(loop, {}).setdefault(slot, asyncio.Lock())
+    async with build_lock:
+        with _lock:
+            if slot in shared:
+                return shared[slot]
+        value = await build()
+        if value is not None:
+            _record_build(kind)
+            with _lock:
+                shared[slot] = value
+        return value
+
+
+def get_loop_shared(kind: str, key: Hashable, build: Callable[[], Any]) -> Optional[Any]:
+    """Like `aget_shared` for a synchronous builder, e.g. an async SDK client built on a loop-bound transport."""
+    loop = asyncio.get_running_loop()
+    slot = (kind, key)
+    with _lock:
+        shared = _async_shared.setdefault(loop, {})
+        if slot in shared:
+            return shared[slot]
+    # Nothing else runs on this loop while the builder does, so no build lock is needed.
+    value = build()
+    if value is not None:
+        _record_build(kind)
+        with _lock:
+            shared[slot] = value
+    return value
+
+
+def discard_shared(kind: str, key: Hashable) -> None:
+    """Forget one handle (e.g. a collection that was deleted and recreated) so the next caller rebuilds it."""
+    with _lock:
+        _shared.pop((kind, key), None)
+        for shared in _async_shared.values():
+            shared.pop((kind, key), None)
+
+
+def shared_version(kind: str, key: Hashable) -> int:
+    """How many times the content behind (kind, key) has changed in this process."""
+    with _lock:
+        return _versions.get((kind, key), 0)
+
+
+def bump_shared_version(kind: str, key: Hashable) -> int:
+    """Record a change to the content behind (kind, key), e.g. an ingest into a collection.
+
+    Every holder of the shared handle sees the new version, so caches derived
+    from the old content can be dropped by whichever instance holds them.
+    """
+    with _lock:
+        version = _versions[(kind, key)] = _versions.get((kind, key), 0) + 1
+        return version
+
+
+def close_shared_clients() -> None:
+    """Drop every shared handle; the next caller builds fresh ones.
+
+    Groq clients are not closed here: their transports belong to the shared
+    HTTP pool, which `close_http_clients` shuts down.
+    """
+    with _lock:
+        released = len(_shared) + sum(len(shared) for shared in _async_shared.values())
+        _shared.clear()
+        _build_locks.clear()
+        _async_shared.clear()
+        _async_build_locks.clear()
+    if released:
+        logger.info("Released %s shared client handle(s)", released)
+
+
+def registry_stats() -> Dict[str, Any]:
+    with _lock:
+        live: Dict[str, int] = {}
+        for kind, _ in _shared:
+            live[kind] = live.get(kind, 0) + 1
+        for shared in _async_shared.values():
+            for kind, _ in shared:
+                live[kind] = live.get(kind, 0) + 1
+        return {"live": live, "builds": dict(_builds)}
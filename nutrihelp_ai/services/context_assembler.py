@@ -0,0 +1,157 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from nutrihelp_ai.services.lexical_index import tokenize
+
+_HEADER_RE = re.compile(r"^(Title|Source):[ \t]*(.*)$", re.IGNORECASE)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for budgets and logging."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    original_tokens: int
+    tokens: int
+    sentences_kept: int = 0
+    sentences_dropped: int = 0
+    duplicates_dropped: int = 0
+    sources: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.tokens)
+
+
+@dataclass
+class _Sentence:
+    text: str
+    source: int
+    chunk: int
+    position: int
+    score: float
+
+
+def _split_chunk(chunk: str) -> Tuple[Optional[str], Optional[str], str]:
+    """Separate the `Title:` / `Source:` header lines written by build_documents from the body."""
+    title = source = None
+    lines = chunk.strip().splitlines()
+    body_start = 0
+    for index, line in enumerate(lines):
+        match = _HEADER_RE.match(line.strip())
+        if not match:
+            if line.strip():
+                break
+            body_start = index + 1
+            continue
+        if match.group(1).lower() == "title":
+            title = match.group(2).strip()
+        else:
+            source = match.group(2).strip()
+        body_start = index + 1
+    return title, source, " ".join(" ".join(lines[body_start:]).split())
+
+
+def _is_near_duplicate(words: frozenset, seen: List[frozenset], threshold: float) -> bool:
+    for other in seen:
+        union = len(words | other)
+        if union and len(words & other) / union >= threshold:
+            return True
+    return False
+
+
+def assemble_context(
+    contexts: List[str],
+    question: str,
+    token_budget: int,
+    duplicate_threshold: float = 0.8,
+) -> AssembledContext:
+    """Fit retrieved chunks into `token_budget` tokens of grounding context.
+
+    Title/Source headers become one numbered citation table, near-duplicate
+    sentences across chunks are dropped (word-set Jaccard >= duplicate_threshold),
+    and sentences are taken by query-term overlap, then retrieval rank, until the
+    budget is full. The kept sentences are emitted in their original order, each
+    run tagged with its citation number. A budget of 0 or less keeps the chunks
+    verbatim.
+    """
+    original = "\n\n".join(contexts)
+    original_tokens = estimate_tokens(original)
+    if token_budget <= 0 or not contexts:
+        return AssembledContext(text=original, original_tokens=original_tokens, tokens=original_tokens)
+
+    query_terms = set(tokenize(question))
+    sources: List[Tuple[str, str]] = []
+    source_index: Dict[Tuple[str, str], int] = {}
+    sentences: List[_Sentence] = []
+    seen_words: List[frozenset] = []
+    duplicates = 0
+
+    for chunk_rank, chunk in enumerate(contexts):
+        title, source, body = _split_chunk(chunk)
+        key = (title or "", source or "")
+        if key not in source_index:
+            source_index[key] = len(sources)
+            sources.append(key)
+        for position, text in enumerate(_SENTENCE_SPLIT_RE.split(body)):
+            text = text.strip()
+            words = frozenset(_WORD_RE.findall(text.lower()))
+            if not words:
+                continue
+            if _is_near_duplicate(words, seen_words, duplicate_threshold):
+                duplicates += 1
+                continue
+            seen_words.append(words)
+            overlap = len(query_terms.intersection(tokenize(text)))
+            sentences.append(_Sentence(text, source_index[key], chunk_rank, position, float(overlap)))
+
+    def citation(source: int) -> str:
+        title, url = sources[source]
+        return " - ".join(part for part in (title, url) if part) or "retrieved context"
+
+    # The citation table counts against the budget the first time a source is used.
+    ranked = sorted(sentences, key=lambda item: (-item.score, item.chunk, item.position))
+    used_tokens = estimate_tokens("SOURCES:\n\n")
+    kept: List[_Sentence] = []
+    cited_sources = set()
+    for sentence in ranked:
+        cost = estimate_tokens(sentence.text) + 1
+        if sentence.source not in cited_sources:
+            cost += estimate_tokens(citation(sentence.source)) + 3
+        if kept and used_tokens + cost > token_budget:
+            continue
+        kept.append(sentence)
+        cited_sources.add(sentence.source)
+        used_tokens += cost
+
+    kept.sort(key=lambda item: (item.chunk, item.position))
+    cited = sorted({sentence.source for sentence in kept})
+    numbers = {source: number for number, source in enumerate(cited, start=1)}
+
+    table = [f"[{numbers[source]}] {citation(source)}" for source in cited]
+
+    passages: List[str] = []
+    current = None
+    for sentence in kept:
+        if sentence.source != current:
+            passages.append(f"[{numbers[sentence.source]}] {sentence.text}")
+            current = sentence.source
+        else:
+            passages[-1] += f" {sentence.text}"
+
+    text = "SOURCES:\n" + "\n".join(table) + "\n\n" + "\n".join(passages)
+    return AssembledContext(
+        text=text,
+        original_tokens=original_tokens,
+        tokens=estimate_tokens(text),
+        sentences_kept=len(kept),
+        sentences_dropped=len(sentences) - len(kept),
+        duplicates_dropped=duplicates,
+        sources=[sources[source] for source in cited],
+    )
@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Relative budget in milliseconds, e.g. `X-Request-Timeout-Ms: 8000` from a client that gives up after 8 s.
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out during `stage`."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"request deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class ClientDisconnected(Exception):
+    """The client went away before its answer was ready."""
+
+
+@dataclass(frozen=True)
+class StageBudgets:
+    retrieval_seconds: float = 1.0  # longest a retrieval may take under a deadline
+    grounded_min_seconds: float = 2.0  # left for the grounded completion, or retrieval is skipped
+    fallback_min_seconds: float = 1.0  # left for a fallback completion, or the weak grounded answer is kept
+
+
+class Deadline:
+    """Absolute end time for one request; stages ask it how much time they have left."""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.budget = max(0.0, seconds)
+        self._clock = clock
+        self.expires_at = clock() + self.budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Time a stage may use: what is left, but no more than its own `cap`."""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    async def run(self, awaitable: Awaitable[Any], stage: str, cap: Optional[float] = None) -> Any:
+        """Await `awaitable` within the remaining budget, cancelling it and raising DeadlineExceeded on overrun."""
+        timeout = self.timeout(cap)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage)
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage) from None
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("nutrihelp_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make `deadline` the current one for the enclosed block (and tasks/threads started from it)."""
+    if deadline is None:
+        yield current_deadline()
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def deadline_from_header(value: Optional[str], default_seconds: float = 0.0) -> Optional[Deadline]:
+    """Deadline for a request: the header's budget, capped by the configured default when both are set."""
+    seconds = default_seconds if default_seconds > 0 else None
+    if value:
+        try:
+            requested = float(value) / 1000
+        except ValueError:
+            logger.warning("Ignoring invalid %s header: %r", DEADLINE_HEADER, value)
+        else:
+            if requested > 0:
+                seconds = requested if seconds is None else min(seconds, requested)
+    return Deadline(seconds) if seconds is not None else None
+
+
+async def run_until_disconnected(
+    is_disconnected: Callable[[], Awaitable[bool]],
+    awaitable: Awaitable[Any],
+    poll_seconds: float = 0.25,
+) -> Any:
+    """Await `awaitable`, cancelling it and raising ClientDisconnected if the client leaves first."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from functools import cached_property
+from io import BytesIO
+from typing import Dict, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+class DecodedImage:
+    """One upload, decoded and EXIF-oriented once, shared by every analysis stage.
+
+    The quality check, the food-presence gate and the classifier each used to
+    decode the raw bytes themselves. Conversions (grayscale, HSV, the small
+    square resizes) are computed on first use and reused by later stages, so
+    keep the cached values read-only.
+    """
+
+    def __init__(self, image: Image.Image):
+        self.image = image if image.mode == "RGB" else image.convert("RGB")
+        self._resized: Dict[int, Image.Image] = {}
+
+    @classmethod
+    def from_bytes(cls, image_bytes: bytes) -> "DecodedImage":
+        if not image_bytes:
+            raise InvalidImageError("Uploaded file is empty.")
+
+        try:
+            with Image.open(BytesIO(image_bytes)) as src:
+                image = ImageOps.exif_transpose(src).convert("RGB")
+        except UnidentifiedImageError as exc:
+            raise InvalidImageError("Uploaded file is not a supported image.") from exc
+        return cls(image)
+
+    @classmethod
+    def coerce(cls, image: Union[bytes, Image.Image, "DecodedImage"]) -> "DecodedImage":
+        if isinstance(image, DecodedImage):
+            return image
+        if isinstance(image, Image.Image):
+            return cls(ImageOps.exif_transpose(image))
+        return cls.from_bytes(image)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @cached_property
+    def rgb_array(self) -> np.ndarray:
+        return np.asarray(self.image, dtype=np.uint8)
+
+    @cached_property
+    def gray(self) -> Image.Image:
+        return self.image.convert("L")
+
+    @cached_property
+    def gray_array(self) -> np.ndarray:
+        return np.asarray(self.gray, dtype=np.uint8)
+
+    @cached_property
+    def hsv_array(self) -> np.ndarray:
+        return np.asarray(self.image.convert("HSV"), dtype=np.uint8)
+
+    def resized(self, size: int) -> Image.Image:
+        """Square `size`x`size` copy, as the 96 px cartoon check and 128 px food-presence features use."""
+        resized = self._resized.get(size)
+        if resized is None:
+            resized = self._resized[size] = self.image.resize((size, size))
+        return resized
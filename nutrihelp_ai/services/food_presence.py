@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 import logging
-from io import BytesIO
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
 import numpy as np
-from PIL import Image, ImageFilter, ImageOps, ImageStat
+from PIL import Image, ImageFilter, ImageStat
+
+from nutrihelp_ai.services.decoded_image import DecodedImage
 
 try:
     import joblib
@@ -26,17 +27,18 @@ def _histogram(values: np.ndarray, bins: int, value_range: tuple[float, float])
     return hist.astype(np.float32) / float(total)
 
 
-def extract_food_presence_features(image: Image.Image) -> np.ndarray:
-    image = ImageOps.exif_transpose(image).convert("RGB")
+def extract_food_presence_features(image: Union[Image.Image, DecodedImage]) -> np.ndarray:
+    image = DecodedImage.coerce(image)
     width, height = image.size
-    resized = image.resize((128, 128))
+    resized = image.resized(128)
+    resized_gray = resized.convert("L")
     rgb = np.asarray(resized, dtype=np.float32) / 255.0
-    gray = np.asarray(resized.convert("L"), dtype=np.float32) / 255.0
+    gray = np.asarray(resized_gray, dtype=np.float32) / 255.0
     hsv = np.asarray(resized.convert("HSV"), dtype=np.float32)
 
-    edge_image = resized.convert("L").filter(ImageFilter.FIND_EDGES)
+    edge_image = resized_gray.filter(ImageFilter.FIND_EDGES)
     edge_values = np.asarray(edge_image, dtype=np.float32) / 255.0
-    stat = ImageStat.Stat(resized.convert("L"))
+    stat = ImageStat.Stat(resized_gray)
 
     features = [
         width / max(1, height),
@@ -109,7 +111,7 @@ class FoodPresenceService:
             logger.warning("Food presence model disabled: %s", exc, exc_info=True)
             return None
 
-    def analyze(self, image_bytes: bytes) -> Dict[str, object]:
+    def analyze(self, image: Union[bytes, DecodedImage]) -> Dict[str, object]:
         model = self._get_model()
         if model is None:
             return {
@@ -120,8 +122,7 @@ class FoodPresenceService:
                 "reason": self._load_error or "model unavailable",
             }
 
-        with Image.open(BytesIO(image_bytes)) as src:
-            features = extract_food_presence_features(src).reshape(1, -1)
+        features = extract_food_presence_features(DecodedImage.coerce(image)).reshape(1, -1)
 
         if hasattr(model, "predict_proba"):
             probability = float(model.predict_proba(features)[0][1])
@@ -0,0 +1,439 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from urllib.error import URLError
+
+logger = logging.getLogger(__name__)
+
+_HEDGE_WORKERS = 16
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix="groq-hedge")
+_hedge_lock = threading.Lock()
+_hedge_in_flight = 0
+
+
+def hedge_threads_in_flight() -> int:
+    return _hedge_in_flight
+
+
+def _submit_hedged(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Optional[Future]:
+    """Run `fn` on the hedge pool, or return None when every worker is already busy.
+
+    A synchronous attempt cannot be cancelled, so the loser of a hedge keeps its
+    worker until Groq answers it. Refusing to queue behind those workers bounds
+    the cost: the caller then runs the call inline without a hedge.
+    """
+    global _hedge_in_flight
+    with _hedge_lock:
+        if _hedge_in_flight >= _HEDGE_WORKERS:
+            return None
+        _hedge_in_flight += 1
+
+    def run() -> Any:
+        global _hedge_in_flight
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with _hedge_lock:
+                _hedge_in_flight -= 1
+
+    return _HEDGE_EXECUTOR.submit(run)
+
+
+class GroqUnavailableError(Exception):
+    """Raised instead of calling Groq when the scheduler refuses the request."""
+
+
+class CircuitOpenError(GroqUnavailableError):
+    pass
+
+
+class RateLimitedError(GroqUnavailableError):
+    pass
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """True for errors that say Groq itself is unhealthy: 5xx, timeouts and connection failures.
+
+    Client errors (bad request, auth, context length, 429) and local bugs are not
+    counted by the circuit breaker, so a few malformed prompts cannot open it
+    for everyone.
+    """
+    status = _status_code(exc)
+    if status is not None:
+        return status >= 500
+    if isinstance(exc, (TimeoutError, ConnectionError, URLError)):
+        return True
+    # httpx transport errors and the Groq SDK's APIConnectionError/APITimeoutError, matched by name
+    # so neither package has to be importable here.
+    return any(
+        cls.__name__ in {"TransportError", "TimeoutException", "APIConnectionError", "APITimeoutError"}
+        for cls in type(exc).__mro__
+    )
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """True for upstream 429s, which must not be retried over another transport."""
+    return _status_code(exc) == 429
+
+
+@dataclass(frozen=True)
+class ResilienceConfig:
+    requests_per_minute: float = 0.0
+    burst: int = 10
+    queue_timeout: float = 10.0
+    breaker_failure_rate: float = 0.5
+    breaker_window: int = 20
+    breaker_min_calls: int = 10
+    breaker_open_seconds: float = 30.0
+    hedge: bool = False
+    hedge_min_samples: int = 20
+
+
+class TokenBucket:
+    """Client-side request limiter: `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _take(self) -> float:
+        """Take a token if one is available; otherwise return seconds until the next one."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def try_acquire(self) -> bool:
+        return not self.enabled or self._take() == 0.0
+
+    def acquire(self, timeout: float) -> bool:
+        if not self.enabled:
+            return True
+        deadline = self._clock() + timeout
+        self.waiting += 1
+        try:
+            while True:
+                delay = self._take()
+                if delay == 0.0:
+                    return True
+                if self._clock() + delay > deadline:
+                    self.rejected += 1
+                    return False
+                time.sleep(delay)
+        finally:
+            self.waiting -= 1
+
+    async def aacquire(self, timeout: float) -> bool:
+        if not self.enabled:
+            return True
+        deadline = self._clock() + timeout
+        self.waiting += 1
+        try:
+            while True:
+                delay = self._take()
+                if delay == 0.0:
+                    return True
+                if self._clock() + delay > deadline:
+                    self.rejected += 1
+                    return False
+                await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+
+
+class CircuitBreaker:
+    """Opens when the failure rate over the last `window` calls reaches `failure_rate`.
+
+    While open every call is refused; after `open_seconds` one probe call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate: float,
+        window: int,
+        min_calls: int,
+        open_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=max(1, window))
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.opened = 0
+        self.short_circuited = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if success:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._trip()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                self.failure_rate > 0
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_rate
+            ):
+                self._trip()
+
+    def release(self) -> None:
+        """Give back a half-open probe slot that was admitted but never ran."""
+        with self._lock:
+            self._probing = False
+
+    def _trip(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+        self.opened += 1
+        logger.warning("Groq circuit breaker opened for %.0fs", self.open_seconds)
+
+    def failure_ratio(self) -> float:
+        with self._lock:
+            return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class GroqScheduler:
+    """Rate limiting, circuit breaking and optional p95 hedging around Groq calls."""
+
+    def __init__(self, config: ResilienceConfig, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self.bucket = TokenBucket(config.requests_per_minute / 60.0, config.burst, clock=clock)
+        self.breaker = CircuitBreaker(
+            failure_rate=config.breaker_failure_rate,
+            window=config.breaker_window,
+            min_calls=config.breaker_min_calls,
+            open_seconds=config.breaker_open_seconds,
+            clock=clock,
+        )
+        self.latency = LatencyWindow()
+        self.calls = 0
+        self.failures = 0
+        self.client_errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        # Only hedge while the breaker is closed: a half-open probe slot admits exactly one call.
+        if not self.config.hedge or len(self.latency) < self.config.hedge_min_samples:
+            return None
+        if self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        return self.latency.percentile(0.95)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            raise CircuitOpenError("Groq circuit breaker is open")
+
+    def _record(self, started: float, error: Optional[BaseException]) -> None:
+        self.calls += 1
+        if error is None:
+            self.latency.add(time.perf_counter() - started)
+            self.breaker.record(True)
+            return
+        if is_upstream_failure(error):
+            self.failures += 1
+            self.breaker.record(False)
+            return
+        # Groq answered; the request (or our handling of it) was at fault.
+        self.client_errors += 1
+        self.breaker.record(True)
+
+    def _run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            self._record(started, exc)
+            raise
+        self._record(started, None)
+        return result
+
+    def call(self, fn: Callable[..., Any], *args: Any, hedge: bool = True, **kwargs: Any) -> Any:
+        self._admit()
+        if not self.bucket.acquire(self.config.queue_timeout):
+            self.breaker.release()
+            raise RateLimitedError("Groq client-side rate limit queue timed out")
+
+        delay = self.hedge_delay() if hedge else None
+        if delay is None:
+            return self._run(fn, *args, **kwargs)
+
+        primary = _submit_hedged(self._run, fn, *args, **kwargs)
+        if primary is None:
+            self.hedges_skipped += 1
+            return self._run(fn, *args, **kwargs)
+        done, _ = wait_futures([primary], timeout=delay)
+        if done or self.breaker.state != CircuitBreaker.CLOSED or not self.bucket.try_acquire():
+            return primary.result()
+
+        backup = _submit_hedged(self._run, fn, *args, **kwargs)
+        if backup is None:
+            self.hedges_skipped += 1
+            return primary.result()
+
+        self.hedges += 1
+        pending = {primary, backup}
+        while True:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in done if future.exception() is None]
+            # A hedge that fails hands over to the other attempt rather than failing the call.
+            if succeeded or not pending:
+                winner = succeeded[0] if succeeded else next(iter(done))
+                if winner is backup and succeeded:
+                    self.hedge_wins += 1
+                return winner.result()
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args: Any, hedge: bool = True, **kwargs: Any) -> Any:
+        self._admit()
+        if not await self.bucket.aacquire(self.config.queue_timeout):
+            self.breaker.release()
+            raise RateLimitedError("Groq client-side rate limit queue timed out")
+
+        async def run() -> Any:
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except BaseException as exc:
+                self._record(started, exc)
+                raise
+            self._record(started, None)
+            return result
+
+        delay = self.hedge_delay() if hedge else None
+        if delay is None:
+            return await run()
+
+        primary = asyncio.ensure_future(run())
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done or self.breaker.state != CircuitBreaker.CLOSED or not self.bucket.try_acquire():
+            return await primary
+
+        self.hedges += 1
+        backup = asyncio.ensure_future(run())
+        pending = {primary, backup}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                # A hedge that fails hands over to the other attempt rather than failing the call.
+                if succeeded or not pending:
+                    winner = succeeded[0] if succeeded else next(iter(done))
+                    if winner is backup and succeeded:
+                        self.hedge_wins += 1
+                    return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(0.95)
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "short_circuited": self.breaker.short_circuited,
+            "failure_ratio": round(self.breaker.failure_ratio(), 4),
+            "queue_depth": self.bucket.waiting,
+            "rate_limited": self.bucket.rejected,
+            "calls": self.calls,
+            "failures": self.failures,
+            "client_errors": self.client_errors,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_threads_in_flight": hedge_threads_in_flight(),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+_schedulers: Dict[ResilienceConfig, GroqScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(config: ResilienceConfig) -> GroqScheduler:
+    """Process-wide scheduler for `config`, so every backend instance shares one quota."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(config)
+        if scheduler is None:
+            scheduler = GroqScheduler(config)
+            _schedulers[config] = scheduler
+        return scheduler
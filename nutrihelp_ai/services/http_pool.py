@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    max_connections: int = 20
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    keepalive_expiry: float = 60.0
+
+    def timeout(self):
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+# One keep-alive pool per configuration for the whole process. Async clients are
+# bound to the event loop that created them, so they are held per loop (weakly,
+# so a closed loop's clients go with it rather than being handed to a new loop
+# that reuses its id).
+_lock = threading.Lock()
+_clients: Dict[HttpPoolConfig, "httpx.Client"] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[HttpPoolConfig, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_client(config: HttpPoolConfig) -> Optional["httpx.Client"]:
+    """Shared HTTP/1.1 keep-alive client for `config`, or None when httpx is unavailable."""
+    if httpx is None:
+        return None
+    with _lock:
+        client = _clients.get(config)
+        if client is None or client.is_closed:
+            client = httpx.Client(timeout=config.timeout(), limits=config.limits())
+            _clients[config] = client
+        return client
+
+
+def get_async_http_client(config: HttpPoolConfig) -> Optional["httpx.AsyncClient"]:
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(config)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=config.timeout(), limits=config.limits())
+            clients[config] = client
+        return client
+
+
+def warm_up(config: HttpPoolConfig, urls: Iterable[str]) -> int:
+    """Open a keep-alive connection to each URL's host so the first real call skips DNS/TLS setup."""
+    client = get_http_client(config)
+    if client is None:
+        return 0
+    warmed = 0
+    for url in urls:
+        try:
+            client.head(url)
+            warmed += 1
+        except Exception as exc:
+            logger.warning("HTTP pool warm-up failed for %s: %s", url, exc)
+    return warmed
+
+
+async def awarm_up(config: HttpPoolConfig, urls: Iterable[str]) -> int:
+    client = get_async_http_client(config)
+    if client is None:
+        return 0
+    urls = list(urls)
+    results = await asyncio.gather(*(client.head(url) for url in urls), return_exceptions=True)
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            logger.warning("HTTP pool warm-up failed for %s: %s", url, result)
+    return sum(1 for result in results if not isinstance(result, Exception))
+
+
+def close_http_clients() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_http_clients() -> None:
+    """Close the current loop's async clients and every sync client (application shutdown)."""
+    with _lock:
+        clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+    for client in clients:
+        await client.aclose()
+    close_http_clients()
+
+
+def pool_stats() -> Dict[str, int]:
+    with _lock:
+        return {"sync_clients": len(_clients), "async_clients": sum(len(clients) for clients in _async_clients.values())}
@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional
 from fastapi import UploadFile
 
 from nutrihelp_ai.services.Food_Image_Classifier.scripts.predict import Predictor
+from nutrihelp_ai.services.decoded_image import DecodedImage
 from nutrihelp_ai.services.food_presence import FoodPresenceService
 from nutrihelp_ai.services.image_quality import ImageQualityService, InvalidImageError
 from nutrihelp_ai.services.nutrition_lookup import NutritionLookupService
@@ -70,9 +71,9 @@ class ImagePipelineService:
         if file.content_type and not file.content_type.startswith("image/"):
             raise InvalidImageError("Uploaded file must use an image content type.")
 
-        image_bytes = await file.read()
-        quality = self.quality_service.analyze(image_bytes)
-        food_presence = self.food_presence_service.analyze(image_bytes)
+        image = DecodedImage.from_bytes(await file.read())
+        quality = self.quality_service.analyze(image)
+        food_presence = self.food_presence_service.analyze(image)
         food_presence_enabled = bool(food_presence.get("enabled"))
         food_probability = float(food_presence.get("food_probability", 1.0))
         people_scene_non_food = (
@@ -124,7 +125,7 @@ class ImagePipelineService:
             }
 
         predictor = self._get_predictor()
-        prediction = predictor.predict_from_bytes(image_bytes, topk=topk)
+        prediction = predictor.predict_image(image.image, topk=topk)
 
         topk_items = list(prediction.get("topk", []))
         label = prediction.get("label")
@@ -1,8 +1,10 @@
-from io import BytesIO
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Union
 
 import numpy as np
-from PIL import Image, ImageFilter, ImageOps, ImageStat, UnidentifiedImageError
+from PIL import ImageFilter, ImageStat
+
+from nutrihelp_ai.services.decoded_image import DecodedImage, InvalidImageError
 
 try:
     import cv2
@@ -22,10 +24,25 @@ SCREENSHOT_LOW_SATURATION_RATIO = 0.45
 CARTOON_FLAT_REGION_RATIO = 0.58
 CARTOON_EDGE_RATIO = 0.08
 CARTOON_SATURATION_MIN = 45.0
+SCREENSHOT_MIN_SIDE = 300
+CARTOON_MIN_SIDE = 180
+
+# Parsing a Haar cascade XML is a noticeable share of every analysis, so each
+# thread loads each cascade once (detectMultiScale is not safe to share across
+# threads).
+_cascades = threading.local()
 
 
-class InvalidImageError(ValueError):
-    pass
+def _cascade(name: str):
+    if cv2 is None or not hasattr(cv2, "CascadeClassifier"):
+        return None
+    loaded = getattr(_cascades, "loaded", None)
+    if loaded is None:
+        loaded = _cascades.loaded = {}
+    if name not in loaded:
+        classifier = cv2.CascadeClassifier(getattr(cv2.data, "haarcascades", "") + name)
+        loaded[name] = None if classifier.empty() else classifier
+    return loaded[name]
 
 
 class ImageQualityService:
@@ -38,15 +55,13 @@ class ImageQualityService:
         magnitude = np.sqrt(gx * gx + gy * gy)
         return float(np.mean(magnitude > 35.0))
 
-    def _looks_like_screenshot(self, image: Image.Image, gray_array: np.ndarray) -> bool:
+    def _looks_like_screenshot(self, image: DecodedImage, edge_ratio: float) -> bool:
         width, height = image.size
-        if width < 300 or height < 300:
+        if width < SCREENSHOT_MIN_SIDE or height < SCREENSHOT_MIN_SIDE:
             return False
 
-        edge_ratio = self._edge_ratio(gray_array)
-        hsv = image.convert("HSV")
-        saturation = np.array(hsv, dtype=np.uint8)[:, :, 1]
-        value = np.array(hsv, dtype=np.uint8)[:, :, 2]
+        saturation = image.hsv_array[:, :, 1]
+        value = image.hsv_array[:, :, 2]
         low_saturation_ratio = float(np.mean(saturation < 35))
         high_value_ratio = float(np.mean(value > 225))
         dark_value_ratio = float(np.mean(value < 35))
@@ -57,13 +72,12 @@ class ImageQualityService:
             and (high_value_ratio >= 0.18 or dark_value_ratio >= 0.18)
         )
 
-    def _looks_like_cartoon_or_portrait(self, image: Image.Image, gray_array: np.ndarray) -> bool:
+    def _looks_like_cartoon_or_portrait(self, image: DecodedImage, edge_ratio: float) -> bool:
         width, height = image.size
-        if width < 180 or height < 180:
+        if width < CARTOON_MIN_SIDE or height < CARTOON_MIN_SIDE:
             return False
 
-        small = image.resize((96, 96))
-        rgb = np.array(small, dtype=np.int16)
+        rgb = np.array(image.resized(96), dtype=np.int16)
         horizontal_diff = np.abs(np.diff(rgb, axis=1)).mean(axis=2)
         vertical_diff = np.abs(np.diff(rgb, axis=0)).mean(axis=2)
         flat_ratio = float(
@@ -73,8 +87,7 @@ class ImageQualityService:
             )
             / 2.0
         )
-        edge_ratio = self._edge_ratio(gray_array)
-        saturation_mean = float(np.array(image.convert("HSV"), dtype=np.uint8)[:, :, 1].mean())
+        saturation_mean = float(image.hsv_array[:, :, 1].mean())
 
         return (
             flat_ratio >= CARTOON_FLAT_REGION_RATIO
@@ -82,17 +95,18 @@ class ImageQualityService:
             and saturation_mean >= CARTOON_SATURATION_MIN
         )
 
-    def _contains_large_face(self, image: Image.Image) -> bool:
-        if cv2 is None:
-            return False
+    def _cascade_gray(self, image: DecodedImage) -> Optional[np.ndarray]:
+        # OpenCV's grayscale rounds differently from PIL's "L", and the cascade
+        # thresholds were tuned on it; one conversion serves every cascade.
+        if cv2 is None or not hasattr(cv2, "CascadeClassifier"):
+            return None
+        return cv2.cvtColor(image.rgb_array, cv2.COLOR_RGB2GRAY)
 
-        cascade_path = getattr(cv2.data, "haarcascades", "") + "haarcascade_frontalface_default.xml"
-        classifier = cv2.CascadeClassifier(cascade_path)
-        if classifier.empty():
+    def _contains_large_face(self, image: DecodedImage, gray: Optional[np.ndarray]) -> bool:
+        classifier = _cascade("haarcascade_frontalface_default.xml")
+        if classifier is None or gray is None:
             return False
 
-        rgb = np.array(image)
-        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
         faces = classifier.detectMultiScale(
             gray,
             scaleFactor=1.1,
@@ -106,12 +120,10 @@ class ImageQualityService:
         largest_face_area = max(int(width) * int(height) for _, _, width, height in faces)
         return (largest_face_area / image_area) >= MAX_FACE_AREA_RATIO
 
-    def _contains_people_scene(self, image: Image.Image) -> bool:
-        if cv2 is None:
+    def _contains_people_scene(self, image: DecodedImage, gray: Optional[np.ndarray]) -> bool:
+        if gray is None:
             return False
 
-        rgb = np.array(image)
-        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
         image_area = max(1, image.size[0] * image.size[1])
         cascade_names = [
             "haarcascade_frontalface_default.xml",
@@ -121,9 +133,8 @@ class ImageQualityService:
         ]
 
         for cascade_name in cascade_names:
-            cascade_path = getattr(cv2.data, "haarcascades", "") + cascade_name
-            classifier = cv2.CascadeClassifier(cascade_path)
-            if classifier.empty():
+            classifier = _cascade(cascade_name)
+            if classifier is None:
                 continue
 
             detections = classifier.detectMultiScale(
@@ -141,27 +152,23 @@ class ImageQualityService:
 
         return False
 
-    def analyze(self, image_bytes: bytes) -> Dict[str, object]:
-        if not image_bytes:
-            raise InvalidImageError("Uploaded file is empty.")
-
-        try:
-            with Image.open(BytesIO(image_bytes)) as src:
-                image = ImageOps.exif_transpose(src).convert("RGB")
-        except UnidentifiedImageError as exc:
-            raise InvalidImageError("Uploaded file is not a supported image.") from exc
+    def analyze(self, image: Union[bytes, DecodedImage]) -> Dict[str, object]:
+        image = DecodedImage.coerce(image)
 
         width, height = image.size
-        gray = image.convert("L")
-        gray_array = np.array(gray, dtype=np.uint8)
-        brightness = round(float(ImageStat.Stat(gray).mean[0]), 2)
-        contrast = round(float(ImageStat.Stat(gray).stddev[0]), 2)
+        gray = image.gray
+        gray_stat = ImageStat.Stat(gray)
+        brightness = round(float(gray_stat.mean[0]), 2)
+        contrast = round(float(gray_stat.stddev[0]), 2)
         edges = gray.filter(ImageFilter.FIND_EDGES)
         sharpness = round(float(ImageStat.Stat(edges).mean[0]), 2)
-        contains_large_face = self._contains_large_face(image)
-        contains_people_scene = self._contains_people_scene(image)
-        looks_like_screenshot = self._looks_like_screenshot(image, gray_array)
-        looks_like_cartoon_or_portrait = self._looks_like_cartoon_or_portrait(image, gray_array)
+        cascade_gray = self._cascade_gray(image)
+        contains_large_face = self._contains_large_face(image, cascade_gray)
+        contains_people_scene = self._contains_people_scene(image, cascade_gray)
+        # Both the screenshot and the cartoon check need the Canny edge ratio; run it once.
+        edge_ratio = self._edge_ratio(image.gray_array) if min(width, height) >= CARTOON_MIN_SIDE else 0.0
+        looks_like_screenshot = self._looks_like_screenshot(image, edge_ratio)
+        looks_like_cartoon_or_portrait = self._looks_like_cartoon_or_portrait(image, edge_ratio)
 
         issues: List[str] = []
         if min(width, height) < MIN_DIMENSION:
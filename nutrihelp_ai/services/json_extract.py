@@ -0,0 +1,195 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Characters that change the scanner state inside a captured object.
+_STRUCTURE_RE = re.compile(r'[{}\[\],:"]')
+_STRING_RE = re.compile(r'["\\]')
+_WHITESPACE = " \t\r\n"
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JsonExtractor:
+    """Single-pass, bracket-balanced extractor for the first JSON object in LLM output.
+
+    Text can be fed in pieces as a completion streams. Prose around the object is
+    skipped, string contents are never mistaken for structure, and trailing commas
+    before `}` / `]` are dropped (the only repair applied). `result()` returns the
+    first complete object that decodes to a dict; `partial()` additionally closes
+    an unfinished object at its last complete member, so callers can render a plan
+    before the completion ends.
+
+    Each character is inspected once: a balanced span that fails to decode, or a
+    mismatched bracket, restarts the search after that point rather than at the
+    next `{`, which keeps adversarial input linear.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._expect_key: List[bool] = []
+        self._in_string = False
+        self._string_is_value = False
+        self._escape = False
+        self._safe = 0
+        self._safe_depth = 0
+        self._dropped: List[int] = []
+        self._result: Optional[Dict[str, Any]] = None
+
+    @property
+    def done(self) -> bool:
+        return self._result is not None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Scan `chunk`; returns the extracted object once one is complete."""
+        if self._result is not None or not chunk:
+            return self._result
+        if self._start is None:
+            # Nothing captured yet, so everything already scanned can be discarded.
+            self._buffer = self._buffer[self._pos:] + chunk
+            self._pos = 0
+        else:
+            self._buffer += chunk
+        self._scan()
+        return self._result
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        return self._result
+
+    def partial(self) -> Optional[Dict[str, Any]]:
+        """The complete object, or a best-effort dict for the object still being streamed."""
+        if self._result is not None or self._start is None:
+            return self._result
+
+        candidates = []
+        if self._in_string and self._string_is_value:
+            end = len(self._buffer) - 1 if self._escape else len(self._buffer)
+            candidates.append(self._span(end) + '"' + _closers(self._stack))
+        # Only openers happen between safe points, so the stack then was a prefix of the current one.
+        candidates.append(self._span(self._safe) + _closers(self._stack[: self._safe_depth]))
+        for candidate in candidates:
+            data = _decode(candidate)
+            if data is not None:
+                return data
+        return None
+
+    def _span(self, end: int) -> str:
+        start = self._start
+        pieces = []
+        for index in self._dropped:
+            if index >= end:
+                break
+            pieces.append(self._buffer[start:index])
+            start = index + 1
+        pieces.append(self._buffer[start:end])
+        return "".join(pieces)
+
+    def _mark_safe(self, index: int) -> None:
+        """Record that the capture up to `index` is complete JSON once the open brackets are closed."""
+        self._safe = index
+        self._safe_depth = len(self._stack)
+
+    def _reset(self) -> None:
+        self._start = None
+        self._stack.clear()
+        self._expect_key.clear()
+        self._in_string = False
+        self._escape = False
+        self._dropped.clear()
+
+    def _scan(self) -> None:
+        text = self._buffer
+        pos = self._pos
+        size = len(text)
+
+        while pos < size:
+            if self._start is None:
+                pos = text.find("{", pos)
+                if pos < 0:
+                    pos = size
+                    break
+                self._start = pos
+                self._stack.append("{")
+                self._expect_key.append(True)
+                self._mark_safe(pos + 1)
+                pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _STRING_RE.search(text, pos)
+                if match is None:
+                    pos = size
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if self._string_is_value:
+                    self._mark_safe(pos)
+                continue
+
+            match = _STRUCTURE_RE.search(text, pos)
+            if match is None:
+                pos = size
+                break
+            index = match.start()
+            char = match.group()
+            pos = index + 1
+
+            if char == '"':
+                self._in_string = True
+                self._string_is_value = not (self._stack[-1] == "{" and self._expect_key[-1])
+            elif char in "{[":
+                self._stack.append(char)
+                self._expect_key.append(char == "{")
+            elif char == ",":
+                self._mark_safe(index)
+                self._expect_key[-1] = self._stack[-1] == "{"
+            elif char == ":":
+                self._expect_key[-1] = False
+            elif _CLOSERS[self._stack[-1]] != char:
+                # Mismatched bracket: not JSON, look for another object after it.
+                self._reset()
+            else:
+                previous = index - 1
+                while previous > self._start and text[previous] in _WHITESPACE:
+                    previous -= 1
+                if text[previous] == ",":
+                    self._dropped.append(previous)
+                self._stack.pop()
+                self._expect_key.pop()
+                self._mark_safe(pos)
+                if not self._stack:
+                    data = _decode(self._span(pos))
+                    if data is not None:
+                        self._result = data
+                        break
+                    self._reset()
+
+        self._pos = pos
+
+
+def _closers(stack: List[str]) -> str:
+    return "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def _decode(text: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(text, strict=False)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def extract_json(text: str, partial: bool = False) -> Optional[Dict[str, Any]]:
+    """First JSON object in `text`; with `partial`, an unfinished trailing object is closed and returned."""
+    extractor = JsonExtractor()
+    extractor.feed(text or "")
+    return extractor.partial() if partial else extractor.result()
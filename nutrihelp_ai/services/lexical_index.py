@@ -0,0 +1,180 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+# Question words and fillers that carry no retrieval signal on their own.
+_LEXICAL_STOPWORDS = {
+    "a",
+    "about",
+    "an",
+    "and",
+    "any",
+    "are",
+    "be",
+    "can",
+    "do",
+    "does",
+    "for",
+    "from",
+    "how",
+    "i",
+    "in",
+    "is",
+    "it",
+    "me",
+    "much",
+    "my",
+    "of",
+    "on",
+    "or",
+    "should",
+    "tell",
+    "the",
+    "there",
+    "to",
+    "what",
+    "which",
+    "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords dropped and crude plural folding ("sardines" -> "sardine")."""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        if word in _LEXICAL_STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """In-memory Okapi BM25 inverted index that can be updated one document at a time.
+
+    Postings map each term to {slot: term frequency}; slots are small ints so the
+    index stays compact. Adding an existing id replaces its previous text.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._slots: Dict[Hashable, int] = {}
+        self._documents: List[Optional[str]] = []
+        self._lengths: List[int] = []
+        self._terms: List[Tuple[str, ...]] = []
+        self._free: List[int] = []
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _remove_slot(self, slot: int) -> None:
+        for term in self._terms[slot]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(slot, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[slot]
+        self._documents[slot] = None
+        self._lengths[slot] = 0
+        self._terms[slot] = ()
+        self._free.append(slot)
+
+    def add(self, doc_id: Hashable, document: str) -> None:
+        counts = Counter(tokenize(document))
+        with self._lock:
+            slot = self._slots.get(doc_id)
+            if slot is not None:
+                self._remove_slot(slot)
+                self._free.remove(slot)
+            elif self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self._documents)
+                self._documents.append(None)
+                self._lengths.append(0)
+                self._terms.append(())
+
+            self._slots[doc_id] = slot
+            self._documents[slot] = document
+            self._lengths[slot] = sum(counts.values())
+            self._terms[slot] = tuple(counts)
+            self._total_length += self._lengths[slot]
+            for term, frequency in counts.items():
+                self._postings.setdefault(term, {})[slot] = frequency
+
+    def add_many(self, records: Iterable[Tuple[Hashable, str]]) -> None:
+        for doc_id, document in records:
+            if document:
+                self.add(doc_id, document)
+
+    def remove(self, doc_id: Hashable) -> None:
+        with self._lock:
+            slot = self._slots.pop(doc_id, None)
+            if slot is not None:
+                self._remove_slot(slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._slots.clear()
+            self._documents.clear()
+            self._lengths.clear()
+            self._terms.clear()
+            self._free.clear()
+            self._total_length = 0
+
+    def _idf(self, term: str) -> float:
+        frequency = len(self._postings.get(term, ()))
+        total = len(self._slots)
+        return math.log(1.0 + (total - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float, float]]:
+        """Return up to `limit` (document, bm25 score, query-term coverage) tuples, best first.
+
+        Coverage is the share of the query's IDF weight (over terms the corpus
+        contains) that appears in the document, so a chunk holding the one rare term
+        of a question scores high even when it misses common or unknown words.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+
+        with self._lock:
+            if not self._slots:
+                return []
+            average_length = self._total_length / len(self._slots) or 1.0
+            weights = {term: self._idf(term) for term in terms if term in self._postings}
+            total_weight = sum(weights.values()) or 1.0
+
+            scores: Dict[int, float] = {}
+            matched: Dict[int, float] = {}
+            for term, idf in weights.items():
+                postings = self._postings[term]
+                for slot, frequency in postings.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._lengths[slot] / average_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+                    matched[slot] = matched.get(slot, 0.0) + idf
+
+            best = sorted(scores, key=lambda slot: scores[slot], reverse=True)[:limit]
+            return [(self._documents[slot], scores[slot], matched[slot] / total_weight) for slot in best]
+
+    def stats(self) -> Dict[str, int]:
+        return {"documents": len(self._slots), "terms": len(self._postings)}
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse several best-first rankings: score(d) = sum(1 / (k + rank)) over the lists containing d."""
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,269 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+except Exception:
+    DefaultEmbeddingFunction = None
+
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.jsonl"
+MANIFEST_FILE = "manifest.json"
+SUPPORTED_SPACES = {"l2", "cosine", "ip"}
+
+
+class LocalVectorIndex:
+    """Read-only, in-process top-k search over a Chroma collection snapshot.
+
+    Embeddings live in a memory-mapped float32 matrix and queries are answered
+    with one NumPy matrix product. The object mimics the parts of a Chroma
+    collection the backend uses (`count`, `query`, `_embedding_function`), and
+    distances follow the source collection's space so RAG thresholds carry over.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+        space: str = "l2",
+        embedding_function: Optional[Callable[[List[str]], Any]] = None,
+    ):
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(ids) or len(ids) != len(documents):
+            raise ValueError("Snapshot embeddings, ids and documents must line up")
+        if space not in SUPPORTED_SPACES:
+            raise ValueError(f"Unsupported distance space {space!r}")
+
+        self.embeddings = embeddings
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas is not None else [None] * len(self.ids)
+        self.space = space
+        self._embedding_function = embedding_function
+        self._squared_norms = np.einsum("ij,ij->i", embeddings, embeddings, dtype=np.float32)
+        self._where_masks: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def load(cls, path: str, embedding_function: Optional[Callable[[List[str]], Any]] = None) -> "LocalVectorIndex":
+        root = Path(path)
+        manifest = json.loads((root / MANIFEST_FILE).read_text(encoding="utf-8"))
+        embeddings = np.load(root / EMBEDDINGS_FILE, mmap_mode="r")
+        if embeddings.dtype != np.float32:
+            embeddings = embeddings.astype(np.float32)
+
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[Optional[Dict[str, Any]]] = []
+        with (root / RECORDS_FILE).open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                ids.append(record["id"])
+                documents.append(record.get("document") or "")
+                metadatas.append(record.get("metadata") or None)
+
+        if embedding_function is None and manifest.get("embedding_function") == "default" and DefaultEmbeddingFunction:
+            embedding_function = DefaultEmbeddingFunction()
+
+        logger.info(
+            "Loaded local vector index from %s (collection=%s records=%s dim=%s space=%s)",
+            root,
+            manifest.get("collection"),
+            len(ids),
+            embeddings.shape[1] if embeddings.ndim == 2 else 0,
+            manifest.get("space", "l2"),
+        )
+        return cls(
+            embeddings=embeddings,
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            space=manifest.get("space", "l2"),
+            embedding_function=embedding_function,
+        )
+
+    @property
+    def embedding_function(self) -> Optional[Callable[[List[str]], Any]]:
+        return self._embedding_function
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _allowed(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for a Chroma-style metadata `where` filter (None when unfiltered)."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True)
+        mask = self._where_masks.get(key)
+        if mask is None:
+            mask = np.fromiter((_matches_where(metadata or {}, where) for metadata in self.metadatas), dtype=bool, count=len(self.ids))
+            self._where_masks[key] = mask
+        return mask
+
+    def get(
+        self,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        where: Optional[Dict[str, Any]] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        allowed = self._allowed(where)
+        rows = range(len(self.ids)) if allowed is None else np.flatnonzero(allowed).tolist()
+        end = len(rows) if limit is None else offset + limit
+        rows = rows[offset:end]
+        page: Dict[str, Any] = {"ids": [self.ids[row] for row in rows]}
+        include = include or ["documents", "metadatas"]
+        if "documents" in include:
+            page["documents"] = [self.documents[row] for row in rows]
+        if "metadatas" in include:
+            page["metadatas"] = [self.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            page["embeddings"] = np.asarray(self.embeddings[list(rows)]).tolist()
+        return page
+
+    def _distances(self, queries: np.ndarray) -> np.ndarray:
+        products = queries @ self.embeddings.T
+        if self.space == "ip":
+            return 1.0 - products
+        if self.space == "cosine":
+            query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            row_norms = np.sqrt(self._squared_norms)[None, :]
+            return 1.0 - products / np.maximum(query_norms * row_norms, 1e-12)
+        query_squared = np.einsum("ij,ij->i", queries, queries)[:, None]
+        return np.maximum(query_squared + self._squared_norms[None, :] - 2.0 * products, 0.0)
+
+    def query(
+        self,
+        query_texts: Optional[List[str]] = None,
+        query_embeddings: Optional[List[List[float]]] = None,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        **_: Any,
+    ) -> Dict[str, List[List[Any]]]:
+        if query_embeddings is None:
+            if not query_texts:
+                raise ValueError("query_texts or query_embeddings is required")
+            if self._embedding_function is None:
+                raise ValueError("Local vector index has no embedding function for query_texts")
+            query_embeddings = self._embedding_function(query_texts)
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+
+        result: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        allowed = self._allowed(where)
+        candidates = self.count() if allowed is None else int(allowed.sum())
+        k = min(max(int(n_results), 0), candidates)
+        if k == 0:
+            for _ in range(queries.shape[0]):
+                for key in result:
+                    result[key].append([])
+            return result
+
+        distances = self._distances(queries)
+        if allowed is not None:
+            distances[:, ~allowed] = np.inf
+        for row in distances:
+            top = np.argpartition(row, k - 1)[:k] if k < row.shape[0] else np.arange(row.shape[0])
+            top = top[np.argsort(row[top], kind="stable")]
+            result["ids"].append([self.ids[index] for index in top])
+            result["documents"].append([self.documents[index] for index in top])
+            result["metadatas"].append([self.metadatas[index] for index in top])
+            result["distances"].append([float(row[index]) for index in top])
+        return result
+
+
+def _matches_where(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """The subset of Chroma's `where` syntax the backend uses: equality, $eq/$ne/$in/$nin, $and/$or."""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches_where(metadata, clause) for clause in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_where(metadata, clause) for clause in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, expected in condition.items():
+            if operator == "$eq" and value != expected:
+                return False
+            if operator == "$ne" and value == expected:
+                return False
+            if operator == "$in" and value not in expected:
+                return False
+            if operator == "$nin" and value in expected:
+                return False
+    return True
+
+
+def _collection_space(collection) -> str:
+    metadata = getattr(collection, "metadata", None) or {}
+    space = metadata.get("hnsw:space")
+    if not space:
+        configuration = getattr(collection, "configuration_json", None) or {}
+        space = (configuration.get("hnsw") or {}).get("space")
+    return space if space in SUPPORTED_SPACES else "l2"
+
+
+def _embedding_function_name(collection) -> str:
+    embedding_function = getattr(collection, "_embedding_function", None)
+    name = getattr(embedding_function, "name", None)
+    try:
+        return str(name()) if callable(name) else "default"
+    except Exception:
+        return "default"
+
+
+def export_snapshot(collection, path: str, page_size: int = 500) -> int:
+    """Write a collection's embeddings, documents and metadata as a LocalVectorIndex snapshot."""
+    root = Path(path)
+    root.mkdir(parents=True, exist_ok=True)
+
+    vectors: List[np.ndarray] = []
+    total = 0
+    with (root / RECORDS_FILE).open("w", encoding="utf-8") as handle:
+        offset = 0
+        while True:
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=page_size,
+                offset=offset,
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            documents = page.get("documents") or [""] * len(ids)
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            vectors.append(np.asarray(page.get("embeddings"), dtype=np.float32))
+            for index, doc_id in enumerate(ids):
+                record = {"id": doc_id, "document": documents[index], "metadata": metadatas[index]}
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            total += len(ids)
+            offset += len(ids)
+            if len(ids) < page_size:
+                break
+
+    matrix = np.concatenate(vectors, axis=0) if vectors else np.zeros((0, 0), dtype=np.float32)
+    np.save(root / EMBEDDINGS_FILE, matrix)
+    manifest = {
+        "collection": getattr(collection, "name", ""),
+        "count": total,
+        "dimension": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "space": _collection_space(collection),
+        "embedding_function": _embedding_function_name(collection),
+    }
+    (root / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return total
@@ -0,0 +1,221 @@
+import asyncio
+import contextvars
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from nutrihelp_ai.services.request_metrics import REGISTRY, observe_stage
+
+
+class _BatchStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_size = 0
+        self.wait_seconds = 0.0
+
+    def record(self, submitted: List[float], dispatched: float) -> None:
+        size = len(submitted)
+        waits = [max(0.0, dispatched - started) for started in submitted]
+        with self._lock:
+            self.batches += 1
+            self.items += size
+            self.max_size = max(self.max_size, size)
+            self.wait_seconds += sum(waits)
+        REGISTRY.observe("nutrihelp_batch_size", size, batcher=self.name)
+        for wait in waits:
+            REGISTRY.observe("nutrihelp_batch_wait_seconds", wait, batcher=self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_size,
+                "avg_wait_ms": round(self.wait_seconds / self.items * 1000, 2) if self.items else 0.0,
+            }
+
+
+class _Batch:
+    __slots__ = ("items", "submitted", "dispatched", "results", "error", "event")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.submitted: List[float] = []
+        self.dispatched = 0.0
+        self.results: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.event = threading.Event()
+
+
+class MicroBatcher:
+    """Coalesce calls from concurrent threads into one `run_batch(items)` call.
+
+    The first caller opens a batch and waits up to `window_seconds` (less once
+    `max_batch` items have joined), then runs the batch for everyone; results are
+    matched to callers by position, and an exception is raised in every caller.
+    A window of 0 or a max batch of 1 disables batching. The wait each caller
+    spent in the window is reported as the `wait_stage` pipeline stage.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        window_seconds: float,
+        max_batch: int,
+        name: str = "batch",
+        wait_stage: str = "batch_wait",
+    ):
+        self._run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.wait_stage = wait_stage
+        self._cond = threading.Condition()
+        self._open: Optional[_Batch] = None
+        self._stats = _BatchStats(name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0 and self.max_batch > 1
+
+    def submit(self, item: Any) -> Any:
+        if not self.enabled:
+            return self._run_batch([item])[0]
+
+        submitted = time.perf_counter()
+        with self._cond:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            index = len(batch.items)
+            batch.items.append(item)
+            batch.submitted.append(submitted)
+            if len(batch.items) >= self.max_batch:
+                self._open = None
+                self._cond.notify_all()
+            if leader:
+                deadline = submitted + self.window_seconds
+                while self._open is batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._open = None
+                        break
+                    self._cond.wait(remaining)
+
+        if leader:
+            batch.dispatched = time.perf_counter()
+            self._stats.record(batch.submitted, batch.dispatched)
+            try:
+                batch.results = self._run_batch(batch.items)
+            except BaseException as exc:
+                batch.error = exc
+            finally:
+                batch.event.set()
+        else:
+            batch.event.wait()
+
+        observe_stage(self.wait_stage, max(0.0, batch.dispatched - submitted))
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self._stats.snapshot()}
+
+
+class _AsyncBatch:
+    __slots__ = ("items", "submitted", "futures", "dispatched", "timer", "context")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.submitted: List[float] = []
+        self.futures: List["asyncio.Future[Any]"] = []
+        self.dispatched = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # The opening caller's contextvars (request deadline, trace); the batch runs under them.
+        self.context = contextvars.copy_context()
+
+
+class AsyncMicroBatcher:
+    """asyncio counterpart of MicroBatcher for coroutine `run_batch` functions.
+
+    A caller that is cancelled while waiting does not cancel the batch; its
+    result is simply dropped. The batch runs in the context of the caller that
+    opened it, whether the window timer or a full batch dispatches it.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        window_seconds: float,
+        max_batch: int,
+        name: str = "batch",
+        wait_stage: str = "batch_wait",
+    ):
+        self._run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.wait_stage = wait_stage
+        # One open batch per event loop, held weakly so a dead loop's batch is never joined from a new loop.
+        self._open: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncBatch]" = weakref.WeakKeyDictionary()
+        self._dispatching: set = set()
+        self._stats = _BatchStats(name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0 and self.max_batch > 1
+
+    async def submit(self, item: Any) -> Any:
+        if not self.enabled:
+            return (await self._run_batch([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        batch = self._open.get(loop)
+        if batch is None:
+            batch = self._open[loop] = _AsyncBatch()
+            batch.timer = loop.call_later(self.window_seconds, self._flush, loop, batch)
+        future = loop.create_future()
+        submitted = time.perf_counter()
+        batch.items.append(item)
+        batch.submitted.append(submitted)
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_batch:
+            batch.timer.cancel()
+            self._flush(loop, batch)
+
+        try:
+            return await future
+        finally:
+            if batch.dispatched:
+                observe_stage(self.wait_stage, max(0.0, batch.dispatched - submitted))
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, batch: _AsyncBatch) -> None:
+        if self._open.get(loop) is batch:
+            del self._open[loop]
+        batch.dispatched = time.perf_counter()
+        self._stats.record(batch.submitted, batch.dispatched)
+        task = loop.create_task(self._dispatch(batch), context=batch.context)
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch: _AsyncBatch) -> None:
+        try:
+            results = await self._run_batch(batch.items)
+        except BaseException as exc:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self._stats.snapshot()}
@@ -0,0 +1,179 @@
+import json
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOCIAL = "social"
+DOMAIN_CHAT = "domain_chat"
+GROUNDED_RAG = "grounded_rag"
+STRUCTURED_JSON = "structured_json"
+PROMPT_CLASSES = (SOCIAL, DOMAIN_CHAT, GROUNDED_RAG, STRUCTURED_JSON)
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    models: Tuple[str, ...]
+    max_tokens: Optional[int] = None
+    timeout: Optional[float] = None  # None keeps the HTTP pool's read timeout
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    prompt_class: str
+    model: str
+    max_tokens: Optional[int]
+    timeout: Optional[float]
+
+
+# Per-class limits enabled by GROQ_TUNED_ROUTES: short social replies, bounded
+# chat answers and tighter timeouts. Off by default so routing alone does not
+# change answer length or timeouts.
+TUNED_ROUTE_LIMITS: Dict[str, Dict[str, Any]] = {
+    SOCIAL: {"max_tokens": 150, "timeout": 10.0},
+    DOMAIN_CHAT: {"max_tokens": 800, "timeout": 20.0},
+    GROUNDED_RAG: {"max_tokens": 512, "timeout": 20.0},
+    STRUCTURED_JSON: {"max_tokens": 1200, "timeout": 60.0},
+}
+
+
+def default_routes(default_model: str, structured_model: Optional[str] = None, tuned: bool = False) -> Dict[str, ModelRoute]:
+    """Every class on `default_model` with no token cap, as before routing existed; health plans keep 1200 tokens.
+
+    `structured_model` moves structured JSON output to another model; `tuned`
+    applies TUNED_ROUTE_LIMITS.
+    """
+    routes = {
+        SOCIAL: ModelRoute(models=(default_model,)),
+        DOMAIN_CHAT: ModelRoute(models=(default_model,)),
+        GROUNDED_RAG: ModelRoute(models=(default_model,)),
+        STRUCTURED_JSON: ModelRoute(models=(structured_model or default_model,), max_tokens=1200),
+    }
+    if tuned:
+        routes = {prompt_class: replace(route, **TUNED_ROUTE_LIMITS[prompt_class]) for prompt_class, route in routes.items()}
+    return routes
+
+
+def parse_routes(raw: str, defaults: Dict[str, ModelRoute]) -> Dict[str, ModelRoute]:
+    """Apply JSON overrides such as `{"social": {"models": ["a", "b"], "max_tokens": 100}}` to `defaults`."""
+    routes = dict(defaults)
+    if not raw or not raw.strip():
+        return routes
+    try:
+        overrides = json.loads(raw)
+        if not isinstance(overrides, dict):
+            raise ValueError("expected a JSON object keyed by prompt class")
+        for prompt_class, override in overrides.items():
+            if prompt_class not in PROMPT_CLASSES:
+                raise ValueError(f"unknown prompt class {prompt_class!r}")
+            changes: Dict[str, Any] = {}
+            if "models" in override:
+                models = override["models"]
+                changes["models"] = (models,) if isinstance(models, str) else tuple(models)
+            if "model" in override:
+                changes["models"] = (override["model"],)
+            if "max_tokens" in override:
+                changes["max_tokens"] = int(override["max_tokens"]) if override["max_tokens"] else None
+            if "timeout" in override:
+                changes["timeout"] = float(override["timeout"])
+            routes[prompt_class] = replace(routes[prompt_class], **changes)
+    except (TypeError, ValueError, AttributeError) as exc:
+        logger.warning("Invalid GROQ_MODEL_ROUTES (%s); using default routes", exc)
+        return dict(defaults)
+    return routes
+
+
+class ModelRouter:
+    """Map a prompt class to a model, max_tokens and timeout.
+
+    When a route lists several candidate models, the one with the lowest observed
+    latency for that prompt class (exponentially weighted) is chosen; a model with
+    no observations yet is tried first so every candidate gets measured. Every
+    `explore_every`-th decision for a class goes to another candidate instead, so
+    a model that was slow once keeps being re-measured rather than starved.
+    """
+
+    def __init__(self, routes: Dict[str, ModelRoute], smoothing: float = 0.2, explore_every: int = 20):
+        self.routes = routes
+        self.smoothing = smoothing
+        self.explore_every = explore_every
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self._calls: Dict[Tuple[str, str], int] = {}
+        self._decisions: Dict[str, int] = {prompt_class: 0 for prompt_class in routes}
+        self._explorations: Dict[str, int] = {prompt_class: 0 for prompt_class in routes}
+        self._lock = threading.Lock()
+
+    def _preferred(self, prompt_class: str, models: Tuple[str, ...]) -> str:
+        # Called with self._lock held: the first unmeasured candidate, else the fastest.
+        for model in models:
+            if (prompt_class, model) not in self._latency:
+                return model
+        return min(models, key=lambda model: self._latency[(prompt_class, model)])
+
+    def _pick(self, prompt_class: str, models: Tuple[str, ...]) -> str:
+        # Called with self._lock held, after this decision was counted.
+        fastest = self._preferred(prompt_class, models)
+        if (prompt_class, fastest) not in self._latency:
+            return fastest
+        if len(models) < 2 or self.explore_every <= 0 or self._decisions[prompt_class] % self.explore_every:
+            return fastest
+        others = [model for model in models if model != fastest]
+        self._explorations[prompt_class] = self._explorations.get(prompt_class, 0) + 1
+        return others[(self._explorations[prompt_class] - 1) % len(others)]
+
+    def route(self, prompt_class: str, model: Optional[str] = None) -> RouteDecision:
+        """Pick the route for `prompt_class`; an explicit `model` keeps its limits but overrides the choice."""
+        if prompt_class not in self.routes:
+            prompt_class = DOMAIN_CHAT
+        route = self.routes[prompt_class]
+        with self._lock:
+            self._decisions[prompt_class] = self._decisions.get(prompt_class, 0) + 1
+            chosen = model or self._pick(prompt_class, route.models)
+        return RouteDecision(
+            prompt_class=prompt_class,
+            model=chosen,
+            max_tokens=route.max_tokens,
+            timeout=route.timeout,
+        )
+
+    def preferred(self, prompt_class: str, model: Optional[str] = None) -> str:
+        """The model `route` would normally pick for `prompt_class`, without counting a decision or exploring."""
+        if model:
+            return model
+        if prompt_class not in self.routes:
+            prompt_class = DOMAIN_CHAT
+        with self._lock:
+            return self._preferred(prompt_class, self.routes[prompt_class].models)
+
+    def observe(self, prompt_class: str, model: str, seconds: float) -> None:
+        key = (prompt_class, model)
+        with self._lock:
+            previous = self._latency.get(key)
+            self._latency[key] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+            self._calls[key] = self._calls.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "routes": {
+                    prompt_class: {
+                        "models": list(route.models),
+                        "max_tokens": route.max_tokens,
+                        "timeout": route.timeout,
+                        "decisions": self._decisions.get(prompt_class, 0),
+                        "explorations": self._explorations.get(prompt_class, 0),
+                        "latency_ms": {
+                            model: round(latency * 1000, 1)
+                            for (latency_class, model), latency in self._latency.items()
+                            if latency_class == prompt_class
+                        },
+                    }
+                    for prompt_class, route in self.routes.items()
+                },
+                "models": {
+                    model: {"calls": sum(calls for (_, name), calls in self._calls.items() if name == model)}
+                    for model in sorted({model for _, model in self._calls})
+                },
+            }
@@ -66,9 +66,11 @@ class Predictor:
     def _pil_from_bytes(self, b: bytes) -> Image.Image:
         return Image.open(io.BytesIO(b)).convert("RGB")
 
-    @torch.no_grad()
     def predict_from_bytes(self, image_bytes: bytes, topk: Optional[int] = None) -> Dict[str, Any]:
-        img = self._pil_from_bytes(image_bytes)
+        return self.predict_image(self._pil_from_bytes(image_bytes), topk)
+
+    @torch.no_grad()
+    def predict_image(self, img: Image.Image, topk: Optional[int] = None) -> Dict[str, Any]:
         x = self.transform(img).unsqueeze(0) 
         probs = torch.sigmoid(self.model(x.to(self.device))).cpu().squeeze(0)
 
@@ -2,6 +2,7 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import UploadFile
 
+from nutrihelp_ai.services.decoded_image import DecodedImage
 from nutrihelp_ai.services.food_presence import FoodPresenceService
 from nutrihelp_ai.services.image_quality import ImageQualityService, InvalidImageError
 from nutrihelp_ai.services.multi_image_classifier.scripts.training.predict import Predictor
@@ -66,9 +67,9 @@ class MultiImagePipelineService:
                 if file.content_type and not file.content_type.startswith("image/"):
                     raise InvalidImageError("Uploaded file must use an image content type.")
 
-                image_bytes = await file.read()
-                quality = self.quality_service.analyze(image_bytes)
-                food_presence = self.food_presence_service.analyze(image_bytes)
+                image = DecodedImage.from_bytes(await file.read())
+                quality = self.quality_service.analyze(image)
+                food_presence = self.food_presence_service.analyze(image)
                 food_presence_enabled = bool(food_presence.get("enabled"))
                 food_probability = float(food_presence.get("food_probability", 1.0))
                 people_scene_non_food = (
@@ -113,7 +114,7 @@ class MultiImagePipelineService:
                     )
                     continue
 
-                pred = predictor.predict_from_bytes(image_bytes, safe_topk)
+                pred = predictor.predict_image(image.image, safe_topk)
 
                 topk_items = [
                     {"label": label, "score": round(float(score), 4)}
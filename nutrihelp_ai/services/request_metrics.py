@@ -0,0 +1,266 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CANDIDATE_BUCKETS = (0, 1, 2, 3, 5, 10, 20)
+DISTANCE_BUCKETS = (0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.6, 2.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+BATCH_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05)
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Minimal in-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str, Tuple[str, ...], Tuple[float, ...]]] = {}
+        self._counters: Dict[str, Dict[Tuple[str, ...], float]] = {}
+        self._histograms: Dict[str, Dict[Tuple[str, ...], _Histogram]] = {}
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self._meta[name] = ("counter", help_text, tuple(labels), ())
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self._meta[name] = ("histogram", help_text, tuple(labels), tuple(buckets))
+        self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self._meta[name][2])
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        _, _, label_names, buckets = self._meta[name]
+        key = tuple(str(labels.get(label, "")) for label in label_names)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            for series in self._counters.values():
+                series.clear()
+            for series in self._histograms.values():
+                series.clear()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text, label_names, _) in self._meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_format_labels(label_names, key)} {_format_value(value)}")
+                    continue
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        labels = _format_labels(label_names, key, ("le", _format_value(bound)))
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    labels = _format_labels(label_names, key, ("le", "+Inf"))
+                    lines.append(f"{name}_bucket{labels} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(label_names, key)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(label_names, key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.histogram("nutrihelp_http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status"))
+REGISTRY.histogram("nutrihelp_stage_duration_seconds", "Time spent in each chat pipeline stage.", ("stage",))
+REGISTRY.counter("nutrihelp_llm_tokens_total", "Tokens reported by Groq completions.", ("model", "kind"))
+REGISTRY.counter("nutrihelp_rag_path_total", "Answer path taken by the RAG fallback pipeline.", ("path",))
+REGISTRY.counter("nutrihelp_cache_hits_total", "Cache hits by cache.", ("cache",))
+REGISTRY.histogram("nutrihelp_rag_candidates", "Ranked candidates returned by retrieval.", (), CANDIDATE_BUCKETS)
+REGISTRY.histogram("nutrihelp_rag_best_distance", "Distance of the best retrieved candidate.", (), DISTANCE_BUCKETS)
+REGISTRY.histogram("nutrihelp_batch_size", "Items per micro-batch dispatch.", ("batcher",), BATCH_SIZE_BUCKETS)
+REGISTRY.histogram("nutrihelp_batch_wait_seconds", "Time an item waited for its micro-batch to dispatch.", ("batcher",), BATCH_WAIT_BUCKETS)
+REGISTRY.counter("nutrihelp_deadline_skips_total", "Optional pipeline stages skipped to meet a request deadline.", ("stage",))
+REGISTRY.counter("nutrihelp_abandoned_requests_total", "Requests whose work was abandoned.", ("reason",))
+
+
+class RequestTrace:
+    """Stage timings and facts about one request, used for its `Server-Timing` header."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}
+        self.attributes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def add(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def set(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.attributes[name] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+                "stages": {name: {"ms": round(total * 1000, 1), "calls": calls} for name, (total, calls) in self.stages.items()},
+                **self.attributes,
+            }
+
+    def server_timing(self) -> str:
+        parts = []
+        with self._lock:
+            for name, (total, calls) in self.stages.items():
+                description = f';desc="{calls} calls"' if calls > 1 else ""
+                parts.append(f"{name};dur={total * 1000:.1f}{description}")
+            for name, value in self.attributes.items():
+                if isinstance(value, (list, dict)):
+                    continue
+                parts.append(f'{name};desc="{value}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("nutrihelp_request_trace", default=None)
+
+
+def start_trace() -> Tuple[RequestTrace, contextvars.Token]:
+    trace = RequestTrace()
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: contextvars.Token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    REGISTRY.observe("nutrihelp_stage_duration_seconds", seconds, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block (awaits included) as pipeline stage `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def record_tokens(model: str, usage: Any) -> None:
+    """Count prompt/completion tokens from a Groq `usage` object or dict, if present."""
+    if usage is None:
+        return
+    getter = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    trace = _current_trace.get()
+    for kind in ("prompt", "completion"):
+        tokens = getter(f"{kind}_tokens")
+        if not isinstance(tokens, (int, float)):
+            continue
+        REGISTRY.inc("nutrihelp_llm_tokens_total", tokens, model=model, kind=kind)
+        if trace is not None:
+            trace.add(f"{kind}_tokens", int(tokens))
+
+
+def annotate(name: str, value: Any) -> None:
+    """Attach a fact (e.g. the domain-guard verdict) to the current request's trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set(name, value)
+
+
+def record_path(path: str) -> None:
+    REGISTRY.inc("nutrihelp_rag_path_total", path=path)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set("rag_path", path)
+
+
+def record_deadline_skip(stage: str) -> None:
+    REGISTRY.inc("nutrihelp_deadline_skips_total", stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set("deadline_skip", stage)
+
+
+def record_abandoned(reason: str) -> None:
+    """Count a request dropped because its deadline passed or its client disconnected."""
+    REGISTRY.inc("nutrihelp_abandoned_requests_total", reason=reason)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set("abandoned", reason)
+
+
+def record_cache_hit(cache: str) -> None:
+    REGISTRY.inc("nutrihelp_cache_hits_total", cache=cache)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(f"{cache}_cache_hit")
+
+
+def record_retrieval(distances: Sequence[float]) -> None:
+    # Hybrid retrieval reports lexical-only hits with an unknown (infinite) distance.
+    known = [distance for distance in distances if math.isfinite(distance)]
+    REGISTRY.observe("nutrihelp_rag_candidates", len(distances))
+    if known:
+        REGISTRY.observe("nutrihelp_rag_best_distance", min(known))
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.set("candidates", len(distances))
+        trace.set("distances", [round(distance, 3) for distance in known])
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
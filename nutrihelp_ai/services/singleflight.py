@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one execution (thread-based callers).
+
+    The first caller runs `fn`; callers arriving while it is in flight wait and
+    receive the same result (or exception). Nothing is cached after completion.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.collapsed = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+            else:
+                self.collapsed += 1
+                leader = False
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "collapsed": self.collapsed}
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight: followers await the leader's task.
+
+    The shared task is shielded, so one caller being cancelled does not cancel
+    the work the other callers are waiting on. Once every caller has been
+    cancelled the task is cancelled too, so abandoned upstream calls stop.
+    """
+
+    def __init__(self):
+        # Flights are per event loop; held weakly so a dead loop's flights are never joined from a new loop.
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.executions = 0
+        self.collapsed = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        flight = flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn(*args, **kwargs)))
+            flights[key] = flight
+            self.executions += 1
+
+            def _forget(done: "asyncio.Future[Any]") -> None:
+                current = flights.get(key)
+                if current is not None and current.task is done:
+                    del flights[key]
+
+            flight.task.add_done_callback(_forget)
+        else:
+            self.collapsed += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                self.abandoned += 1
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "collapsed": self.collapsed, "abandoned": self.abandoned}
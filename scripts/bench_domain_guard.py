@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from nutrihelp_ai.services.active_ai_backend import (
+    COMMON_FOOD_ALLERGENS,
+    CONSUMPTION_PATTERNS,
+    FOOD_HEALTH_PATTERNS,
+    FOOD_TERMS,
+    LIFESTYLE_TERMS,
+    NUTRITION_KEYWORDS,
+    SENSITIVITY_KEYWORDS,
+    GroqChromaBackend,
+)
+
+
+def legacy_is_nutrition_domain_prompt(prompt: str) -> bool:
+    """The pre-compilation guard: one re.search per term on every call."""
+    clean = (prompt or "").strip().lower()
+    if not clean:
+        return False
+
+    def has_term(terms):
+        return any(re.search(rf"\b{re.escape(term)}\b", clean) for term in terms)
+
+    if has_term(NUTRITION_KEYWORDS) or has_term(FOOD_TERMS) or has_term(LIFESTYLE_TERMS):
+        return True
+    if has_term(SENSITIVITY_KEYWORDS) and has_term(COMMON_FOOD_ALLERGENS):
+        return True
+    if any(re.search(pattern, clean) for pattern in CONSUMPTION_PATTERNS):
+        return True
+    return has_term(FOOD_TERMS) and any(re.search(pattern, clean) for pattern in FOOD_HEALTH_PATTERNS)
+
+
+def build_prompts() -> dict[str, str]:
+    filler = "Tell me about the history of the Roman empire and its roads. "
+    long_reject = (filler * (6000 // len(filler) + 1))[:6000]
+    long_accept = long_reject[:5950] + " Are bananas healthy?"
+    return {
+        "short accept": "Are bananas healthy?",
+        "short reject": "What is the capital of France?",
+        "6000-char reject": long_reject,
+        "6000-char accept (term at end)": long_accept,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark the chatbot nutrition domain guard.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats; the best run is reported.")
+    parser.add_argument("--number", type=int, default=200, help="Calls per timing repeat.")
+    args = parser.parse_args()
+
+    backend = GroqChromaBackend()
+    print(f"{'prompt':<32} {'legacy us/call':>15} {'compiled us/call':>17} {'speedup':>8}")
+    for name, prompt in build_prompts().items():
+        expected = legacy_is_nutrition_domain_prompt(prompt)
+        actual = backend._is_nutrition_domain_prompt(prompt)
+        if expected != actual:
+            raise SystemExit(f"Guard mismatch for {name!r}: legacy={expected} compiled={actual}")
+
+        legacy = min(timeit.repeat(lambda: legacy_is_nutrition_domain_prompt(prompt), repeat=args.repeat, number=args.number))
+        compiled = min(timeit.repeat(lambda: backend._is_nutrition_domain_prompt(prompt), repeat=args.repeat, number=args.number))
+        legacy_us = legacy / args.number * 1e6
+        compiled_us = compiled / args.number * 1e6
+        print(f"{name:<32} {legacy_us:>15.1f} {compiled_us:>17.1f} {legacy_us / compiled_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Dict
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from nutrihelp_ai.services.active_ai_backend import _force_json
+
+
+def legacy_force_json(text: str) -> Dict[str, Any]:
+    """The regex-based extractor `_force_json` used before the single-pass scanner."""
+    match = re.search(r"\{[\s\S]*\}\s*$", text)
+    raw = match.group(0) if match else text
+    raw = re.sub(r",(\s*[\]}])", r"\1", raw)
+
+    try:
+        data = json.loads(raw)
+    except Exception:
+        return {"suggestion": str(text).strip(), "weekly_plan": [], "progress_analysis": ""}
+
+    if isinstance(data.get("suggestion"), str) and "{" in data["suggestion"] and "}" in data["suggestion"]:
+        try:
+            inner = json.loads(data["suggestion"])
+        except Exception:
+            inner = None
+        if isinstance(inner, dict):
+            for key in ("suggestion", "weekly_plan", "progress_analysis"):
+                if key in inner and key not in data:
+                    data[key] = inner[key]
+
+    return data
+
+
+def build_outputs(size: int) -> dict[str, str]:
+    week = {
+        "week": 1,
+        "target_calories_per_day": 1900,
+        "focus": "Weight Loss",
+        "workouts": ["Monday: 30 minutes brisk walking", "Friday: 20 minutes strength training"],
+        "meal_notes": "Eat 3 main meals and 2 snacks.",
+        "reminders": ["Drink 8 glasses of water daily"],
+    }
+    plan = {"suggestion": "Drink more water.", "weekly_plan": [dict(week, week=n) for n in range(1, 9)], "progress_analysis": "Steady."}
+    valid = "Here is your plan:\n" + json.dumps(plan, indent=2).replace("}\n", "},\n", 1)
+    return {
+        "8-week plan with prose + trailing comma": valid,
+        f"{size}-char brace soup (no final brace)": ("{x} " * (size // 4))[:size] + "end",
+        f"{size}-char repeated plans, last truncated": (valid * (size // len(valid) + 1))[:size],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark health-plan JSON extraction on large malformed outputs.")
+    parser.add_argument("--size", type=int, default=20000, help="Characters in the malformed outputs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats; the best run is reported.")
+    parser.add_argument("--number", type=int, default=5, help="Calls per timing repeat.")
+    args = parser.parse_args()
+
+    print(f"{'output':<44} {'legacy ms/call':>15} {'scanner ms/call':>16} {'speedup':>8}")
+    for name, text in build_outputs(args.size).items():
+        legacy = min(timeit.repeat(lambda: legacy_force_json(text), repeat=args.repeat, number=args.number))
+        scanner = min(timeit.repeat(lambda: _force_json(text), repeat=args.repeat, number=args.number))
+        legacy_ms = legacy / args.number * 1e3
+        scanner_ms = scanner / args.number * 1e3
+        print(f"{name:<44} {legacy_ms:>15.2f} {scanner_ms:>16.2f} {legacy_ms / scanner_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Offline chat load test.
+
+Starts a fake Groq server and a local Chroma collection seeded from
+`corpus.jsonl`, serves the real API against them, and drives `/chat`,
+`/chat_with_rag` and `/medical-report/plan/generate` at a fixed request rate:
+
+    python -m scripts.loadtest --rps 20 --duration 30 --mix chat=5,rag=3,plan=1
+
+Pass `--base-url` to load an API that is already running instead (nothing is
+started locally in that mode).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+
+from scripts.loadtest.fake_groq import FakeGroqConfig, create_app
+from scripts.loadtest.load import default_scenarios, format_report, parse_mix, run_load, summarize
+from scripts.loadtest.local_chroma import attach_collection, seed_collection
+from scripts.loadtest.servers import serve_in_thread
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test for the chat and health plan endpoints.")
+    parser.add_argument("--rps", type=float, default=10.0, help="Target requests per second (open loop).")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for.")
+    parser.add_argument("--mix", default="chat=5,rag=3,plan=1", help="Scenario weights: chat, rag, plan.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout in seconds.")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Client connection limit.")
+    parser.add_argument("--base-url", default="", help="Load an already running API instead of starting one.")
+    parser.add_argument("--collection", default="loadtest_nutrition", help="Local Chroma collection to seed.")
+    parser.add_argument("--groq-latency-ms", type=float, default=300.0, help="Fake Groq time to first token.")
+    parser.add_argument("--groq-token-delay-ms", type=float, default=15.0, help="Fake Groq delay per token.")
+    parser.add_argument("--groq-completion-tokens", type=int, default=80, help="Words per fake chat answer.")
+    parser.add_argument("--groq-error-rate", type=float, default=0.0, help="Fraction of fake Groq calls that fail.")
+    parser.add_argument("--groq-rpm", type=float, default=0.0, help="GROQ_RATE_LIMIT_RPM for the API (0 disables).")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the per-IP slowapi route limits.")
+    parser.add_argument("--json", dest="json_path", default="", help="Also write the summary as JSON here.")
+    return parser.parse_args()
+
+
+def _configure_environment(groq_url: str, chroma_path: str, args: argparse.Namespace) -> None:
+    # Set before nutrihelp_ai is imported: the routers build their backends at import time.
+    os.environ.update(
+        {
+            "GROQ_API_KEY": "loadtest-key",
+            "GROQ_BASE_URL": groq_url,
+            "GROQ_RATE_LIMIT_RPM": str(args.groq_rpm),
+            "CHROMA_MODE": "local",
+            "CHROMA_PATH": chroma_path,
+            "RAG_COLLECTION": args.collection,
+            "ANONYMIZED_TELEMETRY": "False",
+        }
+    )
+
+
+def _load_local(args: argparse.Namespace, scenarios) -> dict:
+    config = FakeGroqConfig(
+        latency_ms=args.groq_latency_ms,
+        token_delay_ms=args.groq_token_delay_ms,
+        completion_tokens=args.groq_completion_tokens,
+        error_rate=args.groq_error_rate,
+    )
+    with tempfile.TemporaryDirectory(prefix="nutrihelp-loadtest-") as chroma_path, serve_in_thread(create_app(config)) as groq_url:
+        _configure_environment(groq_url, chroma_path, args)
+        collection = seed_collection(chroma_path, args.collection)
+
+        from nutrihelp_ai.extensions import limiter
+        from nutrihelp_ai.main import app
+        from nutrihelp_ai.services.active_ai_backend import get_shared_backend
+
+        # The chat and health plan routers both use the shared backend.
+        attach_collection(get_shared_backend(), collection)
+        limiter.enabled = args.keep_rate_limits
+
+        with serve_in_thread(app) as api_url:
+            print(f"fake Groq at {groq_url}, API at {api_url}, {collection.count()} fixture chunks", flush=True)
+            result = asyncio.run(
+                run_load(api_url, scenarios, args.rps, args.duration, args.timeout, args.max_in_flight)
+            )
+            summary = summarize(result)
+            summary["fake_groq"] = httpx.get(f"{groq_url}/stats").json()
+    return summary
+
+
+def main() -> None:
+    args = parse_args()
+    from nutrihelp_ai.services.active_ai_backend import _safe_reply
+
+    scenarios = default_scenarios(parse_mix(args.mix), safe_reply=_safe_reply())
+    if args.base_url:
+        result = asyncio.run(
+            run_load(args.base_url.rstrip("/"), scenarios, args.rps, args.duration, args.timeout, args.max_in_flight)
+        )
+        summary = summarize(result)
+    else:
+        summary = _load_local(args, scenarios)
+
+    print(format_report(summary))
+    if "fake_groq" in summary:
+        print(f"fake Groq: {summary['fake_groq']}")
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+_WORDS_RE = re.compile(r"\S+")
+_BLOCK_RE = re.compile(r"covers weeks (\d+)-(\d+) of a (\d+)-week plan")
+_WEEKS_RE = re.compile(r"Generate a (\d+)-week")
+_CONTEXT_RE = re.compile(r"CONTEXT:\n(.*?)\n\nQUESTION:", re.S)
+_CITATION_RE = re.compile(r"^\[\d+\]\s*")
+_FILLER = (
+    "Aim for a balanced plate with vegetables, wholegrains and lean protein, drink water through the day, "
+    "and keep portions of foods high in saturated fat, added sugar and salt small. "
+)
+
+
+@dataclass(frozen=True)
+class FakeGroqConfig:
+    latency_ms: float = 300.0  # time to first token
+    jitter: float = 0.2  # +/- fraction applied to latency_ms
+    token_delay_ms: float = 15.0  # per generated token
+    completion_tokens: int = 80  # words in a chat answer
+    error_rate: float = 0.0  # fraction of requests answered with `error_status`
+    error_status: int = 503
+    seed: int = 7
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _plan_weeks(prompt: str) -> tuple[int, int]:
+    block = _BLOCK_RE.search(prompt)
+    if block:
+        return int(block.group(1)), int(block.group(2))
+    weeks = _WEEKS_RE.search(prompt)
+    return 1, (int(weeks.group(1)) if weeks else 4)
+
+
+def _plan_reply(prompt: str) -> str:
+    first, last = _plan_weeks(prompt)
+    weekly_plan = [
+        {
+            "week": week,
+            "target_calories_per_day": 1900 - 25 * (week - 1),
+            "focus": "Weight Loss" if week % 2 else "Endurance",
+            "workouts": ["Monday: 30 minutes brisk walking", "Thursday: 20 minutes strength training"],
+            "meal_notes": "Three main meals and two snacks; half the plate vegetables.",
+            "reminders": ["Drink 8 glasses of water daily", "Sleep 7-8 hours"],
+        }
+        for week in range(first, last + 1)
+    ]
+    return json.dumps(
+        {
+            "suggestion": "Build meals around vegetables, wholegrains and lean protein.",
+            "weekly_plan": weekly_plan,
+            "progress_analysis": "Readings are stable across reports.",
+        }
+    )
+
+
+def _chat_reply(prompt: str, words: int) -> str:
+    lead = "Here is some general nutrition guidance."
+    context = _CONTEXT_RE.search(prompt)
+    if context:
+        # Assembled context is a SOURCES table, a blank line, then "[n] passage" lines.
+        passages = context.group(1).split("\n\n", 1)[-1] if context.group(1).startswith("SOURCES:") else context.group(1)
+        first = next((line for line in passages.splitlines() if line.strip()), "")
+        lead = _CITATION_RE.sub("", first).strip() or lead
+    text = lead + " " + _FILLER * (words // 25 + 1)
+    return " ".join(text.split()[: max(words, len(lead.split()))])
+
+
+def _reply_for(messages: List[Dict[str, str]], config: FakeGroqConfig) -> str:
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    if "valid JSON" in system:
+        return _plan_reply(prompt)
+    return _chat_reply(prompt, config.completion_tokens)
+
+
+def create_app(config: FakeGroqConfig = FakeGroqConfig()) -> FastAPI:
+    """OpenAI-compatible stand-in for the Groq chat completions API.
+
+    Serves `POST /openai/v1/chat/completions` (the path the Groq SDK and the
+    backend's HTTP fallback call) with plain and `stream=true` responses. Health
+    plan prompts get a schema-valid plan for the requested weeks; other prompts
+    get an answer built from the first grounding context line, if any. Latency,
+    per-token delay and an injected error rate come from `config`; request and
+    error counts are exposed at `GET /stats`.
+    """
+    app = FastAPI(title="Fake Groq")
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "streams": 0, "errors": 0}
+
+    def first_token_delay() -> float:
+        spread = config.latency_ms * config.jitter
+        return max(0.0, config.latency_ms + rng.uniform(-spread, spread)) / 1000
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if config.error_rate > 0 and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            await asyncio.sleep(first_token_delay() / 2)
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {"message": "Injected failure from fake Groq", "type": "server_error"}},
+            )
+
+        messages = body.get("messages") or []
+        model = body.get("model") or "fake-model"
+        reply = _reply_for(messages, config)
+        tokens = _WORDS_RE.findall(reply)
+        usage = {
+            "prompt_tokens": sum(_estimate_tokens(m.get("content", "")) for m in messages),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            stats["streams"] += 1
+            return StreamingResponse(
+                _stream(completion_id, created, model, tokens, config, first_token_delay()),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(first_token_delay() + len(tokens) * config.token_delay_ms / 1000)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    return app
+
+
+async def _stream(
+    completion_id: str,
+    created: int,
+    model: str,
+    tokens: List[str],
+    config: FakeGroqConfig,
+    first_delay: float,
+) -> AsyncIterator[str]:
+    def chunk(delta: Dict[str, Any], finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(first_delay)
+    yield chunk({"role": "assistant", "content": ""})
+    for index, token in enumerate(tokens):
+        yield chunk({"content": token if index == 0 else " " + token})
+        await asyncio.sleep(config.token_delay_ms / 1000)
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+CHAT_QUERIES = (
+    "Are bananas a good source of potassium?",
+    "How much calcium do adults need each day?",
+    "What are healthy snacks for work?",
+    "Which foods help lower cholesterol?",
+    "How much salt should I eat per day?",
+    "Is oily fish good for heart health?",
+    "What should I eat for breakfast to stay full?",
+    "How much protein do I need if I train regularly?",
+    "Can I drink milk if I am lactose intolerant?",
+    "What low GI foods are good for type 2 diabetes?",
+    "hi there",
+    "What is the capital of France?",
+)
+
+
+def _plan_payload(obesity_level: str, diabetes: bool, target_weight: float, days_per_week: int) -> Dict[str, Any]:
+    return {
+        "medical_report": [
+            {
+                "health_info": {"gender": "female", "weight": 82.0, "height": 1.68, "age": 41, "activity_level": "moderate"},
+                "obesity_prediction": {"obesity_level": obesity_level, "confidence": 87.5},
+                "diabetes_prediction": {"diabetes": diabetes, "confidence": 72.0},
+            }
+        ],
+        "health_goal": {"target_weight": target_weight, "days_per_week": days_per_week, "workout_place": "home"},
+    }
+
+
+PLAN_PAYLOADS = (
+    _plan_payload("Overweight_Level_I", False, 74.0, 3),
+    _plan_payload("Obesity_Type_I", True, 78.0, 4),
+    _plan_payload("Normal_Weight", False, 65.0, 5),
+    _plan_payload("Overweight_Level_II", True, 80.0, 2),
+)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    path: str
+    payloads: Tuple[Dict[str, Any], ...]
+    weight: float = 1.0
+    # Flags 2xx bodies that are really a degraded answer (e.g. the safe reply after a Groq failure).
+    degraded: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+def default_scenarios(mix: Dict[str, float], safe_reply: Optional[str] = None) -> List[Scenario]:
+    def is_safe_reply(body: Dict[str, Any]) -> bool:
+        return safe_reply is not None and body.get("msg") == safe_reply
+
+    chat_payloads = tuple({"query": query} for query in CHAT_QUERIES)
+    available = {
+        "chat": Scenario("chat", "/ai-model/chatbot/chat", chat_payloads, degraded=is_safe_reply),
+        "rag": Scenario("rag", "/ai-model/chatbot/chat_with_rag", chat_payloads, degraded=is_safe_reply),
+        "plan": Scenario("plan", "/ai-model/medical-report/plan/generate", PLAN_PAYLOADS),
+    }
+    unknown = set(mix) - set(available)
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(sorted(unknown))}; choose from {', '.join(available)}")
+    return [
+        Scenario(name, scenario.path, scenario.payloads, mix[name], scenario.degraded)
+        for name, scenario in available.items()
+        if mix.get(name, 0) > 0
+    ]
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    """Parse `chat=5,rag=3,plan=1` into scenario weights."""
+    mix: Dict[str, float] = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight) if weight.strip() else 1.0
+    return mix
+
+
+@dataclass
+class Sample:
+    scenario: str
+    latency: float
+    status: int  # 0 when the request never got a response
+    error: str = ""
+    degraded: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300 and not self.error
+
+
+@dataclass
+class LoadResult:
+    samples: List[Sample] = field(default_factory=list)
+    elapsed: float = 0.0
+    target_rps: float = 0.0
+
+
+async def _fire(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    payload: Dict[str, Any],
+    scheduled: float,
+    samples: List[Sample],
+) -> None:
+    status, error, degraded = 0, "", False
+    try:
+        response = await client.post(scenario.path, json=payload)
+        status = response.status_code
+        if 200 <= status < 300 and scenario.degraded is not None:
+            degraded = scenario.degraded(response.json())
+    except Exception as exc:
+        error = type(exc).__name__
+    # Measured from the scheduled send time, so a stalled server cannot hide queueing delay.
+    samples.append(Sample(scenario.name, time.perf_counter() - scheduled, status, error, degraded))
+
+
+async def run_load(
+    base_url: str,
+    scenarios: Sequence[Scenario],
+    rps: float,
+    duration: float,
+    timeout: float = 60.0,
+    max_in_flight: int = 256,
+    seed: int = 7,
+) -> LoadResult:
+    """Open-loop load: requests start on a fixed `rps` schedule whether or not earlier ones finished."""
+    if rps <= 0 or duration <= 0:
+        raise ValueError("rps and duration must be positive")
+    rng = random.Random(seed)
+    weights = [scenario.weight for scenario in scenarios]
+    counters = {scenario.name: 0 for scenario in scenarios}
+    result = LoadResult(target_rps=rps)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        tasks = []
+        for index in range(max(1, int(rps * duration))):
+            scheduled = started + index / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario = rng.choices(scenarios, weights)[0]
+            payload = scenario.payloads[counters[scenario.name] % len(scenario.payloads)]
+            counters[scenario.name] += 1
+            tasks.append(asyncio.create_task(_fire(client, scenario, payload, scheduled, result.samples)))
+        await asyncio.gather(*tasks)
+        result.elapsed = time.perf_counter() - started
+    return result
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(result: LoadResult) -> Dict[str, Any]:
+    groups: Dict[str, List[Sample]] = {}
+    for sample in result.samples:
+        groups.setdefault(sample.scenario, []).append(sample)
+    groups["all"] = list(result.samples)
+
+    summary: Dict[str, Any] = {"target_rps": result.target_rps, "elapsed_s": round(result.elapsed, 2), "scenarios": {}}
+    for name, samples in groups.items():
+        latencies = [sample.latency * 1000 for sample in samples]
+        errors = [sample for sample in samples if not sample.ok]
+        statuses: Dict[str, int] = {}
+        for sample in samples:
+            key = sample.error or str(sample.status)
+            statuses[key] = statuses.get(key, 0) + 1
+        summary["scenarios"][name] = {
+            "requests": len(samples),
+            "achieved_rps": round(len(samples) / result.elapsed, 2) if result.elapsed else 0.0,
+            "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+            "degraded_rate": round(sum(sample.degraded for sample in samples) / len(samples), 4) if samples else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1) if latencies else 0.0,
+            "statuses": statuses,
+        }
+    return summary
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"target {summary['target_rps']} rps over {summary['elapsed_s']} s",
+        f"{'scenario':<10} {'reqs':>6} {'rps':>7} {'err%':>7} {'degr%':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses",
+    ]
+    for name, row in summary["scenarios"].items():
+        statuses = " ".join(f"{key}:{count}" for key, count in sorted(row["statuses"].items()))
+        lines.append(
+            f"{name:<10} {row['requests']:>6} {row['achieved_rps']:>7} {row['error_rate'] * 100:>6.1f}% "
+            f"{row['degraded_rate'] * 100:>6.1f}% {row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}  {statuses}"
+        )
+    return "\n".join(lines)
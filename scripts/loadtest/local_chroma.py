@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import chromadb
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from nutrihelp_ai.services.active_ai_backend import chunk_metadata
+
+CORPUS_PATH = Path(__file__).with_name("corpus.jsonl")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i",
+    "in", "is", "it", "me", "much", "of", "on", "or", "should", "the", "to", "what", "which", "with",
+}
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic bag-of-words embeddings, so the harness never downloads a model.
+
+    Words (lower-cased, stopwords and plural `s` dropped) are hashed into
+    `dimensions` signed buckets and the vector is L2-normalised. Texts sharing
+    words land close together, which is enough to exercise the strict / relaxed
+    distance thresholds with realistic spreads.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return [self._embed(text) for text in input]
+
+    def _embed(self, text: str) -> List[float]:
+        words = [_stem(word) for word in _TOKEN_RE.findall(text.lower()) if word not in _STOPWORDS]
+        vector = [0.0] * self.dimensions
+        for word in words:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    @staticmethod
+    def name() -> str:
+        return "nutrihelp-loadtest-hashing"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(dimensions=config.get("dimensions", 256))
+
+
+def load_corpus(path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    records = []
+    with open(path or CORPUS_PATH, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+def seed_collection(chroma_path: str, collection_name: str, corpus_path: Optional[Path] = None):
+    """Create (or refresh) a local persistent collection holding the fixture corpus."""
+    client = chromadb.PersistentClient(path=chroma_path)
+    collection = client.get_or_create_collection(
+        name=collection_name,
+        embedding_function=HashingEmbeddingFunction(),
+        metadata={"hnsw:space": "l2"},
+    )
+    records = load_corpus(corpus_path)
+    collection.upsert(
+        ids=[record["id"] for record in records],
+        documents=[record["text"] for record in records],
+        metadatas=[
+            chunk_metadata(record["text"], {"source": record.get("source", "fixture"), "topic": record.get("topic", "")})
+            for record in records
+        ],
+    )
+    return collection
+
+
+def attach_collection(backend, collection) -> None:
+    """Point a `GroqChromaBackend` at the seeded collection.
+
+    Reopening a local collection by name gives it Chroma's default embedding
+    function (a model download), so the harness hands over the collection it
+    seeded, and the embedding function it seeded with, instead.
+    """
+    backend._collection = collection
+    backend._embedding_function = HashingEmbeddingFunction()
+    backend.invalidate_collection_caches()
@@ -0,0 +1,435 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from nutrihelp_ai.services.active_ai_backend import (
+    ActiveAISettings,
+    GROUNDING_SYSTEM_PROMPT,
+    GroqChromaBackend,
+)
+from nutrihelp_ai.services.deadline import Deadline, DeadlineExceeded
+
+
+class FakeCollection:
+    def __init__(self, documents, distances):
+        self.documents = documents
+        self.distances = distances
+        self.queries = []
+
+    def count(self):
+        return len(self.documents)
+
+    def query(self, query_texts, n_results):
+        self.queries.append((list(query_texts), n_results))
+        return {
+            "documents": [self.documents[:n_results] for _ in query_texts],
+            "distances": [self.distances[:n_results] for _ in query_texts],
+        }
+
+
+class FakeStream:
+    def __init__(self, content, piece_size=8):
+        self.pieces = [content[i:i + piece_size] for i in range(0, len(content), piece_size)]
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+        self.streams = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.replies.pop(0)
+        if kwargs.get("stream"):
+            stream = FakeStream(content)
+            self.streams.append(stream)
+            return stream
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def collect(deltas):
+    return [delta async for delta in deltas]
+
+
+def make_backend(replies, documents=None, distances=None):
+    settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local")
+    backend = GroqChromaBackend(settings=settings)
+    completions = FakeAsyncCompletions(replies)
+    backend._async_groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    backend._collection = FakeCollection(documents or [], distances or [])
+    return backend, completions
+
+
+class AsyncChatPathTest(unittest.IsolatedAsyncioTestCase):
+    async def test_grounded_answer_uses_retrieved_context(self):
+        backend, completions = make_backend(
+            ["Bananas provide potassium and fibre."],
+            documents=["Bananas are a source of potassium and fibre."],
+            distances=[0.3],
+        )
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?")
+
+        self.assertEqual(reply, "Bananas provide potassium and fibre.")
+        self.assertEqual(len(completions.calls), 1)
+        self.assertEqual(completions.calls[0]["messages"][0]["content"], GROUNDING_SYSTEM_PROMPT)
+
+    async def test_grounding_context_is_verbatim_by_default(self):
+        chunk = "Bananas are a source of potassium and fibre. They are also a convenient snack."
+        backend, completions = make_backend(["Bananas provide potassium and fibre."], documents=[chunk], distances=[0.3])
+
+        await backend.achat_with_rag_fallback("Are bananas healthy?")
+
+        self.assertIn(chunk, completions.calls[0]["messages"][1]["content"])
+        self.assertEqual(backend.cache_stats()["context_assembly"]["tokens_saved"], 0)
+
+    async def test_weak_grounded_answer_falls_back_to_domain_chat(self):
+        backend, completions = make_backend(
+            [
+                "I don't have enough information on that topic in my knowledge base.",
+                "Yes, bananas are a healthy snack.",
+            ],
+            documents=["Unrelated chunk about kilojoules."],
+            distances=[1.2],
+        )
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?")
+
+        self.assertEqual(reply, "Yes, bananas are a healthy snack.")
+        self.assertEqual(len(completions.calls), 2)
+
+    async def test_repeated_grounded_question_is_served_from_cache(self):
+        backend, completions = make_backend(
+            ["Bananas provide potassium and fibre."],
+            documents=["Bananas are a source of potassium and fibre."],
+            distances=[0.3],
+        )
+
+        first = await backend.achat_with_rag_fallback("Are bananas healthy?")
+        second = await backend.achat_with_rag_fallback("is banana healthy")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(completions.calls), 1)
+        self.assertEqual(len(backend._collection.queries), 1)
+        self.assertEqual(backend.cache_stats()["response_cache"]["hits"], 1)
+
+    async def test_identical_concurrent_chats_are_routed_once(self):
+        backend, completions = make_backend(["Oats are a whole grain."])
+
+        replies = await asyncio.gather(*(backend.achat("Are oats a whole grain?") for _ in range(3)))
+
+        self.assertEqual(replies, ["Oats are a whole grain."] * 3)
+        self.assertEqual(len(completions.calls), 1)
+        decisions = sum(route["decisions"] for route in backend._model_router.stats()["routes"].values())
+        self.assertEqual(decisions, 1)
+
+    async def test_guarded_chat_classifies_the_prompt_once(self):
+        backend, completions = make_backend(["Hi! Oats are a whole grain."])
+        checks = []
+        for name in ("_is_social_prompt", "_is_nutrition_domain_prompt"):
+            check = getattr(backend, name)
+            setattr(backend, name, lambda prompt, check=check, name=name: checks.append(name) or check(prompt))
+
+        reply = await backend.run_agent_ws("hello, are oats a whole grain?")
+
+        self.assertEqual(reply, "Hi! Oats are a whole grain.")
+        self.assertEqual(checks, ["_is_social_prompt", "_is_nutrition_domain_prompt"])
+        self.assertEqual(backend._model_router.stats()["routes"]["domain_chat"]["decisions"], 1)
+
+    async def test_cached_answers_are_kept_per_routed_model(self):
+        settings = ActiveAISettings(
+            groq_api_key="test-key",
+            chroma_mode="local",
+            groq_model_routes='{"grounded_rag": {"models": ["model-a", "model-b"]}}',
+        )
+        backend = GroqChromaBackend(settings=settings)
+        completions = FakeAsyncCompletions(["Bananas provide potassium.", "Bananas are rich in potassium."])
+        backend._async_groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        backend._collection = FakeCollection(["Bananas are a source of potassium and fibre."], [0.3])
+
+        first = await backend.achat_with_rag_fallback("Are bananas healthy?")
+        # model-b has not been measured yet, so the router now prefers it and model-a's answer is not reused.
+        second = await backend.achat_with_rag_fallback("Are bananas healthy?")
+        third = await backend.achat_with_rag_fallback("Are bananas healthy?")
+
+        self.assertEqual([call["model"] for call in completions.calls], ["model-a", "model-b"])
+        self.assertEqual((first, second), ("Bananas provide potassium.", "Bananas are rich in potassium."))
+        self.assertIn(third, (first, second))
+        self.assertEqual(backend.cache_stats()["response_cache"]["hits"], 1)
+
+    async def test_out_of_scope_prompt_is_redirected_without_llm_call(self):
+        backend, completions = make_backend([])
+
+        reply = await backend.achat_with_rag_fallback("What is the capital of France?")
+
+        self.assertEqual(reply, backend._domain_redirect_reply())
+        self.assertEqual(completions.calls, [])
+
+
+class StreamingChatTest(unittest.IsolatedAsyncioTestCase):
+    async def test_streams_grounded_answer_in_pieces(self):
+        answer = "Bananas provide potassium, fibre and vitamin B6. " * 5
+        backend, completions = make_backend(
+            [answer],
+            documents=["Bananas are a source of potassium and fibre."],
+            distances=[0.3],
+        )
+
+        deltas = await collect(backend.astream_chat_with_rag_fallback("Are bananas healthy?"))
+
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual("".join(deltas), answer)
+        self.assertTrue(completions.streams[0].closed)
+
+    async def test_weak_streamed_answer_switches_to_domain_chat(self):
+        backend, completions = make_backend(
+            [
+                "I don't have enough information on that topic in my knowledge base.",
+                "Yes, bananas are a healthy snack.",
+            ],
+            documents=["Unrelated chunk about kilojoules."],
+            distances=[1.2],
+        )
+
+        deltas = await collect(backend.astream_chat_with_rag_fallback("Are bananas healthy?"))
+
+        self.assertEqual("".join(deltas), "Yes, bananas are a healthy snack.")
+        self.assertEqual(len(completions.calls), 2)
+
+
+class RoutingCompletions:
+    """Answers grounded and plain-chat requests separately, each after its own delay."""
+
+    def __init__(self, grounded, plain, grounded_delay=0.0, plain_delay=0.0):
+        self.replies = {True: (grounded, grounded_delay), False: (plain, plain_delay)}
+        self.calls = []
+        self.cancelled = []
+
+    async def create(self, **kwargs):
+        grounded = kwargs["messages"][0]["content"] == GROUNDING_SYSTEM_PROMPT
+        self.calls.append(grounded)
+        content, delay = self.replies[grounded]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(grounded)
+            raise
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_speculative_backend(completions, distance):
+    settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", rag_speculative_fallback=True)
+    backend = GroqChromaBackend(settings=settings)
+    backend._async_groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    backend._collection = FakeCollection(["Bananas contain potassium."], [distance])
+    return backend
+
+
+class SpeculativeFallbackTest(unittest.IsolatedAsyncioTestCase):
+    async def test_weak_grounded_answer_uses_parallel_chat(self):
+        completions = RoutingCompletions(
+            "I don't have enough information on that topic in my knowledge base.",
+            "Yes, bananas are a healthy snack.",
+            grounded_delay=0.05,
+            plain_delay=0.05,
+        )
+        backend = make_speculative_backend(completions, distance=1.2)
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?")
+
+        self.assertEqual(reply, "Yes, bananas are a healthy snack.")
+        self.assertCountEqual(completions.calls, [True, False])
+        stats = backend.cache_stats()["speculative_fallback"]
+        self.assertEqual(stats["used"], 1)
+        self.assertGreater(stats["saved_seconds"], 0.02)
+
+    async def test_good_grounded_answer_cancels_parallel_chat(self):
+        completions = RoutingCompletions(
+            "Bananas provide potassium.",
+            "Yes, bananas are a healthy snack.",
+            plain_delay=5.0,
+        )
+        backend = make_speculative_backend(completions, distance=1.2)
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?")
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(reply, "Bananas provide potassium.")
+        self.assertEqual(completions.cancelled, [False])
+        stats = backend.cache_stats()["speculative_fallback"]
+        self.assertEqual(stats["discarded"], 1)
+        self.assertGreater(stats["extra_tokens"], 0)
+
+    async def test_strict_contexts_are_not_speculated(self):
+        completions = RoutingCompletions("Bananas provide potassium.", "unused")
+        backend = make_speculative_backend(completions, distance=0.3)
+
+        await backend.achat_with_rag_fallback("Are bananas healthy?")
+
+        self.assertEqual(completions.calls, [True])
+        self.assertEqual(backend.cache_stats()["speculative_fallback"]["launched"], 0)
+
+
+class CountingCompletions:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        question = kwargs["messages"][-1]["content"].rsplit("QUESTION:", 1)[-1].strip()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"Answer: {question}"))])
+
+
+class BatchChatTest(unittest.IsolatedAsyncioTestCase):
+    async def test_batch_uses_one_retrieval_call_and_caps_concurrency(self):
+        backend, _ = make_backend([], documents=["Oats contain fibre."], distances=[0.2])
+        completions = CountingCompletions()
+        backend._async_groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        prompts = [f"How much fibre is in oats serving {n}?" for n in range(6)]
+
+        results = await collect(backend.astream_chat_batch(prompts, concurrency=2))
+
+        self.assertEqual(len(backend._collection.queries), 1)
+        self.assertEqual(backend._collection.queries[0][0], prompts)
+        self.assertEqual(sorted(item["index"] for item in results), list(range(6)))
+        self.assertLessEqual(completions.peak, 2)
+        for item in results:
+            self.assertEqual(item["status"], "success")
+            self.assertIn(prompts[item["index"]], item["msg"])
+            self.assertGreaterEqual(item["elapsed_ms"], 0)
+
+
+def make_deadline_backend(completions, distance, **overrides):
+    settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", **overrides)
+    backend = GroqChromaBackend(settings=settings)
+    backend._async_groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    backend._collection = FakeCollection(["Bananas contain potassium."], [distance])
+    return backend
+
+
+class DeadlineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_short_deadline_skips_retrieval_for_domain_chat(self):
+        completions = RoutingCompletions("unused", "Yes, bananas are a healthy snack.")
+        backend = make_deadline_backend(completions, distance=0.3, deadline_grounded_min_seconds=2.0)
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?", deadline=Deadline(1.0))
+
+        self.assertEqual(reply, "Yes, bananas are a healthy snack.")
+        self.assertEqual(completions.calls, [False])
+        self.assertEqual(backend._collection.queries, [])
+
+    async def test_overrunning_completion_is_cancelled(self):
+        completions = RoutingCompletions("Bananas provide potassium.", "unused", grounded_delay=5.0)
+        backend = make_deadline_backend(
+            completions, distance=0.3, deadline_grounded_min_seconds=0.05, deadline_retrieval_seconds=0.05
+        )
+
+        with self.assertRaises(DeadlineExceeded) as raised:
+            await backend.achat_with_rag_fallback("Are bananas healthy?", deadline=Deadline(0.2))
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(raised.exception.stage, "llm")
+        self.assertEqual(completions.cancelled, [True])
+        self.assertEqual(backend.cache_stats()["request_coalescing"]["async"]["abandoned"], 1)
+
+    async def test_weak_answer_is_kept_when_no_time_for_fallback(self):
+        weak = "I don't have enough information on that topic in my knowledge base."
+        completions = RoutingCompletions(weak, "unused")
+        backend = make_deadline_backend(
+            completions, distance=0.3, deadline_grounded_min_seconds=0.0, deadline_fallback_min_seconds=5.0
+        )
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?", deadline=Deadline(2.0))
+
+        self.assertEqual(reply, weak)
+        self.assertEqual(completions.calls, [True])
+
+    async def test_grounded_only_answer_fails_fast_without_time_to_retrieve(self):
+        completions = RoutingCompletions("unused", "unused")
+        backend = make_deadline_backend(completions, distance=0.3)
+
+        with self.assertRaises(DeadlineExceeded):
+            await backend.agenerate_with_rag("Are bananas healthy?", deadline=Deadline(0.5))
+
+        self.assertEqual(completions.calls, [])
+
+    async def test_speculative_chat_is_abandoned_at_the_deadline(self):
+        weak = "I don't have enough information on that topic in my knowledge base."
+        completions = RoutingCompletions(weak, "Yes, bananas are a healthy snack.", plain_delay=5.0)
+        backend = make_deadline_backend(
+            completions,
+            distance=1.2,
+            rag_speculative_fallback=True,
+            deadline_grounded_min_seconds=0.0,
+            deadline_fallback_min_seconds=0.0,
+        )
+
+        reply = await backend.achat_with_rag_fallback("Are bananas healthy?", deadline=Deadline(0.3))
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(reply, weak)
+        self.assertEqual(completions.cancelled, [False])
+        self.assertEqual(backend.cache_stats()["speculative_fallback"]["discarded"], 1)
+
+    def test_sync_speculative_chat_runs_under_the_request_deadline(self):
+        weak = "I don't have enough information on that topic in my knowledge base."
+        calls = []
+
+        def create(**kwargs):
+            grounded = kwargs["messages"][0]["content"] == GROUNDING_SYSTEM_PROMPT
+            calls.append((grounded, kwargs.get("timeout")))
+            content = weak if grounded else "Yes, bananas are a healthy snack."
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        backend = make_deadline_backend(
+            RoutingCompletions("unused", "unused"),
+            distance=1.2,
+            rag_speculative_fallback=True,
+            deadline_grounded_min_seconds=0.0,
+        )
+        backend._groq_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+        reply = backend.chat_with_rag_fallback("Are bananas healthy?", deadline=Deadline(5.0))
+
+        self.assertEqual(reply, "Yes, bananas are a healthy snack.")
+        plain_timeouts = [timeout for grounded, timeout in calls if not grounded]
+        self.assertEqual(len(plain_timeouts), 1)
+        self.assertIsNotNone(plain_timeouts[0])
+        self.assertLessEqual(plain_timeouts[0], 5.0)
+
+    def test_sync_pipeline_skips_retrieval_under_short_deadline(self):
+        backend = make_deadline_backend(RoutingCompletions("unused", "unused"), distance=0.3)
+        backend._groq_client = SimpleNamespace(
+            chat=SimpleNamespace(
+                completions=SimpleNamespace(
+                    create=lambda **kwargs: SimpleNamespace(
+                        choices=[SimpleNamespace(message=SimpleNamespace(content="Yes, bananas are a healthy snack."))]
+                    )
+                )
+            )
+        )
+
+        reply = backend.chat_with_rag_fallback("Are bananas healthy?", deadline=Deadline(1.0))
+
+        self.assertEqual(reply, "Yes, bananas are a healthy snack.")
+        self.assertEqual(backend._collection.queries, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
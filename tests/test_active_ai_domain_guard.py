@@ -53,6 +53,12 @@ class DomainGuardTest(unittest.TestCase):
             with self.subTest(prompt=prompt):
                 self.assertFalse(self.backend._is_nutrition_domain_prompt(prompt))
 
+    def test_terms_match_whole_words_only(self):
+        self.assertTrue(self.backend._is_nutrition_domain_prompt("Any tips for meal planning this week?"))
+        self.assertTrue(self.backend._is_nutrition_domain_prompt("Suggest a LOW-CARB option"))
+        self.assertFalse(self.backend._is_nutrition_domain_prompt("Tell me about eggplant emoji meanings"))
+        self.assertFalse(self.backend._is_nutrition_domain_prompt("Is the gymnasium open today?"))
+
 
 if __name__ == "__main__":
     unittest.main()
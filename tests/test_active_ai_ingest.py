@@ -0,0 +1,159 @@
+import threading
+import unittest
+
+from nutrihelp_ai.services.active_ai_backend import (
+    ActiveAISettings,
+    GroqChromaBackend,
+    document_content_id,
+)
+
+META_CHUNK = "Example successful response: the JSON body contains a recipes array."
+
+
+class FakeCollection:
+    def __init__(self, failures=0):
+        self.records = {}
+        self.upserts = []
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def count(self):
+        return len(self.records)
+
+    def upsert(self, ids, documents, metadatas=None):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("transient Chroma error")
+            self.upserts.append(list(ids))
+            for offset, doc_id in enumerate(ids):
+                self.records[doc_id] = (documents[offset], metadatas[offset] if metadatas else None)
+
+
+def make_backend(collection):
+    settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local")
+    backend = GroqChromaBackend(settings=settings)
+    backend._collection = collection
+    return backend
+
+
+class IngestDocumentsTest(unittest.TestCase):
+    def test_batches_documents_under_content_hash_ids(self):
+        collection = FakeCollection()
+        backend = make_backend(collection)
+        docs = [f"Chunk {index} about wholegrain serves." for index in range(7)]
+
+        report = backend.ingest_documents(docs, batch_size=3, max_workers=2)
+
+        self.assertEqual([batch.size for batch in report.batches], [3, 3, 1])
+        self.assertEqual(report.after_count, 7)
+        self.assertIn(document_content_id(docs[0]), collection.records)
+
+    def test_reingesting_same_content_is_idempotent(self):
+        collection = FakeCollection()
+        backend = make_backend(collection)
+        docs = ["Iodine is found in seafood.", "  iodine is found in   SEAFOOD. ", "Sardines contain calcium."]
+
+        first = backend.ingest_documents(docs)
+        second = backend.ingest_documents(docs)
+
+        self.assertEqual(first.unique, 2)
+        self.assertEqual(first.after_count, 2)
+        self.assertEqual(second.before_count, 2)
+        self.assertEqual(second.after_count, 2)
+
+    def test_failed_batch_is_retried(self):
+        collection = FakeCollection(failures=1)
+        backend = make_backend(collection)
+
+        report = backend.ingest_documents(["Milk is a source of calcium."], max_retries=2)
+
+        self.assertEqual(report.batches[0].attempts, 2)
+        self.assertEqual(report.failed_batches, [])
+        self.assertEqual(report.after_count, 1)
+
+    def test_add_documents_returns_new_count(self):
+        backend = make_backend(FakeCollection())
+
+        self.assertEqual(backend.add_documents(["Legumes are high in fibre."]), 1)
+
+    def test_chunks_are_tagged_at_ingest(self):
+        collection = FakeCollection()
+        backend = make_backend(collection)
+        docs = ["Legumes are high in fibre.", META_CHUNK]
+
+        backend.ingest_documents(docs, metadatas=[{"source_file": "guide.txt"}, None])
+
+        _, metadata = collection.records[document_content_id(docs[0])]
+        self.assertEqual(
+            metadata,
+            {"source_file": "guide.txt", "is_meta": False, "content_hash": document_content_id(docs[0])},
+        )
+        self.assertTrue(collection.records[document_content_id(META_CHUNK)][1]["is_meta"])
+
+
+class PagedCollection:
+    def __init__(self, records):
+        self.records = dict(records)
+        self.updates = []
+
+    def count(self):
+        return len(self.records)
+
+    def get(self, include, limit, offset):
+        ids = list(self.records)[offset:offset + limit]
+        return {
+            "ids": ids,
+            "documents": [self.records[doc_id][0] for doc_id in ids],
+            "metadatas": [self.records[doc_id][1] for doc_id in ids],
+        }
+
+    def update(self, ids, metadatas):
+        self.updates.append(list(ids))
+        for doc_id, metadata in zip(ids, metadatas):
+            self.records[doc_id] = (self.records[doc_id][0], metadata)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            del self.records[doc_id]
+
+
+class MetadataBackfillTest(unittest.TestCase):
+    def make_collection(self):
+        return PagedCollection(
+            {
+                "legacy-1": ("Milk is a source of calcium.", {"title": "Dairy"}),
+                "legacy-2": (META_CHUNK, None),
+                "legacy-3": ("  milk is a source of   CALCIUM. ", {"title": "Dairy copy"}),
+                "legacy-4": ("Oats contain fibre.", {"is_meta": False, "content_hash": document_content_id("Oats contain fibre.")}),
+            }
+        )
+
+    def test_tags_untagged_chunks_and_removes_duplicates(self):
+        collection = self.make_collection()
+        backend = make_backend(collection)
+
+        report = backend.backfill_chunk_metadata(page_size=2)
+
+        self.assertEqual((report.scanned, report.tagged, report.meta, report.duplicates, report.deleted), (4, 3, 1, 1, 1))
+        self.assertEqual(sorted(collection.records), ["legacy-1", "legacy-2", "legacy-4"])
+        self.assertEqual(collection.records["legacy-1"][1]["title"], "Dairy")
+        self.assertFalse(collection.records["legacy-1"][1]["is_meta"])
+        self.assertTrue(collection.records["legacy-2"][1]["is_meta"])
+
+        rerun = backend.backfill_chunk_metadata(page_size=2)
+        self.assertEqual((rerun.tagged, rerun.deleted), (0, 0))
+
+    def test_dry_run_writes_nothing(self):
+        collection = self.make_collection()
+        backend = make_backend(collection)
+
+        report = backend.backfill_chunk_metadata(dry_run=True)
+
+        self.assertEqual((report.tagged, report.duplicates, report.deleted), (3, 1, 0))
+        self.assertEqual(collection.updates, [])
+        self.assertEqual(len(collection.records), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
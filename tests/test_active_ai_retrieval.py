@@ -0,0 +1,251 @@
+import asyncio
+import math
+import threading
+import unittest
+
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend
+
+
+class FakeEmbeddingFunction:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakeCollection:
+    def __init__(self, documents, distances):
+        self.documents = list(documents)
+        self.distances = list(distances)
+        self.queries = []
+
+    def count(self):
+        return len(self.documents)
+
+    def query(self, n_results, query_texts=None, query_embeddings=None):
+        self.queries.append({"texts": query_texts, "embeddings": query_embeddings, "n_results": n_results})
+        batch = len(query_texts or query_embeddings)
+        return {
+            "documents": [self.documents[:n_results] for _ in range(batch)],
+            "distances": [self.distances[:n_results] for _ in range(batch)],
+        }
+
+    def get(self, include, limit, offset):
+        page = self.documents[offset:offset + limit]
+        return {"ids": [f"doc-{offset + index}" for index in range(len(page))], "documents": page}
+
+    def upsert(self, ids, documents, metadatas=None):
+        self.documents.extend(documents)
+        self.distances.extend([0.5] * len(documents))
+
+
+def make_backend(documents, distances, **overrides):
+    settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", **overrides)
+    backend = GroqChromaBackend(settings=settings, embedding_function=FakeEmbeddingFunction())
+    backend._collection = FakeCollection(documents, distances)
+    return backend
+
+
+class RetrievalCacheTest(unittest.TestCase):
+    def test_repeated_query_reuses_ranked_results_and_embedding(self):
+        backend = make_backend(["Iodine is found in seafood."], [0.4])
+
+        first = backend.retrieve_ranked("iodine sources", n_results=2)
+        second = backend.retrieve_ranked("iodine sources", n_results=2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(backend._collection.queries), 1)
+        self.assertIsNotNone(backend._collection.queries[0]["embeddings"])
+        stats = backend.cache_stats()
+        self.assertEqual(stats["retrieval_cache"]["hits"], 1)
+        self.assertEqual(stats["embedding_cache"]["misses"], 1)
+
+    def test_add_documents_bumps_version_and_invalidates_results(self):
+        backend = make_backend(["Iodine is found in seafood."], [0.4])
+        backend.retrieve_ranked("iodine sources", n_results=2)
+        version = backend.cache_stats()["collection_version"]
+
+        backend.add_documents(["Sardines are rich in calcium."])
+        ranked = backend.retrieve_ranked("iodine sources", n_results=2)
+
+        self.assertEqual(backend.cache_stats()["collection_version"], version + 1)
+        self.assertEqual(len(backend._collection.queries), 2)
+        self.assertEqual(len(ranked), 2)
+        # The query embedding does not depend on the collection contents.
+        self.assertEqual(backend._embedding_function.calls, 1)
+
+    def test_ingest_through_another_instance_invalidates_results(self):
+        serving = make_backend(["Iodine is found in seafood."], [0.4])
+        ingesting = make_backend([], [])
+        ingesting._collection = serving._collection
+        serving.retrieve_ranked("iodine sources", n_results=2)
+        self.assertEqual(serving.collection_count(), 1)
+
+        ingesting.add_documents(["Sardines are rich in calcium."])
+        ranked = serving.retrieve_ranked("iodine sources", n_results=2)
+
+        self.assertEqual(len(serving._collection.queries), 2)
+        self.assertEqual(len(ranked), 2)
+        self.assertEqual(serving.collection_count(), 2)
+
+
+class FilteringCollection(FakeCollection):
+    """Honours `where={"is_meta": False}` the way Chroma would, given per-document flags."""
+
+    def __init__(self, documents, distances, meta_flags):
+        super().__init__(documents, distances)
+        self.meta_flags = list(meta_flags)
+
+    def query(self, n_results, query_texts=None, query_embeddings=None, where=None):
+        self.queries.append({"texts": query_texts, "embeddings": query_embeddings, "n_results": n_results, "where": where})
+        rows = [row for row, is_meta in enumerate(self.meta_flags) if where is None or not is_meta][:n_results]
+        batch = len(query_texts or query_embeddings)
+        return {
+            "documents": [[self.documents[row] for row in rows] for _ in range(batch)],
+            "distances": [[self.distances[row] for row in rows] for _ in range(batch)],
+        }
+
+
+class MetadataFilterTest(unittest.TestCase):
+    DOCUMENTS = [
+        "Example successful response: JSON body with meals.",
+        "Dairy foods are a source of calcium.",
+        "Yoghurt also provides calcium.",
+    ]
+
+    def make_backend(self, **overrides):
+        settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", **overrides)
+        backend = GroqChromaBackend(settings=settings)
+        backend._collection = FilteringCollection(self.DOCUMENTS, [0.2, 0.3, 0.4], [True, False, False])
+        return backend
+
+    def test_filter_pushes_meta_exclusion_into_an_exact_query(self):
+        backend = self.make_backend(rag_metadata_filter=True)
+
+        contexts = backend.retrieve_for_rag("calcium foods", n_results=2)
+
+        self.assertEqual(contexts, self.DOCUMENTS[1:])
+        self.assertEqual(backend._collection.queries[0]["n_results"], 2)
+        self.assertEqual(backend._collection.queries[0]["where"], {"is_meta": False})
+
+    def test_without_filter_meta_chunks_are_dropped_after_ranking(self):
+        backend = self.make_backend()
+
+        contexts = backend.retrieve_for_rag("calcium foods", n_results=2)
+
+        # The meta chunk took one of the two ranked slots before it was filtered out.
+        self.assertEqual(contexts, self.DOCUMENTS[1:2])
+        self.assertEqual(backend._collection.queries[0]["n_results"], 6)
+        self.assertIsNone(backend._collection.queries[0]["where"])
+
+
+class HybridRetrievalTest(unittest.TestCase):
+    DOCUMENTS = [
+        "Wholegrain bread provides fibre.",
+        "Dairy foods are a source of calcium.",
+        "Sardines and salmon are oily fish rich in omega-3.",
+    ]
+
+    def test_exact_term_match_is_promoted_to_a_strict_context(self):
+        backend = make_backend(self.DOCUMENTS, [1.1, 1.2, 1.3], rag_hybrid_search=True)
+
+        contexts = backend.retrieve_for_rag("Are sardines good for me?", n_results=3)
+
+        self.assertEqual(contexts, ["Sardines and salmon are oily fish rich in omega-3."])
+        self.assertEqual(backend.cache_stats()["lexical_index"]["promotions"], 1)
+
+    def test_vector_only_retrieval_is_unchanged_when_disabled(self):
+        backend = make_backend(self.DOCUMENTS, [1.1, 1.2, 1.3])
+
+        contexts = backend.retrieve_for_rag("Are sardines good for me?", n_results=3)
+
+        self.assertEqual(contexts, self.DOCUMENTS)
+        self.assertFalse(backend.cache_stats()["lexical_index"]["loaded"])
+
+    def test_ingest_updates_loaded_lexical_index(self):
+        backend = make_backend(self.DOCUMENTS, [1.1, 1.2, 1.3], rag_hybrid_search=True)
+        backend.retrieve_hybrid("sardines", n_results=3)
+
+        backend.ingest_documents(["Iodised salt and seafood supply iodine."])
+        hybrid = backend.retrieve_hybrid("iodine from seafood", n_results=3)
+
+        self.assertIn(("Iodised salt and seafood supply iodine.", backend.settings.rag_distance_threshold), hybrid)
+        self.assertEqual(backend.cache_stats()["lexical_index"]["documents"], 4)
+
+    def test_single_rare_term_far_from_the_query_is_not_promoted(self):
+        backend = make_backend(self.DOCUMENTS, [1.1, 1.2, 1.7], rag_hybrid_search=True)
+
+        hybrid = backend.retrieve_hybrid("sardines", n_results=3)
+        contexts = backend.retrieve_for_rag("sardines", n_results=3)
+
+        self.assertIn(("Sardines and salmon are oily fish rich in omega-3.", 1.7), hybrid)
+        self.assertNotIn("Sardines and salmon are oily fish rich in omega-3.", contexts)
+        self.assertEqual(backend.cache_stats()["lexical_index"]["promotions"], 0)
+
+    def test_unpromoted_lexical_hit_keeps_an_unknown_distance(self):
+        backend = make_backend(self.DOCUMENTS, [1.1, 1.2, 1.3], rag_hybrid_search=True)
+        backend.retrieve_hybrid("sardines", n_results=3)
+        backend.ingest_documents(["Iodised salt supplies iodine."])
+
+        hybrid = backend.retrieve_hybrid("iodine", n_results=3)
+
+        self.assertIn(("Iodised salt supplies iodine.", math.inf), hybrid)
+
+
+def make_batching_backend(**overrides):
+    return make_backend(
+        ["Iodine is found in seafood.", "Sardines are rich in calcium.", "Oats provide soluble fibre."],
+        [0.3, 0.4, 0.5],
+        rag_batch_window_ms=50.0,
+        rag_batch_max_size=8,
+        **overrides,
+    )
+
+
+class RetrievalBatchingTest(unittest.TestCase):
+    def test_concurrent_retrievals_share_one_chroma_query(self):
+        backend = make_batching_backend()
+        queries = ["iodine sources", "calcium foods", "fibre at breakfast"]
+        results = {}
+        threads = [
+            threading.Thread(target=lambda q=q: results.__setitem__(q, backend.retrieve_ranked(q, n_results=2)))
+            for q in queries
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(backend._collection.queries), 1)
+        self.assertEqual(len(backend._collection.queries[0]["embeddings"]), 3)
+        self.assertEqual(set(results), set(queries))
+        self.assertTrue(all(results[q] for q in queries))
+        stats = backend.cache_stats()["retrieval_batching"]["sync"]
+        self.assertEqual((stats["batches"], stats["items"]), (1, 3))
+
+    def test_batching_is_off_by_default(self):
+        backend = make_backend(["Iodine is found in seafood."], [0.4])
+
+        backend.retrieve_ranked("iodine sources", n_results=2)
+
+        self.assertFalse(backend.cache_stats()["retrieval_batching"]["sync"]["enabled"])
+        self.assertEqual(len(backend._collection.queries), 1)
+
+
+class AsyncRetrievalBatchingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_gathered_retrievals_share_one_chroma_query(self):
+        backend = make_batching_backend()
+        queries = ["iodine sources", "calcium foods"]
+
+        results = await asyncio.gather(*(backend.aretrieve_ranked(q, n_results=1) for q in queries))
+
+        self.assertEqual(len(backend._collection.queries), 1)
+        self.assertEqual(backend._collection.queries[0]["n_results"], 3)
+        self.assertTrue(all(len(ranked) == 1 for ranked in results))
+        self.assertEqual(backend.cache_stats()["retrieval_batching"]["async"]["items"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from nutrihelp_ai.services.ai_cache import ResponseCache, TTLCache, normalize_prompt
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used_entry(self):
+        cache = TTLCache(max_size=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expires_entries_after_ttl(self):
+        clock = FakeClock()
+        cache = TTLCache(max_size=4, ttl_seconds=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 11
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_normalizes_equivalent_questions_to_one_key(self):
+        self.assertEqual(normalize_prompt("is banana healthy"), normalize_prompt("Are bananas healthy?"))
+        self.assertNotEqual(normalize_prompt("Are bananas healthy?"), normalize_prompt("Are apples healthy?"))
+
+    def test_entries_are_scoped_by_namespace(self):
+        cache = ResponseCache(max_size=8, ttl_seconds=60)
+        cache.store("aus_food_nutrition:model", "Are bananas healthy?", "Yes.")
+
+        self.assertEqual(cache.lookup("aus_food_nutrition:model", "is banana healthy"), "Yes.")
+        self.assertIsNone(cache.lookup("other:model", "is banana healthy"))
+
+    def test_similarity_match_uses_embeddings(self):
+        vectors = {
+            "banana healthy": [1.0, 0.0],
+            "banana good for me": [0.95, 0.05],
+            "capital of france": [0.0, 1.0],
+        }
+        cache = ResponseCache(
+            max_size=8,
+            ttl_seconds=60,
+            similarity_threshold=0.9,
+            embed_fn=lambda texts: [vectors[text] for text in texts],
+        )
+        cache.store("ns", "Are bananas healthy?", "Yes.")
+
+        self.assertEqual(cache.lookup("ns", "Is banana good for me?"), "Yes.")
+        self.assertIsNone(cache.lookup("ns", "Capital of France"))
+        self.assertEqual(cache.stats()["similar_hits"], 1)
+
+    def test_invalidate_drops_all_entries(self):
+        cache = ResponseCache(max_size=8, ttl_seconds=60)
+        cache.store("ns", "Are bananas healthy?", "Yes.")
+        cache.invalidate()
+
+        self.assertIsNone(cache.lookup("ns", "Are bananas healthy?"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+import wave
+from types import SimpleNamespace
+from unittest import mock
+
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend
+from nutrihelp_ai.services import audio_chunker
+from nutrihelp_ai.services.audio_chunker import (
+    AudioChunkingConfig,
+    UploadTooLargeError,
+    split_audio,
+    spool_upload,
+    stitch_transcripts,
+)
+
+RATE = 8000
+
+
+def write_wav(seconds: float) -> str:
+    handle = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    with wave.open(handle, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes(b"\x01\x00" * int(seconds * RATE))
+    handle.close()
+    return handle.name
+
+
+async def pieces(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+class SplitAudioTest(unittest.TestCase):
+    def setUp(self):
+        self.path = write_wav(5.0)
+        self.addCleanup(os.remove, self.path)
+
+    def test_wav_is_cut_into_overlapping_chunks(self):
+        chunks = list(split_audio(self.path, AudioChunkingConfig(chunk_seconds=2.0, overlap_seconds=0.5)))
+
+        self.assertEqual([(chunk.start, chunk.end) for chunk in chunks], [(0.0, 2.0), (1.5, 3.5), (3.0, 5.0)])
+        with wave.open(io.BytesIO(chunks[1].wav)) as reader:
+            self.assertEqual(reader.getnframes(), 2 * RATE)
+            self.assertEqual(reader.getframerate(), RATE)
+
+    def test_short_recording_is_one_chunk(self):
+        chunks = list(split_audio(self.path, AudioChunkingConfig(chunk_seconds=30.0, overlap_seconds=2.0)))
+
+        self.assertEqual([(chunk.start, chunk.end) for chunk in chunks], [(0.0, 5.0)])
+
+
+class FfmpegChunksTest(unittest.TestCase):
+    def setUp(self):
+        handle = tempfile.NamedTemporaryFile(suffix=".m4a", delete=False)
+        handle.write(b"not a wav file")
+        handle.close()
+        self.path = handle.name
+        self.addCleanup(os.remove, self.path)
+
+    def split_with_fake_ffmpeg(self, script):
+        popen = subprocess.Popen
+
+        def fake_popen(command, **kwargs):
+            return popen([sys.executable, "-c", script], **kwargs)
+
+        with mock.patch.object(audio_chunker, "ffmpeg_available", return_value=True), mock.patch.object(
+            audio_chunker.subprocess, "Popen", side_effect=fake_popen
+        ):
+            return list(split_audio(self.path, AudioChunkingConfig(chunk_seconds=1.0, overlap_seconds=0.0)))
+
+    def test_verbose_stderr_does_not_stall_decoding(self):
+        script = (
+            "import sys\n"
+            "sys.stderr.write('warning\\n' * 40000)\n"
+            "sys.stderr.flush()\n"
+            "sys.stdout.buffer.write(b'\\x00\\x00' * 32000)\n"
+        )
+
+        chunks = self.split_with_fake_ffmpeg(script)
+
+        self.assertEqual([(chunk.start, chunk.end) for chunk in chunks], [(0.0, 1.0), (1.0, 2.0)])
+
+    def test_decode_failure_reports_ffmpeg_error(self):
+        script = "import sys\nsys.stderr.write('Invalid data found')\nsys.exit(1)\n"
+
+        with self.assertRaisesRegex(RuntimeError, "Invalid data found"):
+            self.split_with_fake_ffmpeg(script)
+
+
+class StitchTranscriptsTest(unittest.TestCase):
+    def test_words_heard_by_both_chunks_are_kept_once(self):
+        texts = ["I had oats and a banana for", "a banana for breakfast, then", "Breakfast then a long walk."]
+
+        self.assertEqual(stitch_transcripts(texts), "I had oats and a banana for breakfast, then a long walk.")
+
+    def test_single_word_coincidence_is_not_treated_as_overlap(self):
+        self.assertEqual(stitch_transcripts(["eat the", "the apple"]), "eat the the apple")
+
+
+class SpoolUploadTest(unittest.IsolatedAsyncioTestCase):
+    async def test_rejects_uploads_over_the_limit(self):
+        with self.assertRaises(UploadTooLargeError):
+            await spool_upload(pieces(b"x" * 6, b"x" * 6), max_bytes=10)
+
+        path = await spool_upload(pieces(b"abc", b"def"), max_bytes=10)
+        self.addCleanup(os.remove, path)
+        with open(path, "rb") as handle:
+            self.assertEqual(handle.read(), b"abcdef")
+
+
+class FakeTranscriptions:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, file):
+        name, audio, _ = file
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        threading.Event().wait(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        index = int(name.split("-")[1].split(".")[0])
+        return SimpleNamespace(text=f"part {index} shared words")
+
+
+class ChunkedTranscriptionTest(unittest.IsolatedAsyncioTestCase):
+    async def test_chunks_are_transcribed_concurrently_and_stitched(self):
+        path = write_wav(5.0)
+        self.addCleanup(os.remove, path)
+        settings = ActiveAISettings(
+            groq_api_key="test-key",
+            chroma_mode="local",
+            transcribe_chunk_seconds=1.0,
+            transcribe_overlap_seconds=0.0,
+            transcribe_concurrency=2,
+        )
+        backend = GroqChromaBackend(settings=settings)
+        transcriptions = FakeTranscriptions()
+        backend._groq_client = SimpleNamespace(audio=SimpleNamespace(transcriptions=transcriptions))
+
+        events = [event async for event in backend.astream_transcription(path, "a.wav", "audio/wav")]
+
+        chunk_events = [event for event in events if event["type"] == "chunk"]
+        self.assertEqual(sorted(event["index"] for event in chunk_events), [0, 1, 2, 3, 4])
+        self.assertEqual(events[-1]["type"], "done")
+        self.assertTrue(events[-1]["transcript"].startswith("part 0 shared words part 1"))
+        self.assertLessEqual(transcriptions.peak, 2)
+        self.assertGreaterEqual(transcriptions.peak, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
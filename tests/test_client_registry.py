@@ -0,0 +1,126 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+
+from nutrihelp_ai.services.active_ai_backend import (
+    ActiveAISettings,
+    GroqChromaBackend,
+    HealthPlanService,
+    get_shared_backend,
+)
+from nutrihelp_ai.services.client_registry import (
+    aget_shared,
+    close_shared_clients,
+    discard_shared,
+    get_shared,
+    registry_stats,
+)
+
+
+class ClientRegistryTest(unittest.TestCase):
+    def setUp(self):
+        close_shared_clients()
+        self.addCleanup(close_shared_clients)
+
+    def test_concurrent_first_callers_build_once(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.05)
+            return object()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_shared("test", "key", build))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(builds), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_failed_builds_are_retried(self):
+        attempts = []
+
+        def build():
+            attempts.append(1)
+            return None if len(attempts) == 1 else "client"
+
+        self.assertIsNone(get_shared("test", "key", build))
+        self.assertEqual(get_shared("test", "key", build), "client")
+        self.assertEqual(len(attempts), 2)
+
+    def test_discard_and_close_force_a_rebuild(self):
+        first = get_shared("test", "key", object)
+        discard_shared("test", "key")
+        second = get_shared("test", "key", object)
+        close_shared_clients()
+        third = get_shared("test", "key", object)
+
+        self.assertIsNot(first, second)
+        self.assertIsNot(second, third)
+        self.assertEqual(registry_stats()["live"], {"test": 1})
+
+    def test_async_handles_are_per_loop(self):
+        async def build():
+            return object()
+
+        async def fetch_twice():
+            return await aget_shared("test", "key", build), await aget_shared("test", "key", build)
+
+        first_a, first_b = asyncio.run(fetch_twice())
+        second_a, _ = asyncio.run(fetch_twice())
+
+        self.assertIs(first_a, first_b)
+        self.assertIsNot(first_a, second_a)
+
+
+class SharedBackendTest(unittest.TestCase):
+    def setUp(self):
+        close_shared_clients()
+        self.addCleanup(close_shared_clients)
+        self.chroma_path = tempfile.mkdtemp(prefix="nutrihelp-registry-")
+
+    def settings(self, **overrides):
+        return ActiveAISettings(groq_api_key="test-key", chroma_mode="local", chroma_path=self.chroma_path, **overrides)
+
+    def test_backends_with_equal_settings_share_clients(self):
+        first = GroqChromaBackend("shared_docs", settings=self.settings())
+        second = GroqChromaBackend("shared_docs", settings=self.settings())
+        other = GroqChromaBackend("other_docs", settings=self.settings())
+
+        self.assertIs(first._get_groq_client(), second._get_groq_client())
+        self.assertIs(first._get_collection(), second._get_collection())
+        self.assertIsNot(first._get_collection(), other._get_collection())
+        self.assertEqual(registry_stats()["live"]["chroma_client"], 1)
+
+    def test_async_groq_client_is_shared_within_a_loop(self):
+        first = GroqChromaBackend("shared_docs", settings=self.settings())
+        second = GroqChromaBackend("shared_docs", settings=self.settings())
+
+        async def clients():
+            return first._get_async_groq_client(), second._get_async_groq_client()
+
+        a, b = asyncio.run(clients())
+        c, _ = asyncio.run(clients())
+
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+
+    def test_shared_backend_is_reused_by_services(self):
+        settings = self.settings()
+        backend = get_shared_backend(settings=settings)
+
+        self.assertIs(get_shared_backend(settings=settings), backend)
+        self.assertIsNot(get_shared_backend("other_docs", settings=settings), backend)
+        self.assertIsNot(get_shared_backend(settings=self.settings(rag_n_results=9)), backend)
+
+    def test_health_plan_service_defaults_to_shared_backend(self):
+        self.assertIs(HealthPlanService().backend, get_shared_backend())
+
+
+if __name__ == "__main__":
+    unittest.main()
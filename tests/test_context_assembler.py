@@ -0,0 +1,58 @@
+import unittest
+
+from nutrihelp_ai.services.context_assembler import assemble_context, estimate_tokens
+
+IODINE_CHUNK = (
+    "Title: Iodine\n"
+    "Source: https://www.health.gov.au/iodine\n\n"
+    "Iodine is needed to make thyroid hormones. "
+    "Bread in Australia is made with iodised salt. "
+    "Seafood and dairy foods are good sources of iodine."
+)
+REPEATED_CHUNK = (
+    "Title: Iodine fortification\n"
+    "Source: https://www.foodstandards.gov.au/iodine\n\n"
+    "Bread in Australia is made with iodised salt! "
+    "Mandatory fortification started in 2009."
+)
+FIBRE_CHUNK = (
+    "Title: Fibre\n"
+    "Source: https://www.health.gov.au/fibre\n\n"
+    "Wholegrain cereals are high in fibre. "
+    "Fibre supports healthy digestion and regular bowel habits."
+)
+
+
+class ContextAssemblerTest(unittest.TestCase):
+    def test_headers_become_a_citation_table(self):
+        assembled = assemble_context([IODINE_CHUNK, FIBRE_CHUNK], "Which foods contain iodine?", token_budget=500)
+
+        self.assertTrue(assembled.text.startswith("SOURCES:\n[1] Iodine - https://www.health.gov.au/iodine\n[2] Fibre"))
+        self.assertNotIn("Title:", assembled.text)
+        self.assertIn("[1] Iodine is needed to make thyroid hormones.", assembled.text)
+
+    def test_near_duplicate_sentences_are_dropped(self):
+        assembled = assemble_context([IODINE_CHUNK, REPEATED_CHUNK], "iodised bread", token_budget=500)
+
+        self.assertEqual(assembled.duplicates_dropped, 1)
+        self.assertEqual(assembled.text.count("iodised salt"), 1)
+        self.assertIn("Mandatory fortification started in 2009.", assembled.text)
+
+    def test_budget_keeps_sentences_that_overlap_the_question(self):
+        assembled = assemble_context([FIBRE_CHUNK, IODINE_CHUNK], "Is seafood a source of iodine?", token_budget=20)
+
+        self.assertIn("Seafood and dairy foods are good sources of iodine.", assembled.text)
+        self.assertNotIn("Wholegrain", assembled.text)
+        self.assertEqual(assembled.sources, [("Iodine", "https://www.health.gov.au/iodine")])
+        self.assertGreater(assembled.tokens_saved, 0)
+        self.assertEqual(assembled.original_tokens, estimate_tokens("\n\n".join([FIBRE_CHUNK, IODINE_CHUNK])))
+
+    def test_zero_budget_keeps_chunks_verbatim(self):
+        assembled = assemble_context([IODINE_CHUNK, FIBRE_CHUNK], "iodine", token_budget=0)
+
+        self.assertEqual(assembled.text, IODINE_CHUNK + "\n\n" + FIBRE_CHUNK)
+        self.assertEqual(assembled.tokens_saved, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
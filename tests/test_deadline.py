@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from nutrihelp_ai.services.deadline import (
+    ClientDisconnected,
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    deadline_from_header,
+    deadline_scope,
+    run_until_disconnected,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class DeadlineTest(unittest.TestCase):
+    def test_remaining_time_caps_stage_timeouts(self):
+        clock = FakeClock()
+        deadline = Deadline(5.0, clock=clock)
+        clock.now += 3.5
+
+        self.assertAlmostEqual(deadline.remaining(), 1.5)
+        self.assertEqual(deadline.timeout(cap=1.0), 1.0)
+        self.assertAlmostEqual(deadline.timeout(cap=4.0), 1.5)
+        self.assertTrue(deadline.allows(1.5))
+        self.assertFalse(deadline.allows(2.0))
+
+        clock.now += 2.0
+        self.assertEqual(deadline.remaining(), 0.0)
+        with self.assertRaises(DeadlineExceeded) as raised:
+            deadline.check("guard")
+        self.assertEqual(raised.exception.stage, "guard")
+
+    def test_header_budget_is_capped_by_configured_default(self):
+        self.assertIsNone(deadline_from_header(None))
+        self.assertEqual(deadline_from_header("2500").budget, 2.5)
+        self.assertEqual(deadline_from_header("20000", default_seconds=8.0).budget, 8.0)
+        self.assertEqual(deadline_from_header(None, default_seconds=8.0).budget, 8.0)
+        self.assertEqual(deadline_from_header("soon", default_seconds=8.0).budget, 8.0)
+        self.assertIsNone(deadline_from_header("soon"))
+
+    def test_scope_sets_and_restores_current_deadline(self):
+        outer = Deadline(10.0)
+        with deadline_scope(outer):
+            with deadline_scope(None) as inherited:
+                self.assertIs(inherited, outer)
+            with deadline_scope(Deadline(1.0)) as inner:
+                self.assertIs(current_deadline(), inner)
+            self.assertIs(current_deadline(), outer)
+        self.assertIsNone(current_deadline())
+
+
+class DeadlineRunTest(unittest.IsolatedAsyncioTestCase):
+    async def test_overrun_cancels_the_stage(self):
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with self.assertRaises(DeadlineExceeded) as raised:
+            await Deadline(0.02).run(slow(), "retrieval")
+
+        self.assertEqual(raised.exception.stage, "retrieval")
+        self.assertEqual(cancelled, [True])
+
+    async def test_disconnect_cancels_pending_work(self):
+        cancelled = []
+        polls = []
+
+        async def answer():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def is_disconnected():
+            polls.append(1)
+            return len(polls) >= 2
+
+        with self.assertRaises(ClientDisconnected):
+            await run_until_disconnected(is_disconnected, answer(), poll_seconds=0.01)
+        await asyncio.sleep(0)
+
+        self.assertEqual(cancelled, [True])
+
+    async def test_finished_work_is_returned(self):
+        async def answer():
+            return "ok"
+
+        async def never():
+            return False
+
+        self.assertEqual(await run_until_disconnected(never, answer(), poll_seconds=0.01), "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import io
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from nutrihelp_ai.services.decoded_image import DecodedImage
+from nutrihelp_ai.services.food_presence import FoodPresenceService, extract_food_presence_features
+from nutrihelp_ai.services.image_quality import ImageQualityService, InvalidImageError
+
+
+def _jpeg_bytes(width=400, height=320, orientation=None):
+    rng = np.random.default_rng(7)
+    pixels = (rng.random((height, width, 3)) * 255).astype(np.uint8)
+    pixels[: height // 2, :, 1] = 40
+    image = Image.fromarray(pixels)
+    buffer = io.BytesIO()
+    if orientation is None:
+        image.save(buffer, "JPEG", quality=90)
+    else:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, "JPEG", quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+class DecodedImageTest(unittest.TestCase):
+    def test_conversions_are_computed_once(self):
+        image = DecodedImage.from_bytes(_jpeg_bytes())
+
+        self.assertEqual(image.size, (400, 320))
+        self.assertIs(image.hsv_array, image.hsv_array)
+        self.assertIs(image.gray, image.gray)
+        self.assertIs(image.resized(96), image.resized(96))
+        self.assertEqual(image.resized(128).size, (128, 128))
+
+    def test_exif_orientation_is_applied_at_decode(self):
+        self.assertEqual(DecodedImage.from_bytes(_jpeg_bytes(orientation=6)).size, (320, 400))
+
+    def test_invalid_uploads_are_rejected(self):
+        with self.assertRaisesRegex(InvalidImageError, "empty"):
+            DecodedImage.from_bytes(b"")
+        with self.assertRaisesRegex(InvalidImageError, "not a supported image"):
+            DecodedImage.from_bytes(b"not an image")
+
+    def test_quality_matches_bytes_and_reuses_the_decoded_image(self):
+        data = _jpeg_bytes()
+        image = DecodedImage.from_bytes(data)
+        service = ImageQualityService()
+
+        self.assertEqual(service.analyze(image), service.analyze(data))
+        self.assertIn("hsv_array", vars(image))
+
+    def test_food_features_match_every_input_form(self):
+        data = _jpeg_bytes()
+        image = DecodedImage.from_bytes(data)
+        with Image.open(io.BytesIO(data)) as src:
+            from_pil = extract_food_presence_features(src)
+
+        from_decoded = extract_food_presence_features(image)
+
+        np.testing.assert_array_equal(from_decoded, from_pil)
+        self.assertIn(128, image._resized)
+
+    def test_food_presence_accepts_decoded_image(self):
+        class FixedModel:
+            def predict_proba(self, features):
+                return [[0.3, 0.7]]
+
+        service = FoodPresenceService()
+        service._model = FixedModel()
+
+        result = service.analyze(DecodedImage.from_bytes(_jpeg_bytes()))
+
+        self.assertTrue(result["enabled"])
+        self.assertEqual(result["food_probability"], 0.7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from nutrihelp_ai.services import active_ai_backend, groq_resilience
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend, _safe_reply
+from nutrihelp_ai.services.groq_resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GroqScheduler,
+    ResilienceConfig,
+    TokenBucket,
+    is_upstream_failure,
+)
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, burst=2, clock=clock)
+
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertFalse(bucket.acquire(timeout=0.5))
+        self.assertEqual(bucket.rejected, 1)
+
+        clock.now += 1.0
+        self.assertTrue(bucket.try_acquire())
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_trips_on_failure_rate_and_recovers_after_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, open_seconds=10, clock=clock)
+
+        for success in (True, False, True, False):
+            self.assertTrue(breaker.allow())
+            breaker.record(success)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        clock.now += 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.short_circuited, 2)
+
+
+class HedgingTest(unittest.TestCase):
+    def test_slow_call_is_hedged_after_p95(self):
+        scheduler = GroqScheduler(ResilienceConfig(hedge=True, hedge_min_samples=1))
+        scheduler.latency.add(0.01)
+        calls = []
+
+        def answer():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.3)
+                return "slow"
+            return "fast"
+
+        self.assertEqual(scheduler.call(answer), "fast")
+        self.assertEqual(scheduler.stats()["hedges"], 1)
+        self.assertEqual(scheduler.stats()["hedge_wins"], 1)
+
+    def test_failed_backup_is_not_counted_as_a_win(self):
+        scheduler = GroqScheduler(ResilienceConfig(hedge=True, hedge_min_samples=1))
+        scheduler.latency.add(0.01)
+        calls = []
+
+        def answer():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                return "primary"
+            raise UpstreamError(503)
+
+        self.assertEqual(scheduler.call(answer), "primary")
+        self.assertEqual((scheduler.stats()["hedges"], scheduler.stats()["hedge_wins"]), (1, 0))
+
+    def test_saturated_hedge_pool_runs_inline(self):
+        scheduler = GroqScheduler(ResilienceConfig(hedge=True, hedge_min_samples=1))
+        scheduler.latency.add(0.01)
+        calls = []
+
+        with mock.patch.object(groq_resilience, "_hedge_in_flight", groq_resilience._HEDGE_WORKERS):
+            self.assertEqual(scheduler.call(lambda: calls.append(1) or time.sleep(0.05) or "ok"), "ok")
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((scheduler.stats()["hedges"], scheduler.stats()["hedges_skipped"]), (0, 1))
+
+    def test_open_circuit_refuses_calls(self):
+        scheduler = GroqScheduler(ResilienceConfig(breaker_min_calls=1, breaker_window=1))
+
+        with self.assertRaises(UpstreamError):
+            scheduler.call(lambda: (_ for _ in ()).throw(UpstreamError(503)))
+        with self.assertRaises(CircuitOpenError):
+            scheduler.call(lambda: "never")
+        self.assertEqual(scheduler.stats()["breaker_state"], "open")
+
+
+    def test_half_open_probe_is_not_hedged(self):
+        clock = FakeClock()
+        scheduler = GroqScheduler(
+            ResilienceConfig(hedge=True, hedge_min_samples=1, breaker_min_calls=1, breaker_window=1, breaker_open_seconds=5),
+            clock=clock,
+        )
+        with self.assertRaises(UpstreamError):
+            scheduler.call(lambda: (_ for _ in ()).throw(UpstreamError(502)))
+        scheduler.latency.add(0.01)
+        clock.now += 5
+        calls = []
+
+        def slow_probe():
+            calls.append(1)
+            time.sleep(0.1)
+            return "ok"
+
+        self.assertEqual(scheduler.call(slow_probe), "ok")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(scheduler.stats()["hedges"], 0)
+        self.assertEqual(scheduler.stats()["breaker_state"], "closed")
+
+
+class FailureClassificationTest(unittest.TestCase):
+    def test_only_server_and_transport_errors_count(self):
+        self.assertTrue(is_upstream_failure(UpstreamError(503)))
+        self.assertTrue(is_upstream_failure(TimeoutError()))
+        self.assertTrue(is_upstream_failure(ConnectionResetError()))
+        self.assertFalse(is_upstream_failure(UpstreamError(400)))
+        self.assertFalse(is_upstream_failure(UpstreamError(401)))
+        self.assertFalse(is_upstream_failure(UpstreamError(429)))
+        self.assertFalse(is_upstream_failure(ValueError("bad prompt")))
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        scheduler = GroqScheduler(ResilienceConfig(breaker_min_calls=2, breaker_window=2))
+
+        for _ in range(3):
+            with self.assertRaises(UpstreamError):
+                scheduler.call(lambda: (_ for _ in ()).throw(UpstreamError(400)))
+
+        stats = scheduler.stats()
+        self.assertEqual(stats["breaker_state"], "closed")
+        self.assertEqual((stats["failures"], stats["client_errors"]), (0, 3))
+
+
+class AsyncHedgingTest(unittest.IsolatedAsyncioTestCase):
+    async def test_losing_attempt_is_cancelled(self):
+        scheduler = GroqScheduler(ResilienceConfig(hedge=True, hedge_min_samples=1))
+        scheduler.latency.add(0.01)
+        cancelled = []
+        calls = []
+
+        async def answer():
+            calls.append(1)
+            if len(calls) == 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(1)
+                    raise
+            return "fast"
+
+        self.assertEqual(await scheduler.acall(answer), "fast")
+        await asyncio.sleep(0)
+        self.assertEqual(cancelled, [1])
+        self.assertEqual(scheduler.stats()["hedge_wins"], 1)
+
+
+class RateLimitedError429(Exception):
+    status_code = 429
+
+
+class BackendResilienceTest(unittest.TestCase):
+    def test_upstream_429s_are_not_retried_and_do_not_trip_the_breaker(self):
+        settings = ActiveAISettings(
+            groq_api_key="test-key",
+            chroma_mode="local",
+            groq_breaker_min_calls=2,
+            groq_breaker_open_seconds=600,
+        )
+        backend = GroqChromaBackend(settings=settings)
+        attempts = []
+        http_calls = []
+
+        def create(**kwargs):
+            attempts.append(kwargs)
+            raise RateLimitedError429("rate limited")
+
+        backend._groq_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        backend._chat_via_http = lambda *args, **kwargs: http_calls.append(args) or "http"
+
+        replies = [backend.chat(f"Is oat milk healthy? {index}") for index in range(3)]
+
+        self.assertEqual(replies, [_safe_reply()] * 3)
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(http_calls, [])
+        stats = backend.cache_stats()["groq_resilience"]
+        self.assertEqual(stats["breaker_state"], "closed")
+        self.assertEqual(stats["client_errors"], 3)
+
+    def test_server_errors_trip_the_breaker(self):
+        settings = ActiveAISettings(
+            groq_api_key="test-key",
+            chroma_mode="local",
+            groq_breaker_min_calls=2,
+            groq_breaker_open_seconds=601,
+        )
+        backend = GroqChromaBackend(settings=settings)
+        attempts = []
+
+        def create(**kwargs):
+            attempts.append(kwargs)
+            raise UpstreamError(503)
+
+        backend._groq_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        backend._chat_via_http = lambda *args, **kwargs: "http"
+
+        [backend.chat(f"Is oat milk healthy? {index}") for index in range(3)]
+
+        self.assertEqual(len(attempts), 2)
+        stats = backend.cache_stats()["groq_resilience"]
+        self.assertEqual(stats["breaker_state"], "open")
+
+    def test_sdk_clients_leave_retries_to_the_scheduler(self):
+        backend = GroqChromaBackend(settings=ActiveAISettings(groq_api_key="test-key", chroma_mode="local"))
+        built = []
+
+        with mock.patch.object(active_ai_backend, "Groq", lambda **kwargs: built.append(kwargs)), mock.patch.object(
+            active_ai_backend, "AsyncGroq", lambda **kwargs: built.append(kwargs)
+        ):
+            backend._build_groq_client()
+
+            async def build_async():
+                backend._build_async_groq_client()
+
+            asyncio.run(build_async())
+
+        self.assertEqual([kwargs["max_retries"] for kwargs in built], [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
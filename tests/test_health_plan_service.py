@@ -0,0 +1,119 @@
+import json
+import re
+import threading
+import unittest
+from types import SimpleNamespace
+
+from nutrihelp_ai.services.active_ai_backend import (
+    ActiveAISettings,
+    GroqChromaBackend,
+    HealthPlanService,
+    _week_blocks,
+)
+from nutrihelp_ai.services.deadline import Deadline, DeadlineExceeded, deadline_scope
+
+
+class WeekBlockCompletions:
+    """Answers each prompt with the weeks it asks for, recording concurrency."""
+
+    def __init__(self, truncate=False):
+        self.truncate = truncate
+        self.prompts = []
+        self.timeouts = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self._barrier = threading.Event()
+
+    def create(self, **kwargs):
+        prompt = kwargs["messages"][-1]["content"]
+        with self._lock:
+            self.prompts.append(prompt)
+            self.timeouts.append(kwargs.get("timeout"))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            if self.in_flight >= 2:
+                self._barrier.set()
+        self._barrier.wait(timeout=0.2)
+        with self._lock:
+            self.in_flight -= 1
+
+        first, last = map(int, re.search(r"weeks numbered (\d+)\.\.(\d+)", prompt).groups())
+        weeks = [
+            {"week": week, "target_calories_per_day": 1800 + week, "focus": "Endurance", "workouts": ["Monday: run"]}
+            for week in range(first, last + 1)
+        ]
+        content = json.dumps({"suggestion": f"Block {first}", "weekly_plan": weeks, "progress_analysis": "Steady."})
+        if self.truncate:
+            content = content[: len(content) // 2]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_service(week_block=4, truncate=False):
+    settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", health_plan_week_block=week_block)
+    backend = GroqChromaBackend(settings=settings)
+    completions = WeekBlockCompletions(truncate=truncate)
+    backend._groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    backend.retrieve = lambda query, n_results=4: ["Adults need about 2 litres of fluid a day."]
+    return HealthPlanService(backend=backend), completions
+
+
+class HealthPlanServiceTest(unittest.TestCase):
+    def test_week_blocks(self):
+        self.assertEqual(_week_blocks(8, 4), [(1, 4), (5, 8)])
+        self.assertEqual(_week_blocks(6, 4), [(1, 4), (5, 6)])
+        self.assertEqual(_week_blocks(8, 0), [(1, 8)])
+
+    def test_fan_out_generates_blocks_in_parallel_and_merges_weeks(self):
+        service, completions = make_service(week_block=4)
+
+        plan = service.generate_plan({"bmi": 31}, num_weeks=8)
+
+        self.assertEqual(len(completions.prompts), 2)
+        self.assertEqual(completions.peak, 2)
+        self.assertEqual([week["week"] for week in plan["weekly_plan"]], list(range(1, 9)))
+        self.assertEqual([week["target_calories_per_day"] for week in plan["weekly_plan"]], [1800 + n for n in range(1, 9)])
+        self.assertEqual(plan["suggestion"], "Block 1")
+
+    def test_same_condition_is_served_from_cache(self):
+        service, completions = make_service(week_block=0)
+
+        first = service.generate_plan({"bmi": 31, "age": 40}, num_weeks=4)
+        first["suggestion"] = "mutated by caller"
+        second = service.generate_plan({"age": 40, "bmi": 31}, num_weeks=4)
+        service.generate_plan({"age": 40, "bmi": 31}, num_weeks=6)
+
+        self.assertEqual(len(completions.prompts), 2)
+        self.assertEqual(second["suggestion"], "Block 1")
+        self.assertEqual(service.cache_stats()["hits"], 1)
+
+    def test_week_blocks_run_under_the_request_deadline(self):
+        service, completions = make_service(week_block=4)
+
+        with deadline_scope(Deadline(30.0)):
+            service.generate_plan({"bmi": 31}, num_weeks=8)
+
+        self.assertEqual(len(completions.timeouts), 2)
+        self.assertTrue(all(timeout is not None and timeout <= 30.0 for timeout in completions.timeouts))
+
+    def test_expired_deadline_stops_every_week_block(self):
+        service, completions = make_service(week_block=4)
+
+        with deadline_scope(Deadline(0.0)):
+            with self.assertRaises(DeadlineExceeded):
+                service.generate_plan({"bmi": 31}, num_weeks=8)
+
+        self.assertEqual(completions.prompts, [])
+
+    def test_truncated_output_is_not_cached(self):
+        service, completions = make_service(week_block=0, truncate=True)
+
+        plan = service.generate_plan({"bmi": 31}, num_weeks=4)
+        service.generate_plan({"bmi": 31}, num_weeks=4)
+
+        self.assertEqual(len(plan["weekly_plan"]), 4)
+        self.assertEqual(len(completions.prompts), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
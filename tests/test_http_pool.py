@@ -0,0 +1,85 @@
+import asyncio
+import gc
+import json
+import unittest
+
+import httpx
+
+from nutrihelp_ai.services import http_pool
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend, HealthPlanService
+from nutrihelp_ai.services.http_pool import HttpPoolConfig, get_async_http_client, get_http_client
+
+
+class HttpPoolTest(unittest.TestCase):
+    def tearDown(self):
+        http_pool.close_http_clients()
+
+    def test_one_client_per_configuration(self):
+        config = HttpPoolConfig(max_connections=4, connect_timeout=1.0, read_timeout=2.0)
+
+        client = get_http_client(config)
+
+        self.assertIs(get_http_client(HttpPoolConfig(max_connections=4, connect_timeout=1.0, read_timeout=2.0)), client)
+        self.assertIsNot(get_http_client(HttpPoolConfig(max_connections=8)), client)
+        self.assertEqual(client.timeout, httpx.Timeout(2.0, connect=1.0))
+
+    def test_groq_sdk_clients_share_the_pool(self):
+        settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", http_pool_size=3)
+        backend = GroqChromaBackend(settings=settings)
+        plans = HealthPlanService(backend=GroqChromaBackend(settings=settings))
+
+        pooled = get_http_client(settings.http_pool_config())
+
+        self.assertIs(backend._get_groq_client()._client, pooled)
+        self.assertIs(plans.backend._get_groq_client()._client, pooled)
+
+    def test_http_fallback_reuses_pooled_connection(self):
+        settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local")
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, json={"choices": [{"message": {"content": "Eat more vegetables."}}]})
+
+        transport_client = httpx.Client(transport=httpx.MockTransport(handler))
+        http_pool._clients[settings.http_pool_config()] = transport_client
+        backend = GroqChromaBackend(settings=settings)
+
+        self.assertEqual(backend._chat_via_http("Are carrots healthy?"), "Eat more vegetables.")
+        self.assertEqual(backend._chat_via_http("Are peas healthy?"), "Eat more vegetables.")
+        self.assertEqual(len(requests), 2)
+        self.assertIs(get_http_client(settings.http_pool_config()), transport_client)
+
+
+class AsyncHttpPoolLoopTest(unittest.TestCase):
+    def test_closed_loop_clients_are_not_reused(self):
+        config = HttpPoolConfig()
+
+        async def client():
+            return get_async_http_client(config)
+
+        first = asyncio.run(client())
+        gc.collect()
+        second = asyncio.run(client())
+
+        self.assertIsNot(first, second)
+        gc.collect()
+        self.assertEqual(http_pool.pool_stats()["async_clients"], 0)
+
+
+class AsyncHttpPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await http_pool.aclose_http_clients()
+
+    async def test_async_client_is_shared_within_a_loop(self):
+        config = HttpPoolConfig()
+
+        client = get_async_http_client(config)
+
+        self.assertIs(get_async_http_client(config), client)
+        await http_pool.aclose_http_clients()
+        self.assertTrue(client.is_closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
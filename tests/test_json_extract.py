@@ -0,0 +1,76 @@
+import json
+import unittest
+
+from nutrihelp_ai.services.active_ai_backend import _force_json
+from nutrihelp_ai.services.json_extract import JsonExtractor, extract_json
+
+PLAN = {
+    "suggestion": "Drink water {often}.",
+    "weekly_plan": [{"week": 1, "workouts": ["Monday: walk"]}, {"week": 2, "workouts": []}],
+    "progress_analysis": "Steady.",
+}
+
+
+class ExtractJsonTest(unittest.TestCase):
+    def test_skips_prose_and_keeps_braces_inside_strings(self):
+        text = f'Sure! Here is the plan: "note" {json.dumps(PLAN)} Hope this helps {{'
+
+        self.assertEqual(extract_json(text), PLAN)
+
+    def test_drops_trailing_commas_outside_strings(self):
+        text = '{"suggestion": "a, ]", "weekly_plan": [{"week": 1,}, ], "progress_analysis": "b",\n}'
+
+        self.assertEqual(
+            extract_json(text),
+            {"suggestion": "a, ]", "weekly_plan": [{"week": 1}], "progress_analysis": "b"},
+        )
+
+    def test_skips_spans_that_are_not_json(self):
+        self.assertEqual(extract_json('{not json} then {"a": 1}'), {"a": 1})
+        self.assertEqual(extract_json('{"a": [1}] and {"b": 2}'), {"b": 2})
+        self.assertIsNone(extract_json("no object here"))
+
+    def test_feeding_in_pieces_matches_one_shot(self):
+        text = 'prefix {"suggestion": "say \\"hi\\" {", "weekly_plan": [], "progress_analysis": ""} suffix'
+        extractor = JsonExtractor()
+        for size in range(0, len(text), 3):
+            extractor.feed(text[size:size + 3])
+
+        self.assertEqual(extractor.result(), extract_json(text))
+
+    def test_partial_closes_object_at_last_complete_member(self):
+        extractor = JsonExtractor()
+        extractor.feed('{"suggestion": "Eat more fib')
+        self.assertEqual(extractor.partial(), {"suggestion": "Eat more fib"})
+
+        extractor.feed('re.", "weekly_plan": [{"week": 1, "focus": "End')
+        self.assertEqual(
+            extractor.partial(),
+            {"suggestion": "Eat more fibre.", "weekly_plan": [{"week": 1, "focus": "End"}]},
+        )
+
+        extractor.feed('urance"}, {"we')
+        self.assertEqual(
+            extractor.partial(),
+            {"suggestion": "Eat more fibre.", "weekly_plan": [{"week": 1, "focus": "Endurance"}]},
+        )
+        self.assertIsNone(extractor.result())
+
+
+class ForceJsonTest(unittest.TestCase):
+    def test_nested_json_in_suggestion_fills_missing_keys(self):
+        inner = json.dumps({"suggestion": "x", "weekly_plan": [{"week": 1}], "progress_analysis": "ok"})
+        data = _force_json(json.dumps({"suggestion": inner}))
+
+        self.assertEqual(data["weekly_plan"], [{"week": 1}])
+        self.assertEqual(data["progress_analysis"], "ok")
+
+    def test_unparseable_output_becomes_suggestion(self):
+        self.assertEqual(
+            _force_json("I cannot make a plan {"),
+            {"suggestion": "I cannot make a plan {", "weekly_plan": [], "progress_analysis": ""},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from nutrihelp_ai.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class BM25IndexTest(unittest.TestCase):
+    def make_index(self):
+        index = BM25Index()
+        index.add_many(
+            [
+                ("bread", "Wholegrain bread provides fibre and B vitamins."),
+                ("dairy", "Dairy foods such as milk and cheese provide calcium."),
+                ("fish", "Sardines are oily fish that provide calcium and omega-3."),
+            ]
+        )
+        return index
+
+    def test_tokenize_drops_stopwords_and_folds_plurals(self):
+        self.assertEqual(tokenize("What are the benefits of sardines?"), ["benefit", "sardine"])
+
+    def test_rare_terms_rank_first_and_report_coverage(self):
+        results = self.make_index().search("sardines calcium", limit=3)
+
+        self.assertEqual([document.split()[0] for document, _, _ in results], ["Sardines", "Dairy"])
+        self.assertAlmostEqual(results[0][2], 1.0)
+        self.assertLess(results[1][2], 0.5)
+
+    def test_add_replaces_and_remove_forgets_documents(self):
+        index = self.make_index()
+
+        index.add("fish", "Salmon is an oily fish.")
+        self.assertEqual(index.search("sardines", limit=3), [])
+        self.assertEqual(index.search("salmon", limit=3)[0][0], "Salmon is an oily fish.")
+
+        index.remove("fish")
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.search("salmon", limit=3), [])
+        self.assertNotIn("salmon", index._postings)
+
+
+class ReciprocalRankFusionTest(unittest.TestCase):
+    def test_items_ranked_well_in_both_lists_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+
+        self.assertEqual([key for key, _ in fused][:2], ["b", "a"])
+        self.assertEqual({key for key, _ in fused}, {"a", "b", "c", "d"})
+
+
+if __name__ == "__main__":
+    unittest.main()
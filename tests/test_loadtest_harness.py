@@ -0,0 +1,95 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend, HealthPlanService
+from scripts.loadtest.fake_groq import FakeGroqConfig, create_app
+from scripts.loadtest.load import Scenario, parse_mix, percentile, run_load, summarize
+from scripts.loadtest.local_chroma import attach_collection, seed_collection
+from scripts.loadtest.servers import serve_in_thread
+
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+
+class FakeUpstreamTest(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.chroma_path = tempfile.mkdtemp(prefix="nutrihelp-loadtest-")
+        cls.collection = seed_collection(cls.chroma_path, "loadtest_nutrition")
+        cls.server = serve_in_thread(create_app(FakeGroqConfig(latency_ms=5, token_delay_ms=0)))
+        cls.groq_url = cls.server.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.__exit__(None, None, None)
+        shutil.rmtree(cls.chroma_path, ignore_errors=True)
+
+    def make_backend(self):
+        settings = ActiveAISettings(
+            groq_api_key="test-key",
+            groq_base_url=self.groq_url,
+            chroma_mode="local",
+            groq_rate_limit_rpm=0.0,
+            rag_collection="loadtest_nutrition",
+        )
+        backend = GroqChromaBackend(settings=settings)
+        attach_collection(backend, self.collection)
+        return backend
+
+    async def test_grounded_chat_runs_against_fake_groq_and_fixture_corpus(self):
+        backend = self.make_backend()
+
+        reply = await backend.achat_with_rag_fallback("Are bananas a good source of potassium?")
+        streamed = "".join([delta async for delta in backend.astream_chat("Suggest a healthy snack")])
+
+        self.assertTrue(reply.startswith("Bananas are a good source of potassium"), reply)
+        self.assertTrue(streamed.startswith("Here is some general nutrition guidance."), streamed)
+
+    async def test_health_plan_covers_every_week(self):
+        service = HealthPlanService(backend=self.make_backend())
+        condition = {"health_goal": {"target_weight": 70, "days_per_week": 3}}
+
+        plan = await asyncio.to_thread(service.generate_plan, condition, num_weeks=6, week_block=4)
+
+        self.assertEqual([week["week"] for week in plan["weekly_plan"]], [1, 2, 3, 4, 5, 6])
+
+
+class LoadGeneratorTest(unittest.IsolatedAsyncioTestCase):
+    async def test_reports_latency_percentiles_and_error_rate(self):
+        app = FastAPI()
+        calls = {"count": 0}
+
+        @app.post("/echo")
+        async def echo(payload: dict):
+            calls["count"] += 1
+            await asyncio.sleep(0.01)
+            return {"msg": payload["query"]}
+
+        scenarios = [
+            Scenario("echo", "/echo", ({"query": "a"}, {"query": "b"}), weight=3),
+            Scenario("missing", "/missing", ({},), weight=1),
+        ]
+        with serve_in_thread(app) as url:
+            result = await run_load(url, scenarios, rps=100, duration=0.4)
+
+        summary = summarize(result)
+        rows = summary["scenarios"]
+        self.assertEqual(rows["all"]["requests"], 40)
+        self.assertEqual(rows["echo"]["requests"], calls["count"])
+        self.assertEqual(rows["echo"]["error_rate"], 0.0)
+        self.assertEqual(rows["missing"]["error_rate"], 1.0)
+        self.assertEqual(rows["missing"]["statuses"], {"404": rows["missing"]["requests"]})
+        self.assertGreaterEqual(rows["echo"]["p99_ms"], rows["echo"]["p50_ms"])
+
+    def test_percentile_and_mix_parsing(self):
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(parse_mix("chat=5, rag=3,plan"), {"chat": 5.0, "rag": 3.0, "plan": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from nutrihelp_ai.services import active_ai_backend
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend
+from nutrihelp_ai.services.local_vector_index import LocalVectorIndex, export_snapshot
+
+
+def embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+class ExportableCollection:
+    name = "aus_food_nutrition"
+    metadata = {"hnsw:space": "l2"}
+
+    def __init__(self, documents, delay=0.0):
+        self.documents = list(documents)
+        self.delay = delay
+        self._embedding_function = embed
+
+    def count(self):
+        return len(self.documents)
+
+    def get(self, include, limit, offset):
+        page = self.documents[offset:offset + limit]
+        return {
+            "ids": [f"doc-{offset + index}" for index in range(len(page))],
+            "documents": page,
+            "metadatas": [{"position": offset + index} for index in range(len(page))],
+            "embeddings": embed(page),
+        }
+
+    def query(self, n_results, query_texts=None, query_embeddings=None):
+        time.sleep(self.delay)
+        return {"documents": [["from cloud"]], "distances": [[0.1]]}
+
+
+class LocalVectorIndexTest(unittest.TestCase):
+    def test_query_orders_by_distance_in_collection_space(self):
+        embeddings = np.array([[3.0, 4.0], [1.0, 0.0], [0.0, 2.0]], dtype=np.float32)
+        index = LocalVectorIndex(embeddings, ["a", "b", "c"], ["A", "B", "C"], space="l2")
+
+        result = index.query(query_embeddings=[[1.0, 0.0]], n_results=2)
+
+        self.assertEqual(result["ids"], [["b", "c"]])
+        np.testing.assert_allclose(result["distances"][0], [0.0, 5.0], atol=1e-5)
+
+        cosine = LocalVectorIndex(embeddings, ["a", "b", "c"], ["A", "B", "C"], space="cosine")
+        self.assertEqual(cosine.query(query_embeddings=[[0.0, 1.0]], n_results=1)["ids"], [["c"]])
+
+    def test_where_filter_limits_candidates(self):
+        embeddings = np.array([[1.0, 0.0], [1.1, 0.0], [5.0, 0.0]], dtype=np.float32)
+        metadatas = [{"is_meta": True}, {"is_meta": False}, {"is_meta": False}]
+        index = LocalVectorIndex(embeddings, ["a", "b", "c"], ["A", "B", "C"], metadatas=metadatas)
+
+        result = index.query(query_embeddings=[[1.0, 0.0]], n_results=5, where={"is_meta": False})
+
+        self.assertEqual(result["ids"], [["b", "c"]])
+        self.assertEqual(index.get(include=["documents"], where={"is_meta": {"$ne": False}})["documents"], ["A"])
+
+    def test_export_and_load_roundtrip(self):
+        collection = ExportableCollection([f"chunk {'x' * size}" for size in range(7)])
+
+        with tempfile.TemporaryDirectory() as path:
+            self.assertEqual(export_snapshot(collection, path, page_size=3), 7)
+            index = LocalVectorIndex.load(path, embedding_function=embed)
+
+            self.assertEqual(index.count(), 7)
+            self.assertIsInstance(index.embeddings, np.memmap)
+            result = index.query(query_texts=["chunk xxx"], n_results=1)
+            self.assertEqual(result["documents"], [["chunk xxx"]])
+            self.assertEqual(result["metadatas"], [[{"position": 3}]])
+
+
+class CloudFailoverTest(unittest.TestCase):
+    def make_backend(self, path, delay):
+        export_snapshot(ExportableCollection(["Iodine is found in seafood."]), path)
+        settings = ActiveAISettings(
+            groq_api_key="test-key",
+            chroma_mode="cloud",
+            chroma_snapshot_path=path,
+            rag_cloud_latency_budget_ms=50,
+        )
+        backend = GroqChromaBackend(settings=settings, embedding_function=embed)
+        backend._collection = ExportableCollection(["cloud chunk"], delay=delay)
+        return backend
+
+    def test_slow_cloud_query_is_answered_from_snapshot(self):
+        with tempfile.TemporaryDirectory() as path:
+            backend = self.make_backend(path, delay=0.5)
+
+            ranked = backend.retrieve_ranked("iodine", n_results=1)
+
+            self.assertEqual(ranked[0][0], "Iodine is found in seafood.")
+            self.assertEqual(backend.cache_stats()["local_index"]["failovers"], 1)
+
+    def test_fast_cloud_query_is_used_as_is(self):
+        with tempfile.TemporaryDirectory() as path:
+            backend = self.make_backend(path, delay=0.0)
+
+            ranked = backend.retrieve_ranked("iodine", n_results=1)
+
+            self.assertEqual(ranked[0][0], "from cloud")
+            self.assertEqual(backend.cache_stats()["local_index"]["failovers"], 0)
+
+    def test_saturated_query_pool_fails_over_without_waiting(self):
+        busy = threading.BoundedSemaphore(1)
+        busy.acquire()
+        with tempfile.TemporaryDirectory() as path, mock.patch.object(active_ai_backend, "_CHROMA_QUERY_SLOTS", busy):
+            backend = self.make_backend(path, delay=0.0)
+
+            ranked = backend.retrieve_ranked("iodine", n_results=1)
+
+            self.assertEqual(ranked[0][0], "Iodine is found in seafood.")
+            self.assertEqual(backend.cache_stats()["local_index"]["failovers"], 1)
+
+    def test_abandoned_query_releases_its_slot_when_it_returns(self):
+        slots = threading.BoundedSemaphore(1)
+        with tempfile.TemporaryDirectory() as path, mock.patch.object(active_ai_backend, "_CHROMA_QUERY_SLOTS", slots):
+            backend = self.make_backend(path, delay=0.2)
+            backend.retrieve_ranked("iodine", n_results=1)
+            time.sleep(0.3)
+
+            self.assertTrue(slots.acquire(blocking=False))
+
+    def test_cloud_http_session_gets_a_timeout(self):
+        session = SimpleNamespace(timeout=None)
+        client = SimpleNamespace(_server=SimpleNamespace(_session=session))
+
+        active_ai_backend._set_chroma_http_timeout(client, 12.0)
+
+        self.assertEqual(session.timeout, 12.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import asyncio
+import contextvars
+import threading
+import unittest
+
+from nutrihelp_ai.services.micro_batcher import AsyncMicroBatcher, MicroBatcher
+
+
+class MicroBatcherTest(unittest.TestCase):
+    def test_concurrent_submissions_share_one_batch(self):
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(run_batch, window_seconds=0.1, max_batch=8)
+        results = {}
+        threads = [threading.Thread(target=lambda n=n: results.__setitem__(n, batcher.submit(n))) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {0: 0, 1: 10, 2: 20, 3: 30})
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(sorted(batches[0]), [0, 1, 2, 3])
+        stats = batcher.stats()
+        self.assertEqual((stats["batches"], stats["items"], stats["max_batch_size"]), (1, 4, 4))
+
+    def test_full_batch_dispatches_before_window_ends(self):
+        batcher = MicroBatcher(lambda items: list(items), window_seconds=10.0, max_batch=2)
+        results = []
+        threads = [threading.Thread(target=lambda n=n: results.append(batcher.submit(n))) for n in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=2)
+
+        self.assertEqual(sorted(results), [0, 1])
+        self.assertLess(batcher.stats()["avg_wait_ms"], 2000)
+
+    def test_batch_exception_reaches_every_caller(self):
+        def run_batch(items):
+            raise RuntimeError("chroma down")
+
+        batcher = MicroBatcher(run_batch, window_seconds=0.05, max_batch=4)
+        errors = []
+
+        def call():
+            try:
+                batcher.submit("query")
+            except RuntimeError as exc:
+                errors.append(str(exc))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, ["chroma down"] * 3)
+
+    def test_zero_window_runs_each_item_directly(self):
+        batches = []
+        batcher = MicroBatcher(lambda items: batches.append(items) or list(items), window_seconds=0, max_batch=8)
+
+        self.assertEqual(batcher.submit("a"), "a")
+        self.assertEqual(batches, [["a"]])
+        self.assertFalse(batcher.stats()["enabled"])
+
+
+class AsyncMicroBatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def test_gathered_submissions_share_one_batch(self):
+        batches = []
+
+        async def run_batch(items):
+            batches.append(list(items))
+            return [item.upper() for item in items]
+
+        batcher = AsyncMicroBatcher(run_batch, window_seconds=0.02, max_batch=8)
+        results = await asyncio.gather(*(batcher.submit(item) for item in ("a", "b", "c")))
+
+        self.assertEqual(results, ["A", "B", "C"])
+        self.assertEqual(batches, [["a", "b", "c"]])
+
+    async def test_max_batch_splits_dispatches(self):
+        batches = []
+
+        async def run_batch(items):
+            batches.append(list(items))
+            return list(items)
+
+        batcher = AsyncMicroBatcher(run_batch, window_seconds=0.02, max_batch=2)
+        results = await asyncio.gather(*(batcher.submit(n) for n in range(5)))
+
+        self.assertEqual(results, [0, 1, 2, 3, 4])
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+
+    async def test_cancelled_caller_does_not_cancel_batch(self):
+        async def run_batch(items):
+            await asyncio.sleep(0.02)
+            return list(items)
+
+        batcher = AsyncMicroBatcher(run_batch, window_seconds=0.01, max_batch=8)
+        doomed = asyncio.ensure_future(batcher.submit("doomed"))
+        survivor = asyncio.ensure_future(batcher.submit("survivor"))
+        await asyncio.sleep(0.015)
+        doomed.cancel()
+
+        self.assertEqual(await survivor, "survivor")
+
+    async def test_timer_flushed_batch_runs_in_the_submitter_context(self):
+        request_id = contextvars.ContextVar("request_id", default=None)
+        seen = []
+
+        async def run_batch(items):
+            seen.append(request_id.get())
+            return list(items)
+
+        batcher = AsyncMicroBatcher(run_batch, window_seconds=0.01, max_batch=8)
+
+        async def submit_for(request, item):
+            request_id.set(request)
+            return await batcher.submit(item)
+
+        self.assertEqual(await submit_for("req-1", "a"), "a")
+        self.assertEqual(seen, ["req-1"])
+
+    async def test_full_batch_runs_in_the_opening_submitter_context(self):
+        request_id = contextvars.ContextVar("request_id", default=None)
+        seen = []
+
+        async def run_batch(items):
+            seen.append(request_id.get())
+            return list(items)
+
+        batcher = AsyncMicroBatcher(run_batch, window_seconds=5.0, max_batch=2)
+
+        async def submit_for(request, item):
+            request_id.set(request)
+            return await batcher.submit(item)
+
+        results = await asyncio.gather(submit_for("req-1", "a"), submit_for("req-2", "b"))
+
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(seen, ["req-1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
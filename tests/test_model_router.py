@@ -0,0 +1,155 @@
+import unittest
+from types import SimpleNamespace
+
+from nutrihelp_ai.services.active_ai_backend import (
+    ActiveAISettings,
+    GROUNDING_SYSTEM_PROMPT,
+    GroqChromaBackend,
+)
+from nutrihelp_ai.services.model_router import (
+    DOMAIN_CHAT,
+    GROUNDED_RAG,
+    SOCIAL,
+    STRUCTURED_JSON,
+    ModelRouter,
+    default_routes,
+    parse_routes,
+)
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Sure."))])
+
+
+class ParseRoutesTest(unittest.TestCase):
+    def setUp(self):
+        self.defaults = default_routes("small-model", "large-model")
+
+    def test_overrides_only_named_fields(self):
+        routes = parse_routes('{"social": {"models": ["a", "b"], "max_tokens": 64}}', self.defaults)
+
+        self.assertEqual(routes[SOCIAL].models, ("a", "b"))
+        self.assertEqual(routes[SOCIAL].max_tokens, 64)
+        self.assertEqual(routes[SOCIAL].timeout, self.defaults[SOCIAL].timeout)
+        self.assertEqual(routes[STRUCTURED_JSON].models, ("large-model",))
+
+    def test_invalid_json_falls_back_to_defaults(self):
+        self.assertEqual(parse_routes("{not json", self.defaults), self.defaults)
+        self.assertEqual(parse_routes('{"poetry": {"model": "x"}}', self.defaults), self.defaults)
+
+
+class DefaultRoutesTest(unittest.TestCase):
+    def test_defaults_keep_uncapped_chat_on_the_default_model(self):
+        routes = default_routes("small-model")
+
+        self.assertEqual({route.models for route in routes.values()}, {("small-model",)})
+        self.assertIsNone(routes[SOCIAL].max_tokens)
+        self.assertIsNone(routes[DOMAIN_CHAT].timeout)
+        self.assertEqual(routes[STRUCTURED_JSON].max_tokens, 1200)
+
+    def test_tuned_limits_are_opt_in(self):
+        routes = default_routes("small-model", "large-model", tuned=True)
+
+        self.assertEqual((routes[SOCIAL].max_tokens, routes[SOCIAL].timeout), (150, 10.0))
+        self.assertEqual(routes[STRUCTURED_JSON].models, ("large-model",))
+
+
+class ModelRouterTest(unittest.TestCase):
+    def make_router(self, explore_every=0):
+        routes = parse_routes('{"domain_chat": {"models": ["slow", "fast"]}}', default_routes("m"))
+        return ModelRouter(routes, smoothing=1.0, explore_every=explore_every)
+
+    def test_prefers_unmeasured_then_fastest_model(self):
+        router = self.make_router()
+
+        self.assertEqual(router.route(DOMAIN_CHAT).model, "slow")
+        router.observe(DOMAIN_CHAT, "slow", 2.0)
+        self.assertEqual(router.route(DOMAIN_CHAT).model, "fast")
+        router.observe(DOMAIN_CHAT, "fast", 0.5)
+        self.assertEqual(router.route(DOMAIN_CHAT).model, "fast")
+        router.observe(DOMAIN_CHAT, "fast", 3.0)
+        self.assertEqual(router.route(DOMAIN_CHAT).model, "slow")
+
+    def test_slower_model_is_periodically_remeasured(self):
+        router = self.make_router(explore_every=4)
+        router.observe(DOMAIN_CHAT, "slow", 2.0)
+        router.observe(DOMAIN_CHAT, "fast", 0.5)
+
+        chosen = [router.route(DOMAIN_CHAT).model for _ in range(8)]
+
+        self.assertEqual(chosen.count("slow"), 2)
+        self.assertEqual(router.stats()["routes"][DOMAIN_CHAT]["explorations"], 2)
+
+    def test_latency_is_tracked_per_prompt_class(self):
+        routes = parse_routes(
+            '{"domain_chat": {"models": ["a", "b"]}, "structured_json": {"models": ["a", "b"]}}',
+            default_routes("m"),
+        )
+        router = ModelRouter(routes, smoothing=1.0, explore_every=0)
+        for prompt_class in (DOMAIN_CHAT, STRUCTURED_JSON):
+            router.observe(prompt_class, "a", 1.0)
+            router.observe(prompt_class, "b", 1.5)
+        router.observe(STRUCTURED_JSON, "a", 9.0)
+
+        self.assertEqual(router.route(DOMAIN_CHAT).model, "a")
+        self.assertEqual(router.route(STRUCTURED_JSON).model, "b")
+
+    def test_preferred_model_is_read_without_counting_a_decision(self):
+        routes = parse_routes('{"domain_chat": {"models": ["a", "b"]}}', default_routes("m"))
+        router = ModelRouter(routes, smoothing=1.0, explore_every=1)
+        router.observe(DOMAIN_CHAT, "a", 1.0)
+        router.observe(DOMAIN_CHAT, "b", 2.0)
+
+        self.assertEqual(router.preferred(DOMAIN_CHAT), "a")
+        self.assertEqual(router.preferred(DOMAIN_CHAT, model="custom"), "custom")
+        self.assertEqual(router.stats()["routes"][DOMAIN_CHAT]["decisions"], 0)
+        self.assertEqual(router.stats()["routes"][DOMAIN_CHAT]["explorations"], 0)
+
+    def test_explicit_model_keeps_route_limits(self):
+        router = ModelRouter(default_routes("small-model", "large-model", tuned=True))
+
+        decision = router.route(GROUNDED_RAG, model="custom")
+
+        self.assertEqual(decision.model, "custom")
+        self.assertEqual(decision.max_tokens, 512)
+
+
+class BackendRoutingTest(unittest.TestCase):
+    def make_backend(self, **overrides):
+        settings = ActiveAISettings(groq_api_key="test-key", chroma_mode="local", groq_model="small-model", **overrides)
+        backend = GroqChromaBackend(settings=settings)
+        completions = FakeCompletions()
+        backend._groq_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return backend, completions
+
+    def test_default_routes_send_no_limits(self):
+        backend, completions = self.make_backend(groq_structured_model="", groq_tuned_routes=False)
+
+        backend.chat("hello there")
+
+        self.assertEqual(completions.calls[0]["model"], "small-model")
+        self.assertNotIn("max_tokens", completions.calls[0])
+        self.assertNotIn("timeout", completions.calls[0])
+
+    def test_grounded_and_social_prompts_use_their_routes(self):
+        backend, completions = self.make_backend(groq_tuned_routes=True)
+
+        backend.chat("CONTEXT:\nBananas.\n\nQUESTION:\nPotassium?", system_prompt=GROUNDING_SYSTEM_PROMPT)
+        backend.chat("hello there")
+
+        grounded, social = completions.calls
+        self.assertEqual(grounded["model"], "small-model")
+        self.assertEqual(grounded["max_tokens"], 512)
+        self.assertEqual(social["max_tokens"], 150)
+        self.assertEqual(social["timeout"], 10.0)
+        stats = backend.cache_stats()["model_router"]
+        self.assertEqual(stats["models"]["small-model"]["calls"], 2)
+        self.assertIn("small-model", stats["routes"][SOCIAL]["latency_ms"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from types import SimpleNamespace
+
+from nutrihelp_ai.services.active_ai_backend import ActiveAISettings, GroqChromaBackend
+from nutrihelp_ai.services.request_metrics import (
+    REGISTRY,
+    MetricsRegistry,
+    end_trace,
+    record_tokens,
+    stage,
+    start_trace,
+)
+
+
+class FakeCollection:
+    def __init__(self, documents, distances):
+        self.documents = documents
+        self.distances = distances
+
+    def count(self):
+        return len(self.documents)
+
+    def query(self, query_texts, n_results):
+        return {
+            "documents": [self.documents[:n_results] for _ in query_texts],
+            "distances": [self.distances[:n_results] for _ in query_texts],
+        }
+
+
+class FakeAsyncCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+
+    async def create(self, **kwargs):
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.replies.pop(0)))],
+            usage=usage,
+        )
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_renders_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        registry.counter("demo_total", "Demo counter.", ("path",))
+        registry.histogram("demo_seconds", "Demo latency.", ("stage",), buckets=(0.1, 1.0))
+        registry.inc("demo_total", path="grounded")
+        registry.inc("demo_total", path="grounded")
+        registry.observe("demo_seconds", 0.05, stage="llm")
+        registry.observe("demo_seconds", 0.5, stage="llm")
+
+        lines = registry.render().splitlines()
+
+        self.assertIn("# TYPE demo_total counter", lines)
+        self.assertIn('demo_total{path="grounded"} 2', lines)
+        self.assertIn("# TYPE demo_seconds histogram", lines)
+        self.assertIn('demo_seconds_bucket{stage="llm",le="0.1"} 1', lines)
+        self.assertIn('demo_seconds_bucket{stage="llm",le="1"} 2', lines)
+        self.assertIn('demo_seconds_bucket{stage="llm",le="+Inf"} 2', lines)
+        self.assertIn('demo_seconds_count{stage="llm"} 2', lines)
+        self.assertIn('demo_seconds_sum{stage="llm"} 0.55', lines)
+
+
+class RequestTraceTest(unittest.TestCase):
+    def test_stages_and_tokens_appear_in_server_timing(self):
+        trace, token = start_trace()
+        try:
+            with stage("retrieval"):
+                pass
+            with stage("retrieval"):
+                pass
+            record_tokens("test-model", {"prompt_tokens": 10, "completion_tokens": 4})
+        finally:
+            end_trace(token)
+
+        header = trace.server_timing()
+        self.assertIn('retrieval;dur=', header)
+        self.assertIn('desc="2 calls"', header)
+        self.assertIn('prompt_tokens;desc="10"', header)
+        self.assertTrue(header.split(", ")[-1].startswith("total;dur="))
+
+    def test_stages_outside_a_request_only_feed_the_registry(self):
+        with stage("unit_test_stage"):
+            pass
+
+        self.assertIn('nutrihelp_stage_duration_seconds_count{stage="unit_test_stage"}', REGISTRY.render())
+
+
+class BackendInstrumentationTest(unittest.IsolatedAsyncioTestCase):
+    async def test_grounded_answer_records_path_retrieval_and_tokens(self):
+        backend = GroqChromaBackend(settings=ActiveAISettings(groq_api_key="test-key", chroma_mode="local"))
+        backend._async_groq_client = SimpleNamespace(
+            chat=SimpleNamespace(completions=FakeAsyncCompletions(["Bananas provide potassium and fibre."]))
+        )
+        backend._collection = FakeCollection(["Bananas are a source of potassium and fibre."], [0.3])
+
+        trace, token = start_trace()
+        try:
+            await backend.achat_with_rag_fallback("Are bananas healthy?")
+        finally:
+            end_trace(token)
+
+        summary = trace.as_dict()
+        self.assertEqual(summary["rag_path"], "grounded")
+        self.assertEqual(summary["candidates"], 1)
+        self.assertEqual(summary["prompt_tokens"], 120)
+        self.assertIn("retrieval", summary["stages"])
+        self.assertIn("llm", summary["stages"])
+        self.assertIn('nutrihelp_rag_path_total{path="grounded"}', REGISTRY.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
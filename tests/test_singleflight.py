@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from nutrihelp_ai.services.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def slow_answer():
+            calls.append(1)
+            time.sleep(0.05)
+            return "answer"
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow_answer))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["answer"] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats(), {"executions": 1, "collapsed": 4})
+
+    def test_followers_receive_leader_exception(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("upstream down")
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except RuntimeError as exc:
+                errors.append(str(exc))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(errors, ["upstream down", "upstream down"])
+
+
+class AsyncSingleFlightLoopTest(unittest.TestCase):
+    def test_flight_left_on_a_closed_loop_is_not_joined(self):
+        flight = AsyncSingleFlight()
+
+        async def never():
+            await asyncio.Event().wait()
+
+        async def answer():
+            return "fresh"
+
+        async def leave_pending():
+            asyncio.ensure_future(flight.do("key", never))
+            await asyncio.sleep(0)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(leave_pending())
+        loop.close()
+
+        self.assertEqual(asyncio.run(flight.do("key", answer)), "fresh")
+
+
+class AsyncSingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_coroutines_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow_answer(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(*(flight.do("key", slow_answer, "answer") for _ in range(5)))
+
+        self.assertEqual(results, ["answer"] * 5)
+        self.assertEqual(calls, ["answer"])
+        self.assertEqual(flight.stats()["collapsed"], 4)
+
+    async def test_sequential_calls_are_not_collapsed(self):
+        flight = AsyncSingleFlight()
+
+        async def answer():
+            return "answer"
+
+        await flight.do("key", answer)
+        await flight.do("key", answer)
+
+        self.assertEqual(flight.stats(), {"executions": 2, "collapsed": 0, "abandoned": 0})
+
+    async def test_task_is_cancelled_once_every_caller_is_cancelled(self):
+        flight = AsyncSingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def slow_answer():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.ensure_future(flight.do("key", slow_answer))
+        second = asyncio.ensure_future(flight.do("key", slow_answer))
+        await started.wait()
+
+        first.cancel()
+        await asyncio.sleep(0)
+        self.assertFalse(cancelled.is_set())
+
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        self.assertEqual(flight.stats()["abandoned"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()